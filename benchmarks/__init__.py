@@ -0,0 +1,9 @@
+#!/usr/bin/python
+# -- Content-Encoding: UTF-8 --
+"""
+Benchmark suite for python-javaobj
+
+Run it from the root of the repository with::
+
+    python -m benchmarks.run --output results.json
+"""
@@ -0,0 +1,430 @@
+#!/usr/bin/python
+# -- Content-Encoding: UTF-8 --
+"""
+Runs the benchmarks of the v1 and v2 parsers and of the v1 marshaller, and
+stores the results in a JSON file which can be compared to a previous run::
+
+    python -m benchmarks.run --output new.json --compare old.json
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import, print_function
+
+# Standard library
+from typing import Any, Callable, Dict, List, Optional  # noqa: F401
+import argparse
+import fnmatch
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    # Python 3.3+
+    from time import perf_counter
+except ImportError:
+    # Python 2
+    from time import time as perf_counter
+
+try:
+    # Python 2
+    from StringIO import StringIO as BytesIO
+except ImportError:
+    # Python 3+
+    from io import BytesIO
+
+# Javaobj
+import javaobj
+import javaobj.v1
+import javaobj.v2
+from javaobj.v1.marshaller import JavaObjectMarshaller
+from javaobj.v1.transformers import DefaultObjectTransformer
+from javaobj.v1.unmarshaller import JavaObjectUnmarshaller
+
+from .workloads import Workload, corpus_workloads, synthetic_workloads
+
+# ------------------------------------------------------------------------------
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# Identifier and version of the results format
+RESULTS_FORMAT = "javaobj-benchmark"
+RESULTS_FORMAT_VERSION = 2
+
+# ------------------------------------------------------------------------------
+
+
+def _v1_loads(data):
+    """
+    Parses all the contents of a stream with the v1 implementation, which
+    only reads one content per call
+    """
+    stream = BytesIO(data)
+    unmarshaller = JavaObjectUnmarshaller(stream)
+    unmarshaller.add_transformer(DefaultObjectTransformer())
+    contents = []
+    while True:
+        contents.append(unmarshaller.readObject(ignore_remaining_data=True))
+        if stream.tell() >= len(data):
+            return contents
+
+
+def _v1_dumps(contents):
+    """
+    Serializes contents read by _v1_loads() in a single stream
+    """
+    marshaller = JavaObjectMarshaller()
+    marshaller.dump(contents[0])
+    for content in contents[1:]:
+        marshaller.writeObject(content)
+    return marshaller.object_stream.getvalue()
+
+
+def _v2_loads(data):
+    """
+    Parses a stream with the v2 implementation
+    """
+    return javaobj.v2.loads(data)
+
+
+# Engine name -> (preparation of a payload, benchmarked method, number of
+# bytes processed given the input and the output of the method)
+ENGINES = {
+    "v1.loads": (lambda data: data, _v1_loads, lambda data, _: len(data)),
+    "v2.loads": (lambda data: data, _v2_loads, lambda data, _: len(data)),
+    "v1.dumps": (_v1_loads, _v1_dumps, lambda _, data: len(data)),
+}  # type: Dict[str, Any]
+
+
+class BenchmarkResult(object):  # pylint:disable=R0205
+    """
+    Result of a benchmark: an engine applied to a workload
+    """
+
+    def __init__(self, engine, workload, timings, size):
+        # type: (str, Workload, List[float], int) -> None
+        """
+        :param engine: Name of the benchmarked engine
+        :param workload: The benchmarked workload
+        :param timings: Duration of an operation, for each run
+        :param size: Number of bytes consumed (parsers) or produced
+                     (marshallers) by an operation
+        """
+        self.engine = engine
+        self.workload = workload
+        self.timings = timings
+        self.size = size
+
+    @property
+    def name(self):
+        # type: () -> str
+        """
+        Name of the benchmark
+        """
+        return "{0}:{1}".format(self.engine, self.workload.name)
+
+    @property
+    def best(self):
+        # type: () -> float
+        """
+        Best duration of a single operation, i.e. of the parsing (or dump) of
+        all the payloads of the workload
+        """
+        return min(self.timings)
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Converts the result to a dictionary, with stable keys
+        """
+        mean = sum(self.timings) / len(self.timings)
+        stdev = math.sqrt(
+            sum((timing - mean) ** 2 for timing in self.timings)
+            / len(self.timings)
+        )
+        nb_payloads = len(self.workload.payloads)
+        return {
+            "name": self.name,
+            "engine": self.engine,
+            "workload": self.workload.name,
+            "params": self.workload.params,
+            "payloads": nb_payloads,
+            "bytes": self.size,
+            "runs": len(self.timings),
+            "best": self.best,
+            "mean": mean,
+            "stdev": stdev,
+            "ops_per_sec": nb_payloads / self.best,
+            "mb_per_sec": self.size / self.best / 1e6,
+        }
+
+
+def measure(method, inputs, repeat=5, min_time=0.2):
+    # type: (Callable[[Any], Any], List[Any], int, float) -> List[float]
+    """
+    Measures the time needed to apply the method to all inputs.
+
+    Each run loops enough times to last at least ``min_time`` seconds.
+
+    :param method: Method to benchmark
+    :param inputs: Inputs given to the method, one after the other
+    :param repeat: Number of runs
+    :param min_time: Minimal duration of a run
+    :return: The average duration of a loop, for each run
+    """
+    # Calibrate the number of loops per run
+    loops = 1
+    while True:
+        start = perf_counter()
+        for _ in range(loops):
+            for item in inputs:
+                method(item)
+        duration = perf_counter() - start
+        if duration >= min_time:
+            break
+        loops *= 2 if duration <= 0 else max(2, int(min_time / duration) + 1)
+
+    timings = [duration / loops]
+    for _ in range(repeat - 1):
+        start = perf_counter()
+        for _ in range(loops):
+            for item in inputs:
+                method(item)
+        timings.append((perf_counter() - start) / loops)
+
+    return timings
+
+
+def run_benchmarks(
+    workloads, engines=None, pattern="*", repeat=5, min_time=0.2, log=None
+):
+    # type: (List[Workload], Optional[List[str]], str, int, float, Optional[Callable[[str], None]]) -> Dict[str, Any]
+    """
+    Runs the benchmarks matching the given pattern
+
+    :param workloads: Workloads to use
+    :param engines: Names of the engines to benchmark (all by default)
+    :param pattern: Pattern (fnmatch) of the benchmarks names to run
+    :param repeat: Number of runs of each benchmark
+    :param min_time: Minimal duration of a run
+    :param log: Method to call to print the progress
+    :return: The results, as a dictionary
+    """
+    results = []  # type: List[Dict[str, Any]]
+    skipped = []  # type: List[Dict[str, str]]
+    for engine in sorted(engines or ENGINES):
+        prepare, method, processed = ENGINES[engine]
+        for workload in workloads:
+            result_name = "{0}:{1}".format(engine, workload.name)
+            if not fnmatch.fnmatch(result_name, pattern):
+                continue
+
+            try:
+                inputs = [prepare(payload) for payload in workload.payloads]
+                size = sum(processed(item, method(item)) for item in inputs)
+            except Exception as ex:
+                # The engine doesn't support this workload
+                skipped.append({"name": result_name, "reason": repr(ex)})
+                continue
+
+            result = BenchmarkResult(
+                engine,
+                workload,
+                measure(method, inputs, repeat, min_time),
+                size,
+            ).to_dict()
+            results.append(result)
+            if log is not None:
+                log(
+                    "{name:<55} {ops_per_sec:>12.1f} ops/s "
+                    "{mb_per_sec:>9.3f} MB/s".format(**result)
+                )
+
+    return {
+        "format": RESULTS_FORMAT,
+        "format_version": RESULTS_FORMAT_VERSION,
+        "metadata": _metadata(),
+        "settings": {"repeat": repeat, "min_time": min_time},
+        "results": sorted(results, key=lambda result: result["name"]),
+        "skipped": sorted(skipped, key=lambda entry: entry["name"]),
+    }
+
+
+def _metadata():
+    # type: () -> Dict[str, Any]
+    """
+    Describes the environment of the benchmark
+    """
+    try:
+        commit = (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.STDOUT,
+            )
+            .decode("ascii")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "javaobj_version": javaobj.__version__,
+        "git_commit": commit,
+        "python_version": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+    }
+
+
+def compare(baseline, current):
+    # type: (Dict[str, Any], Dict[str, Any]) -> List[str]
+    """
+    Compares two sets of results
+
+    :param baseline: Reference results
+    :param current: New results
+    :return: The lines of the comparison report
+    """
+    previous = dict(
+        (result["name"], result) for result in baseline["results"]
+    )
+    lines = [
+        "{0:<55} {1:>12} {2:>12} {3:>8}".format(
+            "benchmark", "base ops/s", "new ops/s", "ratio"
+        )
+    ]
+    for result in current["results"]:
+        try:
+            base = previous[result["name"]]
+        except KeyError:
+            continue
+
+        lines.append(
+            "{0:<55} {1:>12.1f} {2:>12.1f} {3:>7.2f}x".format(
+                result["name"],
+                base["ops_per_sec"],
+                result["ops_per_sec"],
+                result["ops_per_sec"] / base["ops_per_sec"],
+            )
+        )
+
+    return lines
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """
+    Entry point of the benchmark suite
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Measures the throughput of the javaobj parsers",
+    )
+    parser.add_argument(
+        "-o", "--output", help="JSON file where to store the results"
+    )
+    parser.add_argument(
+        "-c", "--compare", help="JSON results file to compare with"
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        default="*",
+        help="Pattern of the benchmarks to run, e.g. 'v2.loads:synthetic/*'",
+    )
+    parser.add_argument(
+        "-e",
+        "--engine",
+        action="append",
+        choices=sorted(ENGINES),
+        help="Engine to benchmark (can be repeated, defaults to all)",
+    )
+    parser.add_argument(
+        "-s",
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Size factor of the synthetic workloads",
+    )
+    parser.add_argument(
+        "--no-corpus",
+        action="store_true",
+        help="Don't benchmark the sample streams of the tests folder",
+    )
+    parser.add_argument(
+        "--no-synthetic",
+        action="store_true",
+        help="Don't benchmark the synthetic workloads",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=5, help="Number of runs"
+    )
+    parser.add_argument(
+        "-t",
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimal duration of a run, in seconds",
+    )
+    args = parser.parse_args(argv)
+
+    # The parsers log errors on unsupported samples
+    logging.disable(logging.CRITICAL)
+
+    workloads = []  # type: List[Workload]
+    if not args.no_corpus:
+        workloads.extend(corpus_workloads())
+    if not args.no_synthetic:
+        workloads.extend(synthetic_workloads(args.scale))
+
+    results = run_benchmarks(
+        workloads,
+        args.engine,
+        args.filter,
+        args.repeat,
+        args.min_time,
+        lambda line: print(line, file=sys.stderr),
+    )
+
+    if args.output:
+        with open(args.output, "w") as filep:
+            json.dump(results, filep, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as filep:
+            baseline = json.load(filep)
+        print("\n".join(compare(baseline, results)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/python
+# -- Content-Encoding: UTF-8 --
+"""
+Workloads used by the benchmark suite: the sample streams of the tests folder
+and parametric synthetic streams, written by javaobj.generator
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+# Standard library
+from io import BytesIO
+from typing import Any, Dict, List, Optional  # noqa: F401
+import glob
+import os
+
+# Javaobj
+from javaobj import generator
+
+# ------------------------------------------------------------------------------
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# Folder containing the sample streams
+CORPUS_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"
+)
+
+# ------------------------------------------------------------------------------
+
+
+class Workload(object):  # pylint:disable=R0205
+    """
+    A named set of serialized streams, parsed one after the other in a single
+    benchmark operation
+    """
+
+    def __init__(self, name, payloads, params=None):
+        # type: (str, List[bytes], Optional[Dict[str, Any]]) -> None
+        """
+        :param name: Name of the workload
+        :param payloads: Serialized streams of the workload
+        :param params: Parameters used to generate the workload
+        """
+        self.name = name
+        self.payloads = payloads
+        self.params = params or {}
+
+    def __str__(self):
+        return "[workload {0}: {1} payloads, {2} bytes]".format(
+            self.name, len(self.payloads), self.size
+        )
+
+    __repr__ = __str__
+
+    @property
+    def size(self):
+        # type: () -> int
+        """
+        Total size of the payloads
+        """
+        return sum(len(payload) for payload in self.payloads)
+
+
+def corpus_workloads(folder=CORPUS_FOLDER):
+    # type: (str) -> List[Workload]
+    """
+    Prepares a workload for each sample stream of the given folder
+
+    :param folder: Folder containing .ser files
+    :return: A list of workloads, sorted by name
+    """
+    workloads = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.ser"))):
+        with open(path, "rb") as filep:
+            data = filep.read()
+
+        workloads.append(
+            Workload("corpus/" + os.path.basename(path), [data])
+        )
+
+    return workloads
+
+
+# ------------------------------------------------------------------------------
+
+
+def _generate(method, *args, **kwargs):
+    """
+    Writes a stream with the given generator method
+
+    :param method: A write_* method of the generator module
+    :param args: Arguments of the method, after the stream writer
+    :param kwargs: Keyword arguments of the method
+    :return: The serialized stream
+    """
+    output = BytesIO()
+    method(generator.JavaStreamWriter(output), *args, **kwargs)
+    return output.getvalue()
+
+
+def wide_objects(fields=200, count=100):
+    # type: (int, int) -> Workload
+    """
+    Instances of a class with many primitive and string fields
+    """
+    signatures = ("I", "J", "D", "Z", "Ljava/lang/String;")
+    payload = _generate(
+        generator.write_instances,
+        count,
+        [signatures[i % len(signatures)] for i in range(fields)],
+        class_name="bench.Wide",
+    )
+    return Workload(
+        "synthetic/wide_objects",
+        [payload],
+        {"fields": fields, "count": count},
+    )
+
+
+def deep_graph(depth=100):
+    # type: (int) -> Workload
+    """
+    A linked list of nodes, each node being a field of the previous one
+    """
+    return Workload(
+        "synthetic/deep_graph",
+        [_generate(generator.write_linked_list, depth)],
+        {"depth": depth},
+    )
+
+
+def object_graph(nodes=10000, back_reference_density=0.2):
+    # type: (int, float) -> Workload
+    """
+    A binary graph of nodes with references to previous nodes
+    """
+    return Workload(
+        "synthetic/object_graph",
+        [
+            _generate(
+                generator.write_graph, nodes, back_reference_density, seed=0
+            )
+        ],
+        {"nodes": nodes, "back_reference_density": back_reference_density},
+    )
+
+
+def primitive_arrays(size=100000):
+    # type: (int) -> Workload
+    """
+    Large arrays of integers, doubles and bytes
+    """
+
+    def write_array(writer, signature, items):
+        writer.write_array(signature, items)
+
+    payloads = [
+        _generate(write_array, "[I", range(size)),
+        _generate(write_array, "[D", [idx * 0.5 for idx in range(size)]),
+        _generate(write_array, "[B", [idx % 128 for idx in range(size)]),
+    ]
+    return Workload("synthetic/primitive_arrays", payloads, {"size": size})
+
+
+def string_map(entries=1000, length=32):
+    # type: (int, int) -> Workload
+    """
+    A HashMap of strings to strings
+    """
+
+    def write_map(writer):
+        writer.write_hash_map(
+            (
+                "key-{0}".format(idx).ljust(length),
+                "value-{0}".format(idx).ljust(length),
+            )
+            for idx in range(entries)
+        )
+
+    return Workload(
+        "synthetic/string_map",
+        [_generate(write_map)],
+        {"entries": entries, "length": length},
+    )
+
+
+def reset_segments(count=10000, reset_every=100):
+    # type: (int, int) -> Workload
+    """
+    Many small instances, with a TC_RESET at regular intervals
+    """
+    return Workload(
+        "synthetic/reset_segments",
+        [
+            _generate(
+                generator.write_instances,
+                count,
+                ("I", "J", "Ljava/lang/String;"),
+                class_name="bench.Message",
+                reset_every=reset_every,
+            )
+        ],
+        {"count": count, "reset_every": reset_every},
+    )
+
+
+def small_messages(count=1000):
+    # type: (int) -> Workload
+    """
+    Many independent streams, each containing a small object
+    """
+    class_spec = generator.ClassSpec(
+        "bench.Message",
+        [("id", "I"), ("timestamp", "J"), ("name", "Ljava/lang/String;")],
+    )
+
+    def write_message(writer, idx):
+        writer.write_object(
+            class_spec,
+            {
+                "id": idx,
+                "timestamp": 1577836800000 + idx,
+                "name": "message-{0}".format(idx),
+            },
+        )
+
+    payloads = [_generate(write_message, idx) for idx in range(count)]
+    return Workload("synthetic/small_messages", payloads, {"count": count})
+
+
+def synthetic_workloads(scale=1.0):
+    # type: (float) -> List[Workload]
+    """
+    Prepares the synthetic workloads
+
+    :param scale: Factor applied to the size of the workloads
+    :return: A list of workloads
+    """
+
+    def scaled(value):
+        return max(1, int(value * scale))
+
+    return [
+        wide_objects(fields=200, count=scaled(100)),
+        deep_graph(depth=scaled(100)),
+        object_graph(nodes=scaled(10000)),
+        primitive_arrays(size=scaled(100000)),
+        string_map(entries=scaled(1000)),
+        reset_segments(count=scaled(10000)),
+        small_messages(count=scaled(1000)),
+    ]
@@ -0,0 +1,844 @@
+#!/usr/bin/env python3
+"""
+Generates synthetic Java serialization streams, as written by
+``ObjectOutputStream``, without requiring a Java runtime.
+
+The ``JavaStreamWriter`` writes the stream items directly to a file-like
+object, so that the output can be as large as needed without being kept in
+memory. The ``write_*`` functions of this module use it to write streams of
+configurable shapes: instances of a class, collections, graphs with back
+references, long strings and reset segments.
+
+Sample usage::
+
+    python -m javaobj.generator instances --count 1000000 big.ser
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+# Standard library
+from typing import (  # noqa: F401
+    Any,
+    Dict,
+    IO,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+import argparse
+import random
+import struct
+import sys
+
+# Javaobj
+from .constants import (
+    ClassDescFlags,
+    StreamConstants,
+    TerminalCode,
+    TypeCode,
+    PRIMITIVE_TYPES,
+)
+from .modifiedutf8 import encode_modified_utf8
+from .utils import UNICODE_TYPE, to_unicode
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Struct format of each primitive type code
+PRIMITIVE_FORMATS = {
+    TypeCode.TYPE_BYTE: "b",
+    TypeCode.TYPE_CHAR: "H",
+    TypeCode.TYPE_DOUBLE: "d",
+    TypeCode.TYPE_FLOAT: "f",
+    TypeCode.TYPE_INTEGER: "i",
+    TypeCode.TYPE_LONG: "q",
+    TypeCode.TYPE_SHORT: "h",
+    TypeCode.TYPE_BOOLEAN: "?",
+}
+
+# Number of primitive array elements packed at once
+ARRAY_CHUNK_SIZE = 8192
+
+# ------------------------------------------------------------------------------
+
+
+class ClassSpec(object):  # pylint:disable=R0205
+    """
+    Description of a class to write in the stream
+    """
+
+    def __init__(
+        self,
+        name,
+        fields=(),
+        flags=ClassDescFlags.SC_SERIALIZABLE,
+        serial_version_uid=1,
+        super_class=None,
+    ):
+        # type: (str, Sequence[Tuple[str, str]], int, int, Optional[ClassSpec]) -> None
+        """
+        :param name: Name of the class
+        :param fields: List of (name, signature) tuples, where the signature
+                       is a JVM type signature ("I", "Ljava/lang/String;",
+                       "[B", ...)
+        :param flags: Class description flags
+        :param serial_version_uid: Serial version UID
+        :param super_class: Class specification of the parent class
+        """
+        self.name = name
+        self.fields = tuple(fields)
+        self.flags = flags
+        self.serial_version_uid = serial_version_uid
+        self.super_class = super_class
+
+    def __str__(self):
+        return "[class spec {0}]".format(self.name)
+
+    __repr__ = __str__
+
+    def get_hierarchy(self):
+        # type: () -> List[ClassSpec]
+        """
+        Returns the class hierarchy, from the top parent class to this one
+        """
+        classes = []  # type: List[ClassSpec]
+        spec = self  # type: Optional[ClassSpec]
+        while spec is not None:
+            classes.append(spec)
+            spec = spec.super_class
+
+        classes.reverse()
+        return classes
+
+
+class Instance(object):  # pylint:disable=R0205
+    """
+    Value of an object field or an annotation describing an instance to write
+    """
+
+    def __init__(self, class_spec, values=None, annotations=None):
+        # type: (ClassSpec, Optional[Mapping[str, Any]], Optional[Sequence[Any]]) -> None
+        """
+        :param class_spec: Class of the instance
+        :param values: Field name -> value
+        :param annotations: Contents written after the fields of the class,
+                            if it has the SC_WRITE_METHOD flag
+        """
+        self.class_spec = class_spec
+        self.values = values or {}
+        self.annotations = annotations or ()
+
+
+class Array(object):  # pylint:disable=R0205
+    """
+    Value of an object field or an annotation describing an array to write
+    """
+
+    def __init__(self, signature, items):
+        # type: (str, Sequence[Any]) -> None
+        """
+        :param signature: Type signature of the array ("[I", "[Ljava/...;")
+        :param items: Content of the array
+        """
+        self.signature = signature
+        self.items = items
+
+
+class Reference(object):  # pylint:disable=R0205
+    """
+    Value of an object field or an annotation referencing a previously written
+    content by its handle
+    """
+
+    def __init__(self, handle):
+        # type: (int) -> None
+        """
+        :param handle: Handle of the referenced content
+        """
+        self.handle = handle
+
+
+class BlockData(object):  # pylint:disable=R0205
+    """
+    Annotation describing a block of raw data
+    """
+
+    def __init__(self, data):
+        # type: (bytes) -> None
+        """
+        :param data: Content of the block
+        """
+        self.data = data
+
+
+# ------------------------------------------------------------------------------
+
+# Classes of the standard collections
+ARRAY_LIST_CLASS = ClassSpec(
+    "java.util.ArrayList",
+    [("size", "I")],
+    ClassDescFlags.SC_SERIALIZABLE | ClassDescFlags.SC_WRITE_METHOD,
+    8683452581122892189,
+)
+
+HASH_MAP_CLASS = ClassSpec(
+    "java.util.HashMap",
+    [("loadFactor", "F"), ("threshold", "I")],
+    ClassDescFlags.SC_SERIALIZABLE | ClassDescFlags.SC_WRITE_METHOD,
+    362498820763181265,
+)
+
+HASH_SET_CLASS = ClassSpec(
+    "java.util.HashSet",
+    (),
+    ClassDescFlags.SC_SERIALIZABLE | ClassDescFlags.SC_WRITE_METHOD,
+    -5024744406713321676,
+)
+
+# ------------------------------------------------------------------------------
+
+
+class JavaStreamWriter(object):  # pylint:disable=R0205
+    """
+    Writes the items of a Java serialization stream to a file-like object
+    """
+
+    def __init__(self, fd, write_header=True):
+        # type: (IO[bytes], bool) -> None
+        """
+        :param fd: Output file-like object, opened in binary mode
+        :param write_header: If True, write the stream magic and version
+        """
+        self.__fd = fd
+        self.__current_handle = StreamConstants.BASE_REFERENCE_IDX.value
+        self.__class_handles = {}  # type: Dict[int, int]
+        self.__classes = []  # type: List[ClassSpec]
+
+        if write_header:
+            self._write(
+                ">HH",
+                StreamConstants.STREAM_MAGIC,
+                StreamConstants.STREAM_VERSION,
+            )
+
+    @property
+    def next_handle(self):
+        # type: () -> int
+        """
+        The handle that will be assigned to the next new content
+        """
+        return self.__current_handle
+
+    def _write(self, struct_format, *args):
+        """
+        Writes packed values to the output
+
+        :param struct_format: A struct format string
+        :param args: Values to pack
+        """
+        self.__fd.write(struct.pack(struct_format, *args))
+
+    def _new_handle(self):
+        # type: () -> int
+        """
+        Returns a new handle value
+        """
+        handle = self.__current_handle
+        self.__current_handle += 1
+        return handle
+
+    def write_reset(self):
+        """
+        Writes a TC_RESET: all previous handles are forgotten
+        """
+        self._write(">B", TerminalCode.TC_RESET)
+        self.__current_handle = StreamConstants.BASE_REFERENCE_IDX.value
+        self.__class_handles.clear()
+        del self.__classes[:]
+
+    def write_null(self):
+        """
+        Writes a null reference
+        """
+        self._write(">B", TerminalCode.TC_NULL)
+
+    def write_reference(self, handle):
+        # type: (int) -> None
+        """
+        Writes a reference to a previous content
+
+        :param handle: Handle of the referenced content
+        """
+        self._write(">Bi", TerminalCode.TC_REFERENCE, handle)
+
+    def write_utf(self, text):
+        # type: (str) -> None
+        """
+        Writes a string without type code nor handle, like a class name
+
+        :param text: The string to write
+        """
+        data = encode_modified_utf8(to_unicode(text))
+        self._write(">H", len(data))
+        self.__fd.write(data)
+
+    def write_string(self, text):
+        # type: (str) -> int
+        """
+        Writes a new string, as a TC_LONGSTRING if it is too large for a
+        TC_STRING
+
+        :param text: The string to write
+        :return: The handle of the string
+        """
+        data = encode_modified_utf8(to_unicode(text))
+        if len(data) > 0xFFFF:
+            self._write(">Bq", TerminalCode.TC_LONGSTRING, len(data))
+        else:
+            self._write(">BH", TerminalCode.TC_STRING, len(data))
+
+        self.__fd.write(data)
+        return self._new_handle()
+
+    def write_block_data(self, data):
+        # type: (bytes) -> None
+        """
+        Writes a block of raw data
+
+        :param data: The content of the block
+        """
+        if len(data) <= 0xFF:
+            self._write(">BB", TerminalCode.TC_BLOCKDATA, len(data))
+        else:
+            self._write(">Bi", TerminalCode.TC_BLOCKDATALONG, len(data))
+
+        self.__fd.write(data)
+
+    def write_class_desc(self, class_spec):
+        # type: (Optional[ClassSpec]) -> Optional[int]
+        """
+        Writes a class description, or a reference to it if it has already
+        been written since the last reset
+
+        :param class_spec: Class to describe (None for a null description)
+        :return: The handle of the class description
+        """
+        if class_spec is None:
+            self.write_null()
+            return None
+
+        try:
+            handle = self.__class_handles[id(class_spec)]
+        except KeyError:
+            pass
+        else:
+            self.write_reference(handle)
+            return handle
+
+        self._write(">B", TerminalCode.TC_CLASSDESC)
+        self.write_utf(class_spec.name)
+        self._write(">q", class_spec.serial_version_uid)
+        handle = self._new_handle()
+        self.__class_handles[id(class_spec)] = handle
+        # Keep the specification alive while its id() is used as key
+        self.__classes.append(class_spec)
+
+        self._write(">Bh", class_spec.flags, len(class_spec.fields))
+        for name, signature in class_spec.fields:
+            self._write(">B", ord(signature[0]))
+            self.write_utf(name)
+            if ord(signature[0]) not in PRIMITIVE_TYPES:
+                self.write_string(signature)
+
+        # No class annotation
+        self._write(">B", TerminalCode.TC_ENDBLOCKDATA)
+        self.write_class_desc(class_spec.super_class)
+        return handle
+
+    def write_object_header(self, class_spec):
+        # type: (ClassSpec) -> int
+        """
+        Writes the beginning of an instance of the given class: the caller
+        must then write the values of its fields and its annotations
+
+        :param class_spec: Class of the instance
+        :return: The handle of the instance
+        """
+        self._write(">B", TerminalCode.TC_OBJECT)
+        self.write_class_desc(class_spec)
+        return self._new_handle()
+
+    def write_object(self, class_spec, values=None, annotations=None):
+        # type: (ClassSpec, Optional[Mapping[str, Any]], Optional[Sequence[Any]]) -> int
+        """
+        Writes an instance of the given class
+
+        :param class_spec: Class of the instance
+        :param values: Field name -> value; missing fields are written as 0,
+                       False or null
+        :param annotations: Contents written after the fields of the classes
+                            with the SC_WRITE_METHOD flag
+        :return: The handle of the instance
+        """
+        handle = self.write_object_header(class_spec)
+        values = values or {}
+        for spec in class_spec.get_hierarchy():
+            for name, signature in spec.fields:
+                self.write_value(signature, values.get(name))
+
+            if spec.flags & ClassDescFlags.SC_WRITE_METHOD:
+                if spec is class_spec:
+                    for annotation in annotations or ():
+                        self.write_content(annotation)
+                self._write(">B", TerminalCode.TC_ENDBLOCKDATA)
+
+        return handle
+
+    def write_array(self, signature, items):
+        # type: (str, Iterable[Any]) -> int
+        """
+        Writes an array
+
+        :param signature: Type signature of the array ("[I", "[Ljava/...;")
+        :param items: Content of the array
+        :return: The handle of the array
+        """
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+
+        self._write(">B", TerminalCode.TC_ARRAY)
+        self.write_class_desc(self._array_class(signature))
+        handle = self._new_handle()
+        self._write(">i", len(items))
+
+        type_code = ord(signature[1])
+        if type_code in PRIMITIVE_TYPES:
+            item_format = PRIMITIVE_FORMATS[TypeCode(type_code)]
+            if type_code == TypeCode.TYPE_CHAR:
+                items = [ord(item) for item in items]
+
+            for idx in range(0, len(items), ARRAY_CHUNK_SIZE):
+                chunk = items[idx : idx + ARRAY_CHUNK_SIZE]
+                self._write(
+                    ">{0}{1}".format(len(chunk), item_format), *chunk
+                )
+        else:
+            for item in items:
+                self.write_content(item)
+
+        return handle
+
+    def _array_class(self, signature):
+        # type: (str) -> ClassSpec
+        """
+        Returns the (cached) class specification of an array type
+        """
+        # Java uses the binary name of the class in arrays descriptions
+        name = signature.replace("/", ".")
+        for spec in self.__classes:
+            if spec.name == name:
+                return spec
+
+        return ClassSpec(name, serial_version_uid=0)
+
+    def write_value(self, signature, value):
+        # type: (str, Any) -> None
+        """
+        Writes the value of a field
+
+        :param signature: Type signature of the field
+        :param value: The value to write
+        """
+        type_code = ord(signature[0])
+        if type_code in PRIMITIVE_TYPES:
+            if type_code == TypeCode.TYPE_CHAR:
+                value = ord(value) if value else 0
+            self._write(
+                ">" + PRIMITIVE_FORMATS[TypeCode(type_code)], value or 0
+            )
+        elif isinstance(value, (list, tuple)):
+            self.write_array(signature, value)
+        else:
+            self.write_content(value)
+
+    def write_content(self, value):
+        # type: (Any) -> Optional[int]
+        """
+        Writes an object field value or an annotation: None, a string, an
+        Instance, an Array, a Reference or a BlockData
+
+        :param value: The value to write
+        :return: The handle of the written content, if any
+        """
+        if value is None:
+            self.write_null()
+        elif isinstance(value, (str, UNICODE_TYPE)):
+            return self.write_string(value)
+        elif isinstance(value, Instance):
+            return self.write_object(
+                value.class_spec, value.values, value.annotations
+            )
+        elif isinstance(value, Array):
+            return self.write_array(value.signature, value.items)
+        elif isinstance(value, Reference):
+            self.write_reference(value.handle)
+            return value.handle
+        elif isinstance(value, BlockData):
+            self.write_block_data(value.data)
+        else:
+            raise TypeError("Can't write a {0}".format(type(value).__name__))
+
+        return None
+
+    def write_array_list(self, items):
+        # type: (Sequence[Any]) -> int
+        """
+        Writes a java.util.ArrayList
+
+        :param items: Content of the list (see write_content)
+        :return: The handle of the list
+        """
+        annotations = [BlockData(struct.pack(">i", len(items)))]
+        annotations.extend(items)
+        return self.write_object(
+            ARRAY_LIST_CLASS, {"size": len(items)}, annotations
+        )
+
+    def write_hash_map(self, items):
+        # type: (Iterable[Tuple[Any, Any]]) -> int
+        """
+        Writes a java.util.HashMap
+
+        :param items: Sequence of (key, value) tuples (see write_content)
+        :return: The handle of the map
+        """
+        items = list(items)
+        capacity = 16
+        while capacity * 0.75 < len(items):
+            capacity *= 2
+
+        annotations = [BlockData(struct.pack(">ii", capacity, len(items)))]
+        for key, value in items:
+            annotations.append(key)
+            annotations.append(value)
+
+        return self.write_object(
+            HASH_MAP_CLASS,
+            {"loadFactor": 0.75, "threshold": int(capacity * 0.75)},
+            annotations,
+        )
+
+    def write_hash_set(self, items):
+        # type: (Sequence[Any]) -> int
+        """
+        Writes a java.util.HashSet
+
+        :param items: Content of the set (see write_content)
+        :return: The handle of the set
+        """
+        capacity = 16
+        while capacity * 0.75 < len(items):
+            capacity *= 2
+
+        annotations = [
+            BlockData(struct.pack(">ifi", capacity, 0.75, len(items)))
+        ]
+        annotations.extend(items)
+        return self.write_object(HASH_SET_CLASS, None, annotations)
+
+
+# ------------------------------------------------------------------------------
+
+
+def _sample_value(signature, index):
+    # type: (str, int) -> Any
+    """
+    Computes a deterministic field value of the given type
+    """
+    type_code = ord(signature[0])
+    if type_code == TypeCode.TYPE_BOOLEAN:
+        return bool(index % 2)
+    elif type_code == TypeCode.TYPE_CHAR:
+        return chr(ord("a") + index % 26)
+    elif type_code in (TypeCode.TYPE_DOUBLE, TypeCode.TYPE_FLOAT):
+        return index * 0.5
+    elif type_code == TypeCode.TYPE_BYTE:
+        return index % 128
+    elif type_code == TypeCode.TYPE_SHORT:
+        return index % 32768
+    elif type_code == TypeCode.TYPE_INTEGER:
+        return index % 2147483648
+    elif type_code == TypeCode.TYPE_LONG:
+        return index
+    elif signature == "Ljava/lang/String;":
+        return "value-{0}".format(index)
+    elif type_code == TypeCode.TYPE_ARRAY and ord(signature[1]) in (
+        PRIMITIVE_TYPES
+    ):
+        return [_sample_value(signature[1:], index + i) for i in range(4)]
+
+    return None
+
+
+def write_instances(
+    writer, count, field_types=("I", "J", "Ljava/lang/String;"), **kwargs
+):
+    # type: (JavaStreamWriter, int, Sequence[str], Any) -> None
+    """
+    Writes instances of a class as top-level contents
+
+    :param writer: The stream writer
+    :param count: Number of instances
+    :param field_types: Type signatures of the fields of the class
+    :param class_name: Name of the class
+    :param reset_every: Write a TC_RESET after this number of instances
+    """
+    class_spec = ClassSpec(
+        kwargs.get("class_name", "generator.Instance"),
+        [
+            ("field{0}".format(idx), signature)
+            for idx, signature in enumerate(field_types)
+        ],
+    )
+    reset_every = kwargs.get("reset_every", 0)
+
+    for idx in range(count):
+        if reset_every and idx and idx % reset_every == 0:
+            writer.write_reset()
+
+        writer.write_object(
+            class_spec,
+            dict(
+                (name, _sample_value(signature, idx))
+                for name, signature in class_spec.fields
+            ),
+        )
+
+
+def write_collection(writer, kind, size):
+    # type: (JavaStreamWriter, str, int) -> None
+    """
+    Writes a collection of strings as a top-level content
+
+    :param writer: The stream writer
+    :param kind: Kind of collection: "list", "map" or "set"
+    :param size: Number of elements in the collection
+    """
+    if kind == "list":
+        writer.write_array_list(
+            ["item-{0}".format(idx) for idx in range(size)]
+        )
+    elif kind == "set":
+        writer.write_hash_set(["item-{0}".format(idx) for idx in range(size)])
+    elif kind == "map":
+        writer.write_hash_map(
+            ("key-{0}".format(idx), "value-{0}".format(idx))
+            for idx in range(size)
+        )
+    else:
+        raise ValueError("Unknown kind of collection: {0}".format(kind))
+
+
+# Class of the nodes written by write_graph and write_linked_list
+NODE_CLASS = ClassSpec(
+    "generator.Node",
+    [
+        ("id", "I"),
+        ("left", "Lgenerator/Node;"),
+        ("right", "Lgenerator/Node;"),
+    ],
+)
+
+
+def write_graph(writer, nodes, back_reference_density=0.1, seed=0):
+    # type: (JavaStreamWriter, int, float, int) -> None
+    """
+    Writes a binary graph of nodes as a top-level content.
+
+    Each child of a node is either a reference to a previous node (with the
+    given probability), a new node or null when all nodes have been written.
+    The nesting depth is not limited by the Python stack.
+
+    :param writer: The stream writer
+    :param nodes: Number of nodes in the graph
+    :param back_reference_density: Probability of a child to be a reference
+                                   to a previous node
+    :param seed: Seed of the random generator
+    """
+    rng = random.Random(seed)
+    handles = []  # type: List[int]
+    remaining = nodes
+
+    # Nodes are written in pre-order: a stack of children slots is enough
+    stack = [None]  # type: List[Optional[int]]
+    while stack:
+        stack.pop()
+        if handles and rng.random() < back_reference_density:
+            writer.write_reference(rng.choice(handles))
+        elif remaining > 0:
+            # New node: its fields are written in order, the children slots
+            # are handled by the next iterations
+            handles.append(writer.write_object_header(NODE_CLASS))
+            writer.write_value("I", nodes - remaining)
+            remaining -= 1
+            stack.extend((None, None))
+        else:
+            writer.write_null()
+
+
+def write_linked_list(writer, length):
+    # type: (JavaStreamWriter, int) -> None
+    """
+    Writes a chain of nodes, each node being the left child of the previous
+    one, as a top-level content
+
+    :param writer: The stream writer
+    :param length: Number of nodes in the chain
+    """
+    for idx in range(length):
+        # The left child is the next node
+        writer.write_object_header(NODE_CLASS)
+        writer.write_value("I", idx)
+
+    # Last left child, then all the right children
+    for _ in range(length + 1):
+        writer.write_null()
+
+
+def write_long_strings(writer, count, length):
+    # type: (JavaStreamWriter, int, int) -> None
+    """
+    Writes strings as top-level contents
+
+    :param writer: The stream writer
+    :param count: Number of strings
+    :param length: Length of each string
+    """
+    for idx in range(count):
+        prefix = "{0}:".format(idx)
+        writer.write_string(prefix + "x" * max(0, length - len(prefix)))
+
+
+# ------------------------------------------------------------------------------
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """
+    Writes a synthetic stream to a file
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m javaobj.generator",
+        description="Writes a synthetic Java serialization stream",
+    )
+    parser.add_argument(
+        "shape",
+        choices=(
+            "instances",
+            "list",
+            "map",
+            "set",
+            "graph",
+            "chain",
+            "strings",
+        ),
+        help="Shape of the top-level contents",
+    )
+    parser.add_argument("output", help="Output file")
+    parser.add_argument(
+        "-n",
+        "--count",
+        type=int,
+        default=1,
+        help="Number of top-level contents",
+    )
+    parser.add_argument(
+        "-s",
+        "--size",
+        type=int,
+        default=1000,
+        help="Size of each collection, graph, chain or string",
+    )
+    parser.add_argument(
+        "-f",
+        "--fields",
+        default="I,J,Ljava/lang/String;",
+        help="Comma-separated type signatures of the instances fields",
+    )
+    parser.add_argument(
+        "-b",
+        "--back-references",
+        type=float,
+        default=0.1,
+        help="Back reference density of graphs",
+    )
+    parser.add_argument(
+        "-r",
+        "--reset-every",
+        type=int,
+        default=0,
+        help="Write a TC_RESET every N top-level contents",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.output, "wb") as output:
+        writer = JavaStreamWriter(output)
+        if args.shape == "instances":
+            write_instances(
+                writer,
+                args.count,
+                args.fields.split(","),
+                reset_every=args.reset_every,
+            )
+            return 0
+
+        for idx in range(args.count):
+            if args.reset_every and idx and idx % args.reset_every == 0:
+                writer.write_reset()
+
+            if args.shape in ("list", "map", "set"):
+                write_collection(writer, args.shape, args.size)
+            elif args.shape == "graph":
+                write_graph(writer, args.size, args.back_references, idx)
+            elif args.shape == "chain":
+                write_linked_list(writer, args.size)
+            else:
+                write_long_strings(writer, 1, args.size)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -220,6 +220,14 @@ def decode_modified_utf8(data, errors="strict"):
     :return: unicode text and length
     :raises UnicodeDecodeError: sequence is invalid.
     """
+    try:
+        # ASCII text is encoded the same way
+        value = data.decode("ascii")
+    except (AttributeError, UnicodeDecodeError):
+        pass
+    else:
+        return value, len(value)
+
     value, length = "", 0
     it = iter(decoder(byte_to_int(d) for d in data))
     while True:
@@ -240,6 +248,43 @@ def decode_modified_utf8(data, errors="strict"):
     return value, length
 
 
+def encode_modified_utf8(text):
+    """
+    Encodes a unicode text using Modified UTF-8, as done by the
+    ``DataOutput.writeUTF()`` Java method: the null character is encoded on
+    two bytes and supplementary characters are encoded as surrogate pairs.
+
+    :param text: a unicode string
+    :return: the Modified UTF-8 bytes
+    """
+    if "\x00" not in text and (not text or max(text) < "\ud800"):
+        # Standard UTF-8 is equivalent
+        return text.encode("utf-8")
+
+    result = bytearray()
+    for char in text:
+        code = ord(char)
+        if code > 0xFFFF:
+            # Surrogate pair
+            code -= 0x10000
+            units = (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+        else:
+            units = (code,)
+
+        for unit in units:
+            if 0 < unit < 0x80:
+                result.append(unit)
+            elif unit < 0x800:
+                result.append(0xC0 | (unit >> 6))
+                result.append(0x80 | (unit & 0x3F))
+            else:
+                result.append(0xE0 | (unit >> 12))
+                result.append(0x80 | ((unit >> 6) & 0x3F))
+                result.append(0x80 | (unit & 0x3F))
+
+    return bytes(result)
+
+
 def mutf8_unichr(value):
     """
     Mimics Python 2 unichr() and Python 3 chr()
@@ -3,7 +3,8 @@
 """
 Provides utility methods used by the core implementation of javaobj.
 
-Namely: logging methods, bytes/str/unicode converters
+Namely: logging methods, bytes/str/unicode converters, forward-only stream
+reader
 
 :authors: Thomas Calmant
 :license: Apache License 2.0
@@ -30,7 +31,9 @@ Namely: logging methods, bytes/str/unicode converters
 from __future__ import absolute_import
 
 # Standard library
-from typing import Tuple  # noqa: F401
+from types import GeneratorType
+from typing import Any, Optional, Tuple  # noqa: F401
+import binascii
 import logging
 import struct
 import sys
@@ -107,30 +110,70 @@ def read_string(data, length_fmt="H"):
 # ------------------------------------------------------------------------------
 
 
-def hexdump(src, start_offset=0, length=16):
-    # type: (str, int, int) -> str
+# Translation of the bytes to the characters shown by hexdump()
+_HEX_FILTER = bytes(
+    bytearray(
+        (len(repr(chr(x))) == 3) and x or ord(".") for x in range(256)
+    )
+)
+
+if sys.version_info >= (3, 8):
+
+    def _hexlify(data):
+        # type: (bytes) -> str
+        """
+        Returns the hexadecimal values of the given bytes, separated by spaces
+        """
+        return binascii.hexlify(data, b" ").decode("ascii").upper()
+
+
+else:
+
+    def _hexlify(data):
+        # type: (bytes) -> str
+        """
+        Returns the hexadecimal values of the given bytes, separated by spaces
+        """
+        hexa = binascii.hexlify(data).decode("ascii").upper()
+        return " ".join(hexa[i : i + 2] for i in range(0, len(hexa), 2))
+
+
+def hexdump(src, start_offset=0, length=16, max_size=None):
+    # type: (Any, int, int, Optional[int]) -> str
     """
     Prepares an hexadecimal dump string
 
     :param src: A string containing binary data
     :param start_offset: The start offset of the source
     :param length: Length of a dump line
+    :param max_size: Maximum number of bytes to dump (None for all)
     :return: A dump string
     """
-    hex_filter = "".join(
-        (len(repr(chr(x))) == 3) and chr(x) or "." for x in range(256)
-    )
     pattern = "{{0:04X}}   {{1:<{0}}}  {{2}}\n".format(length * 3)
 
-    # Convert raw data to str (Python 3 compatibility)
-    src = to_str(src, "latin-1")
+    # Convert str to raw data (Python 3 compatibility)
+    src = to_bytes(src, "latin-1")
+    remaining = 0
+    if max_size is not None and len(src) > max_size:
+        remaining = len(src) - max_size
+        src = src[:max_size]
+
+    # Each byte takes 3 characters in the hexadecimal string
+    hexa = _hexlify(src)
+    printable = src.translate(_HEX_FILTER).decode("latin-1")
 
     result = []
     for i in range(0, len(src), length):
-        s = src[i : i + length]
-        hexa = " ".join("{0:02X}".format(ord(x)) for x in s)
-        printable = s.translate(hex_filter)
-        result.append(pattern.format(i + start_offset, hexa, printable))
+        result.append(
+            pattern.format(
+                i + start_offset,
+                hexa[i * 3 : (i + length) * 3 - 1],
+                printable[i : i + length],
+            )
+        )
+
+    if remaining:
+        result.append("... {0} more bytes\n".format(remaining))
 
     return "".join(result)
 
@@ -138,6 +181,260 @@ def hexdump(src, start_offset=0, length=16):
 # ------------------------------------------------------------------------------
 
 
+def is_seekable(fd):
+    # type: (Any) -> bool
+    """
+    Checks if the given file object supports tell() and seek()
+
+    :param fd: A file-like object
+    :return: True if the file object can be seeked
+    """
+    try:
+        return fd.seekable()
+    except AttributeError:
+        # Old-style file object: try to get the position
+        try:
+            fd.tell()
+            return True
+        except (AttributeError, IOError, OSError, ValueError):
+            return False
+
+
+class ForwardReader(object):  # pylint:disable=R0205
+    """
+    File-like wrapper of a forward-only stream, like a pipe, a socket file
+    or an HTTP response body.
+
+    It keeps track of the offset of the data read, and reads the stream by
+    blocks of data kept in a buffer. Up to history_size bytes already read
+    are kept in that buffer too: peek(), unread() and seek() can move the
+    position within the buffer without reading the stream again.
+    """
+
+    def __init__(self, fd, history_size=65536, block_size=65536):
+        # type: (Any, int, int) -> None
+        """
+        :param fd: The forward-only input stream
+        :param history_size: Number of bytes already read which can be read
+                             again after unread() or seek()
+        :param block_size: Size of the reads made on the stream
+        """
+        self.__fd = fd
+        self.__history_size = history_size
+        self.__block_size = block_size
+
+        # Read only the available data, to avoid blocking on pipes/sockets
+        self.__read = getattr(fd, "read1", fd.read)
+
+        # Buffered data, offset of its first byte in the stream and position
+        # of the next byte to read in it
+        self.__data = b""
+        self.__base = 0
+        self.__pos = 0
+        self.__eof = False
+
+    @property
+    def file_descriptor(self):
+        # type: () -> Any
+        """
+        The underlying stream
+        """
+        return self.__fd
+
+    def __fill(self, size):
+        # type: (int) -> None
+        """
+        Reads the stream until at least the given number of bytes are
+        available after the current position, or until its end
+
+        :param size: Number of bytes needed (-1 for the whole stream)
+        """
+        # Drop the bytes beyond the history
+        keep = max(0, self.__pos - self.__history_size)
+        chunks = [self.__data[keep:]]
+        available = len(chunks[0]) - (self.__pos - keep)
+
+        while (size < 0 or available < size) and not self.__eof:
+            chunk = self.__read(max(size - available, self.__block_size))
+            if not chunk:
+                self.__eof = True
+            else:
+                chunks.append(chunk)
+                available += len(chunk)
+
+        self.__data = b"".join(chunks)
+        self.__base += keep
+        self.__pos -= keep
+
+    def read(self, size=-1):
+        # type: (int) -> bytes
+        """
+        Reads data from the stream
+
+        :param size: Number of bytes to read (-1 to read up to the end of
+                     the stream)
+        :return: The bytes read, fewer than requested at the end of the
+                 stream
+        """
+        pos = self.__pos
+        end = pos + size
+        if size < 0 or end > len(self.__data):
+            self.__fill(size)
+            pos = self.__pos
+            end = len(self.__data) if size < 0 else pos + size
+
+        data = self.__data[pos:end]
+        self.__pos = pos + len(data)
+        return data
+
+    def peek(self, size):
+        # type: (int) -> bytes
+        """
+        Returns the next bytes of the stream without consuming them
+
+        :param size: Number of bytes to look at
+        :return: The next bytes, fewer than requested at the end of the
+                 stream
+        """
+        if self.__pos + size > len(self.__data):
+            self.__fill(size)
+
+        return self.__data[self.__pos : self.__pos + size]
+
+    def unread(self, size):
+        # type: (int) -> None
+        """
+        Moves the position back, so that the last bytes read will be read
+        again
+
+        :param size: Number of bytes to unread
+        :raise IOError: Those bytes are not in the buffer anymore
+        """
+        self.seek(-size, 1)
+
+    def tell(self):
+        # type: () -> int
+        """
+        Returns the offset of the next byte to read in the stream
+        """
+        return self.__base + self.__pos
+
+    def seekable(self):
+        # type: () -> bool
+        """
+        The stream can only be seeked within the buffered data
+        """
+        return False
+
+    def seek(self, offset, whence=0):
+        # type: (int, int) -> int
+        """
+        Moves the position in the stream, within the buffered data or
+        forward
+
+        :param offset: Offset to move to
+        :param whence: 0 (os.SEEK_SET) for an absolute offset, 1
+                       (os.SEEK_CUR) for an offset relative to the current
+                       position
+        :return: The new position
+        :raise IOError: Can't seek before the buffered data or from the end
+                        of the stream
+        """
+        if whence == 1:
+            offset += self.tell()
+        elif whence != 0:
+            raise IOError("Can't seek from the end of a forward-only stream")
+
+        if offset < self.__base:
+            raise IOError(
+                "Can't go back to offset {0}: only the data after offset {1} "
+                "is available".format(offset, self.__base)
+            )
+
+        pos = offset - self.__base
+        if pos > len(self.__data):
+            # Skip data
+            self.__fill(pos - self.__pos)
+            pos = min(offset - self.__base, len(self.__data))
+
+        self.__pos = pos
+        return self.tell()
+
+    def close(self):
+        # type: () -> None
+        """
+        Closes the underlying stream
+        """
+        self.__fd.close()
+
+
+# ------------------------------------------------------------------------------
+
+
+def run_task(task):
+    # type: (Any) -> Any
+    """
+    Executes a parsing task without using the Python call stack to handle
+    nested contents.
+
+    A task is a generator: when it yields another generator, that sub-task is
+    executed and its result is sent back to the task; when it yields anything
+    else, that value is the result of the task (a task that stops without
+    yielding a value returns None). Exceptions raised by a sub-task are
+    thrown back into its parent task.
+
+    :param task: A task, or a value which is returned as is
+    :return: The result of the task
+    """
+    if not isinstance(task, GeneratorType):
+        return task
+
+    # Local names are faster in this loop
+    generator_type = GeneratorType
+    stack = [task]
+    push = stack.append
+    pop = stack.pop
+    send = task.send
+    result = None
+    error = None  # type: Any
+    while True:
+        try:
+            if error is None:
+                item = send(result)
+            else:
+                # Propagate the error of the sub-task to its parent
+                current_error, error = error, None
+                item = stack[-1].throw(current_error)
+        except StopIteration:
+            # The task stopped without result
+            item = None
+        except Exception as ex:  # pylint:disable=W0703
+            pop()
+            if not stack:
+                raise
+
+            error = ex
+            send = stack[-1].send
+            continue
+
+        if type(item) is generator_type:  # pylint:disable=C0123
+            # Execute the sub-task
+            push(item)
+            send = item.send
+            result = None
+        else:
+            # End of the task
+            pop()
+            if not stack:
+                return item
+
+            send = stack[-1].send
+            result = item
+
+
+# ------------------------------------------------------------------------------
+
+
 if sys.version_info[0] >= 3:
     BYTES_TYPE = bytes  # pylint:disable=C0103
     UNICODE_TYPE = str  # pylint:disable=C0103
@@ -45,7 +45,7 @@ except ImportError:
 
 # Javaobj modules
 from .marshaller import JavaObjectMarshaller
-from .unmarshaller import JavaObjectUnmarshaller
+from .unmarshaller import DUMP_WINDOW_SIZE, JavaObjectUnmarshaller
 from .transformers import DefaultObjectTransformer
 
 # ------------------------------------------------------------------------------
@@ -79,13 +79,17 @@ def load(file_object, *transformers, **kwargs):
     :param transformers: Custom transformers to use
     :param ignore_remaining_data: If True, don't log an error when unused
                                   trailing bytes are remaining
+    :param dump_window: Maximum number of bytes dumped in the logs when an
+                        error occurs or when data remains after the object
     :return: The deserialized object
     """
     # Read keyword argument
     ignore_remaining_data = kwargs.get("ignore_remaining_data", False)
 
     marshaller = JavaObjectUnmarshaller(
-        file_object, kwargs.get("use_numpy_arrays", False)
+        file_object,
+        kwargs.get("use_numpy_arrays", False),
+        kwargs.get("dump_window", DUMP_WINDOW_SIZE),
     )
 
     # Add custom transformers first
@@ -36,7 +36,8 @@ http://download.oracle.com/javase/6/docs/platform/serialization/spec/protocol.ht
 from __future__ import absolute_import
 
 # Standard library
-from typing import Any, Union
+from types import GeneratorType
+from typing import Any, Union  # noqa: F401
 import os
 import struct
 
@@ -57,9 +58,12 @@ from ..constants import (
     StreamCodeDebug,
 )
 from ..utils import (
+    ForwardReader,
+    is_seekable,
     log_debug,
     log_error,
     read_to_str,
+    run_task,
     to_unicode,
     unicode_char,
     hexdump,
@@ -67,6 +71,15 @@ from ..utils import (
 
 numpy = None  # Imported only when really used
 
+# Number of bytes looked at after an object read from a forward-only stream
+TRAILING_PEEK_SIZE = 4096
+
+# Number of bytes dumped around the position of a parsing error
+DUMP_WINDOW_SIZE = 256
+
+# Number of bytes dumped before the position of a parsing error
+DUMP_CONTEXT_SIZE = 16
+
 # ------------------------------------------------------------------------------
 
 __all__ = ("JavaObjectUnmarshaller",)
@@ -100,14 +113,23 @@ class JavaObjectUnmarshaller:
     Deserializes a Java serialization stream
     """
 
-    def __init__(self, stream, use_numpy_arrays=False):
+    def __init__(
+        self, stream, use_numpy_arrays=False, dump_window=DUMP_WINDOW_SIZE
+    ):
         """
         Sets up members
 
-        :param stream: An input stream (opened in binary/bytes mode)
+        :param stream: An input stream (opened in binary/bytes mode). If it
+                       can't be seeked (pipe, socket, ...), it is read
+                       through a ForwardReader
+        :param use_numpy_arrays: If True, load arrays as NumPy arrays
+        :param dump_window: Maximum number of bytes dumped in the logs when
+                            an error occurs or when data remains after the
+                            object
         :raise IOError: Invalid input stream
         """
         self.use_numpy_arrays = use_numpy_arrays
+        self.dump_window = dump_window
 
         # Numpy array support
         if self.use_numpy_arrays:
@@ -122,6 +144,9 @@ class JavaObjectUnmarshaller:
         if stream is None:
             raise IOError("No input stream given")
 
+        if not isinstance(stream, ForwardReader) and not is_seekable(stream):
+            stream = ForwardReader(stream)
+
         # Prepare the association Terminal Symbol -> Reading method
         self.opmap = {
             TerminalCode.TC_NULL: self.do_null,
@@ -139,6 +164,17 @@ class JavaObjectUnmarshaller:
             TerminalCode.TC_ENDBLOCKDATA: self.do_null,
         }
 
+        # Handlers of the opcodes which can contain other contents: they
+        # return a task, executed by run_task() which keeps track of the
+        # nested contents on its own stack instead of the Python one
+        self._taskmap = {
+            TerminalCode.TC_CLASSDESC: self._do_classdesc_task,
+            TerminalCode.TC_OBJECT: self._do_object_task,
+            TerminalCode.TC_ARRAY: self._do_array_task,
+            TerminalCode.TC_CLASS: self._do_class_task,
+            TerminalCode.TC_ENUM: self._do_enum_task,
+        }
+
         # Set up members
         self.current_object = None
         self.reference_counter = 0
@@ -163,19 +199,20 @@ class JavaObjectUnmarshaller:
             _, res = self._read_and_exec_opcode(ident=0)
 
             position_bak = self.object_stream.tell()
-            the_rest = self.object_stream.read()
-            if not ignore_remaining_data and len(the_rest) != 0:
+            remaining, partial = self._remaining_size()
+            if not ignore_remaining_data and remaining != 0:
                 log_error(
-                    "Warning!!!!: Stream still has {0} bytes left. "
+                    "Warning!!!!: Stream still has {0}{1} bytes left. "
                     "Enable debug mode of logging to see the hexdump.".format(
-                        len(the_rest)
+                        "at least " if partial else "", remaining
                     )
                 )
-                log_debug("\n{0}".format(hexdump(the_rest)))
+                the_rest = self.object_stream.read(self.dump_window)
+                self.object_stream.seek(position_bak)
+                log_debug("\n{0}".format(hexdump(the_rest, position_bak)))
             else:
                 log_debug("Java Object unmarshalled successfully!")
 
-            self.object_stream.seek(position_bak)
             return res
         except Exception:
             self._oops_dump_state(ignore_remaining_data)
@@ -215,6 +252,20 @@ class JavaObjectUnmarshaller:
         :raise IOError: Read opcode is not one of the expected ones
         :raise RuntimeError: Unknown opcode
         """
+        opid, res = self._read_opcode_step(ident, expect)
+        return opid, run_task(res)
+
+    def _read_opcode_step(self, ident=0, expect=None):
+        """
+        Reads the next opcode, and executes its handler or returns the task
+        reading its content if it can contain other contents (see run_task)
+
+        :param ident: Log identation level
+        :param expect: A list of expected opcodes
+        :return: A tuple: (opcode, result of the handler or task)
+        :raise IOError: Read opcode is not one of the expected ones
+        :raise RuntimeError: Unknown opcode
+        """
         position = self.object_stream.tell()
         (opid,) = self._readStruct(">B")
         log_debug(
@@ -233,14 +284,17 @@ class JavaObjectUnmarshaller:
             )
 
         try:
-            handler = self.opmap[opid]
+            handler = self._taskmap[opid]
         except KeyError:
-            raise RuntimeError(
-                "Unknown OpCode in the stream: 0x{0:X} "
-                "(at offset 0x{1:X})".format(opid, position)
-            )
-        else:
-            return opid, handler(ident=ident)
+            try:
+                handler = self.opmap[opid]
+            except KeyError:
+                raise RuntimeError(
+                    "Unknown OpCode in the stream: 0x{0:X} "
+                    "(at offset 0x{1:X})".format(opid, position)
+                )
+
+        return opid, handler(ident=ident)
 
     def _readStruct(self, unpack):
         """
@@ -280,6 +334,16 @@ class JavaObjectUnmarshaller:
         :param ident: Log indentation level
         :return: A JavaClass object
         """
+        return run_task(self._do_classdesc_task(parent, ident))
+
+    def _do_classdesc_task(self, parent=None, ident=0):
+        """
+        Task reading the content of a TC_CLASSDESC (see run_task)
+
+        :param parent:
+        :param ident: Log indentation level
+        :return: A generator, resulting in a JavaClass object
+        """
         # TC_CLASSDESC className serialVersionUID newHandle classDescInfo
         # classDescInfo:
         #   classDescFlags fields classAnnotation superClassDesc
@@ -388,7 +452,7 @@ class JavaObjectUnmarshaller:
 
         # superClassDesc
         log_debug("Reading Super Class of {0}".format(clazz.name), ident)
-        _, superclassdesc = self._read_and_exec_opcode(
+        _, superclassdesc = self._read_opcode_step(
             ident=ident + 1,
             expect=(
                 TerminalCode.TC_CLASSDESC,
@@ -396,12 +460,15 @@ class JavaObjectUnmarshaller:
                 TerminalCode.TC_REFERENCE,
             ),
         )
+        if isinstance(superclassdesc, GeneratorType):
+            superclassdesc = yield superclassdesc
+
         log_debug(
             "Super Class for {0}: {1}".format(clazz.name, str(superclassdesc)),
             ident,
         )
         clazz.superclass = superclassdesc
-        return clazz
+        yield clazz
 
     def do_blockdata(self, parent=None, ident=0):
         """
@@ -443,12 +510,22 @@ class JavaObjectUnmarshaller:
         :param ident: Log indentation level
         :return: A JavaClass object
         """
+        return run_task(self._do_class_task(parent, ident))
+
+    def _do_class_task(self, parent=None, ident=0):
+        """
+        Task reading the content of a TC_CLASS (see run_task)
+
+        :param parent:
+        :param ident: Log indentation level
+        :return: A generator, resulting in a JavaClass object
+        """
         # TC_CLASS classDesc newHandle
         log_debug("[class]", ident)
 
         # TODO: what to do with "(ClassDesc)prevObject".
         # (see 3rd line for classDesc:)
-        _, classdesc = self._read_and_exec_opcode(
+        _, classdesc = self._read_opcode_step(
             ident=ident + 1,
             expect=(
                 TerminalCode.TC_CLASSDESC,
@@ -457,9 +534,11 @@ class JavaObjectUnmarshaller:
                 TerminalCode.TC_REFERENCE,
             ),
         )
+        if isinstance(classdesc, GeneratorType):
+            classdesc = yield classdesc
         log_debug("Classdesc: {0}".format(classdesc), ident)
         self._add_reference(classdesc, ident)
-        return classdesc
+        yield classdesc
 
     def do_object(self, parent=None, ident=0):
         """
@@ -469,6 +548,16 @@ class JavaObjectUnmarshaller:
         :param ident: Log indentation level
         :return: A JavaClass object
         """
+        return run_task(self._do_object_task(parent, ident))
+
+    def _do_object_task(self, parent=None, ident=0):
+        """
+        Task reading the content of a TC_OBJECT (see run_task)
+
+        :param parent:
+        :param ident: Log indentation level
+        :return: A generator, resulting in a JavaObject
+        """
         # TC_OBJECT classDesc newHandle classdata[]  // data for each class
         java_object = JavaObject()
         log_debug("[object]", ident)
@@ -481,7 +570,7 @@ class JavaObjectUnmarshaller:
 
         # TODO: what to do with "(ClassDesc)prevObject".
         # (see 3rd line for classDesc:)
-        opcode, classdesc = self._read_and_exec_opcode(
+        opcode, classdesc = self._read_opcode_step(
             ident=ident + 1,
             expect=(
                 TerminalCode.TC_CLASSDESC,
@@ -490,6 +579,8 @@ class JavaObjectUnmarshaller:
                 TerminalCode.TC_REFERENCE,
             ),
         )
+        if isinstance(classdesc, GeneratorType):
+            classdesc = yield classdesc
         # self.TC_REFERENCE hasn't shown in spec, but actually is here
 
         # Create object
@@ -551,7 +642,9 @@ class JavaObjectUnmarshaller:
                 log_debug(
                     "Reading field: {0} - {1}".format(field_type, field_name)
                 )
-                res = self._read_value(field_type, ident, name=field_name)
+                res = self._read_value_step(field_type, ident, name=field_name)
+                if isinstance(res, GeneratorType):
+                    res = yield res
                 java_object.__setattr__(field_name, res)
 
         if (
@@ -572,7 +665,9 @@ class JavaObjectUnmarshaller:
             )
 
             while opcode != TerminalCode.TC_ENDBLOCKDATA:
-                opcode, obj = self._read_and_exec_opcode(ident=ident + 1)
+                opcode, obj = self._read_opcode_step(ident=ident + 1)
+                if isinstance(obj, GeneratorType):
+                    obj = yield obj
                 # , expect=[self.TC_ENDBLOCKDATA, self.TC_BLOCKDATA,
                 # self.TC_OBJECT, self.TC_NULL, self.TC_REFERENCE])
                 if opcode != TerminalCode.TC_ENDBLOCKDATA:
@@ -593,7 +688,7 @@ class JavaObjectUnmarshaller:
             java_object.__extra_loading__(self, ident)
 
         log_debug(">>> java_object: {0}".format(java_object), ident)
-        return java_object
+        yield java_object
 
     def do_string(self, parent=None, ident=0):
         """
@@ -629,9 +724,19 @@ class JavaObjectUnmarshaller:
         :param ident: Log indentation level
         :return: A list of deserialized objects
         """
+        return run_task(self._do_array_task(parent, ident))
+
+    def _do_array_task(self, parent=None, ident=0):
+        """
+        Task reading the content of a TC_ARRAY (see run_task)
+
+        :param parent:
+        :param ident: Log indentation level
+        :return: A generator, resulting in a list of deserialized objects
+        """
         # TC_ARRAY classDesc newHandle (int)<size> values[size]
         log_debug("[array]", ident)
-        _, classdesc = self._read_and_exec_opcode(
+        _, classdesc = self._read_opcode_step(
             ident=ident + 1,
             expect=(
                 TerminalCode.TC_CLASSDESC,
@@ -640,6 +745,8 @@ class JavaObjectUnmarshaller:
                 TerminalCode.TC_REFERENCE,
             ),
         )
+        if isinstance(classdesc, GeneratorType):
+            classdesc = yield classdesc
 
         array = JavaArray(classdesc)
 
@@ -654,7 +761,9 @@ class JavaObjectUnmarshaller:
 
         if type_code in (TypeCode.TYPE_OBJECT, TypeCode.TYPE_ARRAY):
             for _ in range(size):
-                _, res = self._read_and_exec_opcode(ident=ident + 1)
+                _, res = self._read_opcode_step(ident=ident + 1)
+                if isinstance(res, GeneratorType):
+                    res = yield res
                 log_debug("Object value: {0}".format(res), ident)
                 array.append(res)
         elif type_code == TypeCode.TYPE_BYTE:
@@ -667,11 +776,11 @@ class JavaObjectUnmarshaller:
             )
         else:
             for _ in range(size):
-                res = self._read_value(type_code, ident)
+                res = self._read_value_step(type_code, ident)
                 log_debug("Native value: {0}".format(repr(res)), ident)
                 array.append(res)
 
-        return array
+        yield array
 
     def do_reference(self, parent=None, ident=0):
         """
@@ -706,9 +815,19 @@ class JavaObjectUnmarshaller:
         :param ident: Log indentation level
         :return: A JavaEnum object
         """
+        return run_task(self._do_enum_task(parent, ident))
+
+    def _do_enum_task(self, parent=None, ident=0):
+        """
+        Task reading the content of a TC_ENUM (see run_task)
+
+        :param parent:
+        :param ident: Log indentation level
+        :return: A generator, resulting in a JavaEnum object
+        """
         # TC_ENUM classDesc newHandle enumConstantName
         enum = JavaEnum()
-        _, classdesc = self._read_and_exec_opcode(
+        _, classdesc = self._read_opcode_step(
             ident=ident + 1,
             expect=(
                 TerminalCode.TC_CLASSDESC,
@@ -717,6 +836,8 @@ class JavaObjectUnmarshaller:
                 TerminalCode.TC_REFERENCE,
             ),
         )
+        if isinstance(classdesc, GeneratorType):
+            classdesc = yield classdesc
         enum.classdesc = classdesc
         self._add_reference(enum, ident)
         (
@@ -727,7 +848,7 @@ class JavaObjectUnmarshaller:
             expect=(TerminalCode.TC_STRING, TerminalCode.TC_REFERENCE),
         )
         enum.constant = enumConstantName
-        return enum
+        yield enum
 
     def _read_value(self, raw_field_type, ident, name=""):
         # type: (Union[bytes, int, TypeCode], int, str) -> Any
@@ -740,6 +861,20 @@ class JavaObjectUnmarshaller:
         :return: The read value
         :raise RuntimeError: Unknown field type
         """
+        return run_task(self._read_value_step(raw_field_type, ident, name))
+
+    def _read_value_step(self, raw_field_type, ident, name=""):
+        # type: (Union[bytes, int, TypeCode], int, str) -> Any
+        """
+        Reads the next value, of the given type, or returns the task reading
+        it if it can contain other contents (see run_task)
+
+        :param raw_field_type: A serialization typecode
+        :param ident: Log indentation
+        :param name: Field name (for logs)
+        :return: The read value or task
+        :raise RuntimeError: Unknown field type
+        """
         if isinstance(raw_field_type, TypeCode):
             field_type = raw_field_type
         elif isinstance(raw_field_type, int):
@@ -773,7 +908,10 @@ class JavaObjectUnmarshaller:
         elif field_type == TypeCode.TYPE_DOUBLE:
             (res,) = self._readStruct(">d")
         elif field_type in (TypeCode.TYPE_OBJECT, TypeCode.TYPE_ARRAY):
-            _, res = self._read_and_exec_opcode(ident=ident + 1)
+            _, res = self._read_opcode_step(ident=ident + 1)
+            if isinstance(res, GeneratorType):
+                # The opcode handler logs the content
+                return res
         else:
             raise RuntimeError("Unknown typecode: {0}".format(field_type))
 
@@ -823,9 +961,31 @@ class JavaObjectUnmarshaller:
         )
         self.references.append(obj)
 
+    def _remaining_size(self):
+        """
+        Computes the number of bytes after the current position of the
+        stream, without reading them
+
+        :return: A tuple (number of bytes, True if there are at least that
+                 many bytes, i.e. the stream can't be seeked to its end)
+        """
+        stream = self.object_stream
+        if isinstance(stream, ForwardReader):
+            # Only look at the next bytes, which can't be read again
+            # once the buffer of the reader is full
+            size = len(stream.peek(TRAILING_PEEK_SIZE))
+            return size, size == TRAILING_PEEK_SIZE
+
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        end = stream.tell()
+        stream.seek(position)
+        return end - position, False
+
     def _oops_dump_state(self, ignore_remaining_data=False):
         """
-        Log a deserialization error
+        Log a deserialization error. Only the bytes around the current
+        position are dumped, up to the dump window size.
 
         :param ignore_remaining_data: If True, don't log an error when
                                       unused trailing bytes are remaining
@@ -833,20 +993,29 @@ class JavaObjectUnmarshaller:
         log_error("==Oops state dump" + "=" * (30 - 17))
         log_error("References: {0}".format(self.references))
         log_error(
-            "Stream seeking back at -16 byte "
-            "(2nd line is an actual position!):"
+            "Stream seeking back at -{0} byte "
+            "(2nd line is an actual position!):".format(DUMP_CONTEXT_SIZE)
         )
 
-        # Do not use a keyword argument
-        self.object_stream.seek(-16, os.SEEK_CUR)
-        position = self.object_stream.tell()
-        the_rest = self.object_stream.read()
-
-        if not ignore_remaining_data and len(the_rest) != 0:
-            log_error(
-                "Warning!!!!: Stream still has {0} bytes left:\n{1}".format(
-                    len(the_rest), hexdump(the_rest, position)
+        try:
+            remaining, partial = self._remaining_size()
+
+            # Do not use a keyword argument
+            position = self.object_stream.tell()
+            start = max(0, position - DUMP_CONTEXT_SIZE)
+            self.object_stream.seek(start - position, os.SEEK_CUR)
+            window = self.object_stream.read(self.dump_window)
+        except (IOError, OSError, ValueError) as ex:
+            log_error("Can't dump the stream: {0}".format(ex))
+        else:
+            if not ignore_remaining_data and remaining != 0:
+                log_error(
+                    "Warning!!!!: Stream still has {0}{1} bytes left:\n"
+                    "{2}".format(
+                        "at least " if partial else "",
+                        remaining,
+                        hexdump(window, start),
+                    )
                 )
-            )
 
         log_error("=" * 30)
@@ -35,8 +35,49 @@ The writing mode should be handled by the "classic" javaobj code.
     limitations under the License.
 """
 
-from . import api, beans, core, main, stream, transformers  # noqa: 401
-from .main import load, loads  # noqa: 401
+import sys
+
+from . import (  # noqa: 401
+    api,
+    beans,
+    cache,
+    compression,
+    core,
+    graph,
+    heap,
+    index,
+    lazy,
+    limits,
+    main,
+    parallel,
+    push,
+    scanner,
+    schema,
+    spill,
+    stats,
+    stream,
+    strings,
+    transformers,
+)
+from .cache import ParseCache  # noqa: 401
+from .index import IndexedStream  # noqa: 401
+from .limits import (  # noqa: 401
+    CancellationToken,
+    ParseCancelledError,
+    ParseInterruptedError,
+    ParseTimeoutError,
+    QuotaExceededError,
+)
+from .main import iter_segments, load, load_path, loads  # noqa: 401
+from .parallel import load_many, load_segments  # noqa: 401
+from .push import JavaPushParser  # noqa: 401
+from .scanner import peek  # noqa: 401
+from .spill import SpilledData  # noqa: 401
+
+if sys.version_info >= (3, 6):
+    # Asynchronous generators are required
+    from . import aio  # noqa: 401
+    from .aio import aiter_load  # noqa: 401
 
 # ------------------------------------------------------------------------------
 
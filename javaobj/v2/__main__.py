@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Command line tools working on Java serialization streams::
+
+    python -m javaobj.v2 schemas [--json] FILE...
+    python -m javaobj.v2 strings FILE...
+    python -m javaobj.v2 sizes [--json] [--limit N] FILE
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import, print_function
+
+from typing import Any, List, Optional  # pylint:disable=W0611
+import argparse
+import json
+import mmap
+import sys
+
+from .heap import analyze_sizes
+from .schema import scan_schemas
+from .strings import iter_strings
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+
+def _schemas(args):
+    # type: (Any) -> int
+    """
+    Prints the inventory of the class descriptions of the given files
+    """
+    inventory = scan_schemas(args.files)
+    if args.json:
+        json.dump(inventory.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        print(inventory.report())
+
+    return 1 if inventory.errors else 0
+
+
+def _strings(args):
+    # type: (Any) -> int
+    """
+    Prints the strings of the given files, one per line, as tab-separated
+    file, offset, owner class, field name and text
+    """
+    result = 0
+    for path in args.files:
+        with open(path, "rb") as fd:
+            try:
+                data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                data = b""  # type: Any
+
+            try:
+                for offset, owner_class, field_name, text in iter_strings(
+                    data
+                ):
+                    print(
+                        "\t".join(
+                            (
+                                path,
+                                str(offset),
+                                owner_class or "",
+                                field_name or "",
+                                json.dumps(text),
+                            )
+                        )
+                    )
+            except (ValueError, EOFError) as ex:
+                print("Error in {0}: {1}".format(path, ex), file=sys.stderr)
+                result = 1
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    return result
+
+
+def _sizes(args):
+    # type: (Any) -> int
+    """
+    Prints the shallow and retained sizes of the contents of a file, by
+    class and for the largest contents
+    """
+    with open(args.file, "rb") as fd:
+        analysis = analyze_sizes(fd)
+
+    if args.json:
+        json.dump(analysis.to_dict(args.limit), sys.stdout, indent=2)
+        print()
+    else:
+        print(analysis.report(args.limit))
+
+    return 0
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """
+    Entry point of the command line tools
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m javaobj.v2",
+        description="Tools working on Java serialization streams",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    schemas = subparsers.add_parser(
+        "schemas",
+        help="Lists the class descriptions found in streams, without "
+        "parsing their data",
+    )
+    schemas.add_argument("files", nargs="+", help="Stream files")
+    schemas.add_argument(
+        "--json", action="store_true", help="Print the inventory as JSON"
+    )
+    schemas.set_defaults(method=_schemas)
+
+    strings = subparsers.add_parser(
+        "strings",
+        help="Lists the strings found in streams, with the class and field "
+        "they are the value of",
+    )
+    strings.add_argument("files", nargs="+", help="Stream files")
+    strings.set_defaults(method=_strings)
+
+    sizes = subparsers.add_parser(
+        "sizes",
+        help="Computes the shallow and retained sizes of the contents of a "
+        "stream, by class",
+    )
+    sizes.add_argument("file", help="Stream file")
+    sizes.add_argument(
+        "--json", action="store_true", help="Print the analysis as JSON"
+    )
+    sizes.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="Number of classes and contents to print (default: 20)",
+    )
+    sizes.set_defaults(method=_sizes)
+
+    args = parser.parse_args(argv)
+    return args.method(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
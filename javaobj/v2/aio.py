@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+asyncio integration: deserialization of Java streams read from an
+asyncio.StreamReader (requires Python 3.6+)
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from typing import Any, AsyncIterator  # pylint:disable=W0611
+
+from .api import ObjectTransformer  # pylint:disable=W0611
+from .beans import ParsedJavaContent  # pylint:disable=W0611
+from .push import JavaPushParser
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# Default size of the reads
+READ_SIZE = 65536
+
+# ------------------------------------------------------------------------------
+
+
+async def aiter_load(reader, *transformers, **kwargs):
+    # type: (Any, ObjectTransformer, Any) -> AsyncIterator[ParsedJavaContent]
+    """
+    Deserializes the top-level contents of a Java stream as its bytes are
+    read. The reader is only awaited when no complete content is available,
+    so that a slow consumer pauses the reading of the stream.
+
+    The contents are parsed in the event loop thread, see JavaPushParser.
+
+    :param reader: An asyncio.StreamReader, or any object with an awaitable
+                   read(size) method returning empty bytes at the end of the
+                   stream
+    :param transformers: Custom transformers to use
+    :param read_size: Maximum number of bytes to read at once
+    :param use_numpy_arrays: If True, use the numpy array transformer
+    :return: An asynchronous iterator of the top-level contents
+    :raise EOFError: The stream has ended in the middle of a content
+    :raise ValueError: Invalid or unsupported content
+    """
+    read_size = kwargs.pop("read_size", READ_SIZE)
+    parser = JavaPushParser(*transformers, **kwargs)
+    while True:
+        data = await reader.read(read_size)
+        if not data:
+            # End of stream
+            parser.close()
+            break
+
+        for content in parser.feed(data):
+            yield content
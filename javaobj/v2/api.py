@@ -26,7 +26,7 @@ Definition of the object transformer API
 
 from __future__ import absolute_import
 
-from typing import Optional
+from typing import Any, Optional  # pylint:disable=W0611
 
 from .beans import JavaClassDesc, JavaInstance  # pylint:disable=W0611
 from .stream import DataStreamReader  # pylint:disable=W0611
@@ -99,3 +99,68 @@ class ObjectTransformer(object):  # pylint:disable=R0205
         :return: A Java class description, if handled, else None
         """
         return None
+
+    def cache_key(self):  # pylint:disable=R0201
+        # type: () -> Any
+        """
+        Describes the configuration of this transformer, which is part of
+        the key of the results cached by a javaobj.v2.cache.ParseCache.
+
+        Transformers whose results depend on their configuration must
+        return a value with a stable repr(), which differs for each
+        configuration. Stateless transformers can keep returning None.
+
+        :return: The configuration of the transformer, or None
+        """
+        return None
+
+
+class ParserObserver(object):  # pylint:disable=R0205
+    """
+    Representation of a parser observer, notified when the parser starts and
+    ends reading a content item, at every nesting level
+    """
+
+    def content_start(self, type_code, offset):  # pylint:disable=W0613,R0201
+        # type: (int, int) -> None
+        """
+        Called when the parser starts reading a content item
+
+        :param type_code: Type code of the content (TC_OBJECT, TC_STRING, ...)
+        :param offset: Offset of the type code in the stream
+        """
+        pass
+
+    def content_end(
+        self, type_code, handle, class_name, start, end, content
+    ):  # pylint:disable=W0613,R0201,R0913
+        # type: (int, Optional[int], Optional[str], int, int, Any) -> None
+        """
+        Called when the parser has read a content item.
+
+        The handle is the one of the referenced item for a TC_REFERENCE and is
+        None for a TC_NULL.
+
+        :param type_code: Type code of the content (TC_OBJECT, TC_STRING, ...)
+        :param handle: Handle of the parsed content
+        :param class_name: Name of the class of the content, if any
+        :param start: Offset of the type code in the stream
+        :param end: Offset of the first byte after the content
+        :param content: The parsed content
+        """
+        pass
+
+    def content_error(
+        self, type_code, start, end, error
+    ):  # pylint:disable=W0613,R0201
+        # type: (int, int, int, Exception) -> None
+        """
+        Called instead of content_end() when the parser failed to read a
+        content item. The error is propagated after this call.
+
+        :param type_code: Type code of the content (TC_OBJECT, TC_STRING, ...)
+        :param start: Offset of the type code in the stream
+        :param end: Offset in the stream when the error occurred
+        :param error: The exception raised while reading the content
+        """
+        pass
@@ -33,6 +33,7 @@ import logging
 from ..constants import ClassDescFlags, TypeCode
 from ..modifiedutf8 import decode_modified_utf8, byte_to_int
 from ..utils import UNICODE_TYPE
+from .spill import SpilledData
 
 # ------------------------------------------------------------------------------
 
@@ -141,7 +142,7 @@ class ExceptionState(ParsedJavaContent):
     """
 
     def __init__(self, exception_object, data):
-        # type: (ParsedJavaContent, bytes) -> None
+        # type: (ParsedJavaContent, Optional[bytes]) -> None
         super(ExceptionState, self).__init__(ContentType.EXCEPTIONSTATE)
         self.exception_object = exception_object
         self.stream_data = data
@@ -200,6 +201,44 @@ class JavaString(ParsedJavaContent):
         return self.value == other
 
 
+class SpilledJavaString(JavaString):
+    """
+    Represents a Java string whose bytes have been spilled out of memory
+    (see javaobj.v2.spill): its value is decoded on each access
+    """
+
+    def __init__(self, handle, data):
+        # type: (int, SpilledData) -> None
+        ParsedJavaContent.__init__(self, ContentType.STRING)
+        self.handle = handle
+        self.data = data
+
+    @property
+    def value(self):
+        # type: () -> str
+        """
+        Decodes the string
+        """
+        return decode_modified_utf8(self.data.tobytes())[0]
+
+    @property
+    def length(self):
+        # type: () -> int
+        """
+        Number of characters of the string
+        """
+        return len(self.value)
+
+    def dump(self, indent=0):
+        # type: (int) -> str
+        """
+        Returns a dump representation of the string, without its value
+        """
+        return "\t" * indent + "[String {0:x}: {1} bytes spilled]".format(
+            self.handle, len(self.data)
+        )
+
+
 class JavaField:
     """
     Represents a field in a Java class description
@@ -469,7 +508,13 @@ class JavaInstance(ParsedJavaContent):
         """
         Returns the field with the given name
         """
-        for cd_fields in self.field_data.values():
+        try:
+            field_data = self.__dict__["field_data"]
+        except KeyError:
+            # Not yet initialized (e.g. while being unpickled)
+            raise AttributeError(name)
+
+        for cd_fields in field_data.values():
             for field, value in cd_fields.items():
                 if field.name == name:
                     return value
@@ -568,7 +613,9 @@ class JavaArray(ParsedJavaContent, list):
 
     def __init__(self, handle, class_desc, field_type, content):
         # type: (int, JavaClassDesc, FieldType, List[Any]) -> None
-        list.__init__(self, content)
+        # Spilled byte arrays are only available as data
+        if not isinstance(content, SpilledData):
+            list.__init__(self, content)
         ParsedJavaContent.__init__(self, ContentType.ARRAY)
         self.handle = handle
         self.classdesc = class_desc
@@ -589,7 +636,7 @@ class JavaArray(ParsedJavaContent, list):
         sub_prefix = "\t" * (indent + 1)
         dump = [
             "{0}[array 0x{1:x}: {2} items - stored as {3}]".format(
-                prefix, self.handle, len(self), type(self.data).__name__
+                prefix, self.handle, len(self.data), type(self.data).__name__
             )
         ]
         for x in self:
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Cache of the results of loads(), keyed by a hash of the parsed bytes, for
+services parsing the same streams over and over
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional  # pylint:disable=W0611
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+from .api import ObjectTransformer  # pylint:disable=W0611
+from .main import loads
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# load() options whose effects can't be reproduced from a cached result
+BYPASS_OPTIONS = (
+    "collect_stats",
+    "observers",
+    "graph_index",
+    "lazy",
+    "spill_threshold",
+)
+
+# load() options which don't change the result of a successful parsing
+IGNORED_OPTIONS = ("timeout", "deadline", "cancel_token")
+
+# Extension of the files of a persistent cache
+CACHE_FILE_EXTENSION = ".pickle"
+
+# ------------------------------------------------------------------------------
+
+
+def _new_hash():
+    # type: () -> Any
+    """
+    Returns a new hash object, to compute a key
+    """
+    try:
+        # Python 3.6+
+        return hashlib.blake2b(digest_size=20)
+    except AttributeError:
+        return hashlib.sha1()
+
+
+def _get_cache_key(transformer):
+    # type: (Any) -> Any
+    """
+    Returns the configuration of a transformer (see
+    ObjectTransformer.cache_key()), or None if it doesn't define it
+    """
+    cache_key = getattr(transformer, "cache_key", None)
+    return cache_key() if cache_key is not None else None
+
+
+class ParseCache(object):  # pylint:disable=R0205
+    """
+    Least-recently used cache of the results of loads(), keyed by a hash of
+    the parsed bytes, of the transformers and of the load() options.
+
+    Transformers are identified by their class and by the result of their
+    cache_key() method (see ObjectTransformer): transformers whose results
+    depend on their configuration must implement it, otherwise two
+    differently configured instances of a class would share results.
+
+    The results are stored pickled: each hit returns a new copy of the
+    object graph, which the caller can modify without altering the cache.
+    Results which can't be pickled (e.g. too deep graphs or instances of
+    local classes) and errors aren't cached. The calls using options which
+    can't be reproduced from a cached result, like observers or a graph
+    index, bypass the cache.
+
+    If a directory is given, the results are also stored there and read
+    back when they are not in memory anymore, e.g. after a restart. As they
+    are unpickled, this directory must only be writable by trusted users.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 << 20, directory=None):
+        # type: (Optional[int], Optional[int], Optional[str]) -> None
+        """
+        :param max_entries: Maximum number of results kept in memory
+        :param max_bytes: Maximum size of the pickled results kept in
+                          memory
+        :param directory: Directory where the results are persisted
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+
+        # Key -> pickled result, from the least to the most recently used
+        self.__entries = OrderedDict()  # type: OrderedDict[str, bytes]
+        self.__lock = threading.Lock()
+
+        # Total size of the pickled results in memory
+        self.size = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncacheable = 0
+
+    def __str__(self):
+        return "[parse cache: {0} entries, {1} bytes, {2} hits]".format(
+            len(self), self.size, self.hits
+        )
+
+    __repr__ = __str__
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.__entries)
+
+    def make_key(self, data, transformers, kwargs):
+        # type: (bytes, Any, Dict[str, Any]) -> Optional[str]
+        """
+        Computes the key of a loads() call
+
+        :param data: Parsed bytes
+        :param transformers: Custom transformers
+        :param kwargs: load() options
+        :return: The key, or None if the call can't use the cache
+        """
+        if any(kwargs.get(name) for name in BYPASS_OPTIONS):
+            return None
+
+        options = sorted(
+            (name, repr(value))
+            for name, value in kwargs.items()
+            if name not in IGNORED_OPTIONS
+        )
+        signature = repr(
+            (
+                [
+                    (
+                        "{0}.{1}".format(
+                            type(transformer).__module__,
+                            type(transformer).__name__,
+                        ),
+                        repr(_get_cache_key(transformer)),
+                    )
+                    for transformer in transformers
+                ],
+                options,
+            )
+        )
+
+        hasher = _new_hash()
+        hasher.update(signature.encode("utf-8"))
+        hasher.update(b"\0")
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    def loads(self, data, *transformers, **kwargs):
+        # type: (bytes, ObjectTransformer, Any) -> Any
+        """
+        Returns a copy of the cached result of loads(), or parses the given
+        bytes and caches the result. Accepts the same arguments as loads().
+
+        :param data: A Java data string
+        :param transformers: Custom transformers to use
+        :return: The deserialized object
+        """
+        key = self.make_key(data, transformers, kwargs)
+        if key is None:
+            return loads(data, *transformers, **kwargs)
+
+        pickled = self.get(key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+
+        result = loads(data, *transformers, **kwargs)
+        try:
+            pickled = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError, RuntimeError):
+            # RecursionError is a RuntimeError
+            with self.__lock:
+                self.uncacheable += 1
+        else:
+            self.put(key, pickled)
+
+        return result
+
+    def get(self, key):
+        # type: (str) -> Optional[bytes]
+        """
+        Returns the pickled result stored with the given key, from memory
+        or from the cache directory, and counts the hit or the miss
+
+        :param key: A key computed by make_key()
+        :return: The pickled result, or None
+        """
+        with self.__lock:
+            pickled = self.__entries.pop(key, None)
+            if pickled is not None:
+                # Most recently used
+                self.__entries[key] = pickled
+                self.hits += 1
+                return pickled
+
+        pickled = self.__read_file(key)
+        with self.__lock:
+            if pickled is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        self.__store(key, pickled)
+        return pickled
+
+    def put(self, key, pickled):
+        # type: (str, bytes) -> None
+        """
+        Stores a pickled result, evicting the least recently used ones to
+        respect the limits of the cache
+
+        :param key: A key computed by make_key()
+        :param pickled: The pickled result
+        """
+        self.__store(key, pickled)
+        if self.directory is not None:
+            self.__write_file(key, pickled)
+
+    def __store(self, key, pickled):
+        # type: (str, bytes) -> None
+        """
+        Stores a pickled result in memory
+        """
+        if self.max_bytes is not None and len(pickled) > self.max_bytes:
+            # Would evict everything else
+            return
+
+        with self.__lock:
+            previous = self.__entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+
+            self.__entries[key] = pickled
+            self.size += len(pickled)
+
+            while (
+                self.max_entries is not None
+                and len(self.__entries) > self.max_entries
+            ) or (self.max_bytes is not None and self.size > self.max_bytes):
+                _, evicted = self.__entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def __get_path(self, key):
+        # type: (str) -> str
+        """
+        Returns the path of the file of an entry
+        """
+        return os.path.join(
+            self.directory, key + CACHE_FILE_EXTENSION  # type: ignore
+        )
+
+    def __read_file(self, key):
+        # type: (str) -> Optional[bytes]
+        """
+        Reads the file of an entry, if any
+        """
+        if self.directory is None:
+            return None
+
+        try:
+            with open(self.__get_path(key), "rb") as fd:
+                return fd.read()
+        except (IOError, OSError):
+            return None
+
+    def __write_file(self, key, pickled):
+        # type: (str, bytes) -> None
+        """
+        Writes the file of an entry, atomically
+        """
+        fd, path = tempfile.mkstemp(
+            CACHE_FILE_EXTENSION + ".tmp", dir=self.directory
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(pickled)
+
+            # Replaces an existing file on Windows as well
+            getattr(os, "replace", os.rename)(path, self.__get_path(key))
+        except BaseException:
+            os.remove(path)
+            raise
+
+    def clear(self):
+        # type: () -> None
+        """
+        Removes all the entries, including the files of the cache directory
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.size = 0
+
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(CACHE_FILE_EXTENSION):
+                    os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Streaming decompression of Java streams written through a GZIPOutputStream
+or a DeflaterOutputStream
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import IO, Any, Optional, Tuple  # pylint:disable=W0611
+import io
+import threading
+import zlib
+
+try:
+    # Python 2
+    import Queue as queue
+except ImportError:
+    # Python 3+
+    import queue  # type: ignore
+
+from ..utils import ForwardReader, is_seekable
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Compression formats
+GZIP = "gzip"
+ZLIB = "zlib"
+
+# Window bits of the decompressors of each format
+_WBITS = {GZIP: 16 + zlib.MAX_WBITS, ZLIB: zlib.MAX_WBITS}
+
+# Size of the reads of compressed data
+READ_SIZE = 262144
+
+# Size of the blocks of decompressed data given to the parser
+BLOCK_SIZE = 1048576
+
+# Number of decompressed blocks prepared in advance by the helper thread
+THREAD_QUEUE_SIZE = 4
+
+# ------------------------------------------------------------------------------
+
+
+def detect_compression(magic):
+    # type: (bytes) -> Optional[str]
+    """
+    Detects the compression format of a stream from its first bytes
+
+    :param magic: The first 2 bytes of the stream
+    :return: GZIP, ZLIB or None if the stream is not compressed
+    """
+    if len(magic) < 2:
+        return None
+
+    first, second = bytearray(magic[:2])
+    if first == 0x1F and second == 0x8B:
+        return GZIP
+
+    # Deflate method, window of at most 32 KiB and valid header checksum
+    if (
+        first & 0x0F == 8
+        and first >> 4 <= 7
+        and (first * 256 + second) % 31 == 0
+    ):
+        return ZLIB
+
+    return None
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    Raw stream giving the decompressed content of a gzip or zlib stream.
+
+    The compressed stream is read by large blocks and decompressed on the
+    fly, directly into the buffer given to readinto(): wrap this reader in
+    an io.BufferedReader to read it by small parts.
+    If threaded is True, a helper thread decompresses the next blocks while
+    the current one is being parsed (zlib releases the GIL while working).
+    """
+
+    def __init__(self, fd, compression, threaded=False):
+        # type: (IO[bytes], str, bool) -> None
+        """
+        :param fd: The compressed input stream
+        :param compression: Compression format (GZIP or ZLIB)
+        :param threaded: If True, decompress in a helper thread
+        """
+        super(DecompressingReader, self).__init__()
+        self.__fd = fd
+        self.__wbits = _WBITS[compression]
+        self.__decompressor = zlib.decompressobj(self.__wbits)
+        self.__input = b""
+        self.__eof = False
+
+        # Data decompressed but not read yet
+        self.__pending = b""
+
+        self.__queue = None  # type: Optional[queue.Queue]
+        self.__stopped = False
+        self.__done = False
+        if threaded:
+            self.__queue = queue.Queue(THREAD_QUEUE_SIZE)
+            thread = threading.Thread(
+                target=self.__decompress_loop, name="javaobj-decompress"
+            )
+            thread.daemon = True
+            thread.start()
+
+    def readable(self):
+        # type: () -> bool
+        """
+        The stream can be read
+        """
+        return True
+
+    def __decompress(self, size):
+        # type: (int) -> bytes
+        """
+        Decompresses up to the given number of bytes
+
+        :param size: Maximum number of bytes to return
+        :return: Decompressed bytes, empty at the end of the stream
+        :raise EOFError: The compressed stream is truncated
+        :raise zlib.error: Invalid compressed data
+        """
+        while True:
+            if not self.__input and not self.__eof:
+                self.__input = self.__fd.read(READ_SIZE)
+                if not self.__input:
+                    self.__eof = True
+
+            decompressor = self.__decompressor
+            data = decompressor.decompress(self.__input, size)
+            self.__input = decompressor.unconsumed_tail
+            if decompressor.unused_data:
+                # End of a gzip member: others can follow
+                self.__input = decompressor.unused_data + self.__input
+                self.__decompressor = zlib.decompressobj(self.__wbits)
+            if data:
+                return data
+
+            if self.__eof and not self.__input:
+                if getattr(decompressor, "eof", True):
+                    return b""
+
+                raise EOFError("Compressed stream has ended unexpectedly.")
+
+    def __decompress_loop(self):
+        # type: () -> None
+        """
+        Decompresses the stream in the helper thread
+        """
+        try:
+            while not self.__stopped:
+                data = self.__decompress(BLOCK_SIZE)
+                self.__queue.put(data)
+                if not data:
+                    break
+        except Exception as ex:  # pylint:disable=W0703
+            self.__queue.put(ex)
+
+    def __next_block(self, size):
+        # type: (int) -> bytes
+        """
+        Returns the next block of decompressed data
+        """
+        if self.__queue is None:
+            return self.__decompress(size)
+
+        if self.__done:
+            # The helper thread has stopped
+            return b""
+
+        data = self.__queue.get()
+        if isinstance(data, Exception):
+            self.__done = True
+            raise data
+
+        if not data:
+            self.__done = True
+        return data
+
+    def readinto(self, buffer):
+        # type: (Any) -> int
+        """
+        Decompresses data into the given buffer
+
+        :param buffer: A writable buffer
+        :return: The number of bytes written, 0 at the end of the stream
+        """
+        if self.__pending:
+            data = self.__pending
+        else:
+            data = self.__next_block(len(buffer))
+
+        size = min(len(data), len(buffer))
+        if size == len(data):
+            buffer[:size] = data
+            self.__pending = b""
+        else:
+            buffer[:size] = data[:size]
+            self.__pending = data[size:]
+        return size
+
+    def close(self):
+        # type: () -> None
+        """
+        Stops the helper thread, if any. The compressed stream is not closed.
+        """
+        self.__stopped = True
+        if self.__queue is not None:
+            # Unblock the helper thread
+            try:
+                while True:
+                    self.__queue.get_nowait()
+            except queue.Empty:
+                pass
+
+        super(DecompressingReader, self).close()
+
+
+def open_decompressed(fd, threaded=False):
+    # type: (IO[bytes], bool) -> Tuple[IO[bytes], Optional[str]]
+    """
+    Returns a stream giving the decompressed content of the given one if it
+    starts with a gzip or zlib header, else the stream itself (or a
+    ForwardReader, if it can't be seeked).
+
+    The decompressed stream must be closed to stop the helper thread, which
+    doesn't close the given stream.
+
+    :param fd: The input stream
+    :param threaded: If True, decompress in a helper thread
+    :return: A (stream to parse, compression format or None) tuple
+    """
+    if is_seekable(fd):
+        position = fd.tell()
+        magic = fd.read(2)
+        fd.seek(position)
+    else:
+        if not isinstance(fd, ForwardReader):
+            fd = ForwardReader(fd)
+        magic = fd.peek(2)
+
+    compression = detect_compression(magic)
+    if compression is None:
+        return fd, None
+
+    reader = DecompressingReader(fd, compression, threaded)
+    return io.BufferedReader(reader, BLOCK_SIZE), compression
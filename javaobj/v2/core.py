@@ -27,18 +27,28 @@ See: https://github.com/frohoff/jdeserialize
 
 from __future__ import absolute_import
 
+from types import GeneratorType
 from typing import (
     Any,
     Callable,
     Dict,
+    Generator,
     IO,
+    Iterator,
     List,
     Optional,
 )  # pylint:disable=W0611
+import itertools
 import logging
 import os
 
 from . import api  # pylint:disable=W0611
+from .graph import GraphIndex  # pylint:disable=W0611
+from .limits import (  # pylint:disable=W0611
+    ARRAY_CHECK_INTERVAL,
+    HANDLE_CHECK_INTERVAL,
+    ParseLimits,
+)
 from .beans import (
     ParsedJavaContent,
     BlockData,
@@ -49,12 +59,16 @@ from .beans import (
     JavaField,
     JavaInstance,
     JavaString,
+    SpilledJavaString,
     ExceptionState,
     ExceptionRead,
     ClassDescType,
     FieldType,
     ClassDataType,
 )
+from .scanner import PRIMITIVE_SIZES
+from .spill import Spiller  # pylint:disable=W0611
+from .stats import ParseStats, perf_counter
 from .stream import DataStreamReader
 from .transformers import DefaultObjectTransformer
 from ..constants import (
@@ -67,6 +81,7 @@ from ..constants import (
 from ..modifiedutf8 import (
     decode_modified_utf8,
 )  # pylint:disable=W0611  # noqa: F401
+from ..utils import ForwardReader, is_seekable, run_task
 
 # ------------------------------------------------------------------------------
 
@@ -85,13 +100,36 @@ class JavaStreamParser:
     Parses a Java stream
     """
 
-    def __init__(self, fd, transformers):
-        # type: (IO[bytes], List[api.ObjectTransformer]) -> None
+    def __init__(
+        self,
+        fd,
+        transformers,
+        collect_stats=False,
+        observers=None,
+        keep_handle_maps=True,
+        graph_index=None,
+        limits=None,
+        spiller=None,
+    ):  # pylint:disable=R0913
+        # type: (IO[bytes], List[api.ObjectTransformer], bool, Optional[List[api.ParserObserver]], bool, Optional[GraphIndex], Optional[ParseLimits], Optional[Spiller]) -> None
         """
-        :param fd: File-object to read from
+        :param fd: File-object to read from. If it can't be seeked (pipe,
+                   socket, ...), it is read through a ForwardReader
         :param transformers: Custom object transformers
+        :param collect_stats: If True, collect parsing counters (see stats)
+        :param observers: Parser observers to notify while reading contents
+        :param keep_handle_maps: If False, forget the handles at each reset
+        :param graph_index: A GraphIndex to fill with the instances and the
+                            referrers of the contents, as they are read
+        :param limits: A ParseLimits checked as contents are read, to stop
+                       the parsing at a deadline, on cancellation or when a
+                       quota is exceeded
+        :param spiller: A Spiller storing the strings, block data and byte
+                        arrays larger than its threshold out of memory
         """
         # Input stream
+        if not isinstance(fd, ForwardReader) and not is_seekable(fd):
+            fd = ForwardReader(fd)
         self.__fd = fd
         self.__reader = DataStreamReader(fd)
 
@@ -101,36 +139,178 @@ class JavaStreamParser:
         # Logger
         self._log = logging.getLogger("javaobj.parser")
 
+        # Parser observers
+        self.__observers = list(
+            observers or ()
+        )  # type: List[api.ParserObserver]
+
+        # Parsing statistics (None if not collected)
+        self.__stats = None  # type: Optional[ParseStats]
+        if collect_stats:
+            self.__stats = ParseStats()
+
+        # Instances and referrers indexes (None if not built)
+        self.__graph_index = graph_index
+
+        # Deadline, cancellation and quotas checks (None if not checked)
+        self.__limits = limits
+        self.__nb_handles = 0
+        self.__depth = 0
+        self.__start_offset = self.__fd.tell() if limits is not None else 0
+
+        # Storage of the large values (None if they are kept in memory)
+        self.__spiller = spiller
+
         # Handles
         self.__handle_maps = []  # type: List[Dict[int, ParsedJavaContent]]
         self.__handles = {}  # type: Dict[int, ParsedJavaContent]
 
+        # Keep the handles of previous segments
+        self.__keep_handle_maps = keep_handle_maps
+
         # Initial handle value
         self.__current_handle = StreamConstants.BASE_REFERENCE_IDX.value
 
         # Definition of the type code handlers
-        # Each takes the type code as argument
+        # Each takes the type code as argument and returns either the parsed
+        # content or, if it can contain other contents, the task parsing it.
+        # Tasks are executed by run_task(), which keeps track of the nested
+        # contents on its own stack instead of the Python one.
         self.__type_code_handlers = {
-            TerminalCode.TC_OBJECT: self._do_object,
-            TerminalCode.TC_CLASS: self._do_class,
-            TerminalCode.TC_ARRAY: self._do_array,
+            TerminalCode.TC_OBJECT: self._do_object_task,
+            TerminalCode.TC_CLASS: self._do_class_task,
+            TerminalCode.TC_ARRAY: self._do_array_task,
             TerminalCode.TC_STRING: self._read_new_string,
             TerminalCode.TC_LONGSTRING: self._read_new_string,
-            TerminalCode.TC_ENUM: self._do_enum,
-            TerminalCode.TC_CLASSDESC: self._do_classdesc,
-            TerminalCode.TC_PROXYCLASSDESC: self._do_classdesc,
+            TerminalCode.TC_ENUM: self._do_enum_task,
+            TerminalCode.TC_CLASSDESC: self._do_classdesc_step,
+            TerminalCode.TC_PROXYCLASSDESC: self._do_classdesc_step,
             TerminalCode.TC_REFERENCE: self._do_reference,
             TerminalCode.TC_NULL: self._do_null,
-            TerminalCode.TC_EXCEPTION: self._do_exception,
+            TerminalCode.TC_EXCEPTION: self._do_exception_task,
             TerminalCode.TC_BLOCKDATA: self._do_block_data,
             TerminalCode.TC_BLOCKDATALONG: self._do_block_data,
-        }  # type: Dict[int, Callable[[int], ParsedJavaContent]]
+        }  # type: Dict[int, Callable[[int], Any]]
+
+        if limits is not None and limits.max_depth is not None:
+            # Keep track of the nesting depth of objects and arrays
+            for type_code in (TerminalCode.TC_OBJECT, TerminalCode.TC_ARRAY):
+                self.__type_code_handlers[type_code] = self.__nested_handler(
+                    self.__type_code_handlers[type_code]
+                )
+
+    @property
+    def stats(self):
+        # type: () -> Optional[ParseStats]
+        """
+        The statistics of the last parsing, or None if they are not collected
+        """
+        return self.__stats
+
+    def __nested_handler(self, handler):
+        # type: (Callable[[int], Any]) -> Callable[[int], Any]
+        """
+        Wraps the handler of a type code, to count the nesting depth of the
+        contents it reads
+        """
+
+        def nested_handler(type_code):
+            # type: (int) -> Any
+            return self._nested_task(handler(type_code))
+
+        return nested_handler
+
+    def _nested_task(self, task):
+        # type: (Generator) -> Generator
+        """
+        Executes a parsing task one level deeper, checking the max_depth
+        quota
+        """
+        self.__depth += 1
+        try:
+            self.__limits.check_quota(  # type: ignore
+                "max_depth", self.__depth
+            )
+            content = yield task
+        finally:
+            self.__depth -= 1
+
+        yield content
+
+    def _check_read(self, size):
+        # type: (int) -> None
+        """
+        Checks the max_bytes quota before reading the given number of bytes
+        """
+        if self.__limits is not None:
+            self.__limits.check_quota(
+                "max_bytes", self.__fd.tell() - self.__start_offset + size
+            )
+
+    @property
+    def graph_index(self):
+        # type: () -> Optional[GraphIndex]
+        """
+        The instances and referrers indexes, or None if they are not built
+        """
+        return self.__graph_index
+
+    def add_observer(self, observer):
+        # type: (api.ParserObserver) -> None
+        """
+        Registers an observer, notified when a content item is read
+
+        :param observer: A ParserObserver
+        """
+        self.__observers.append(observer)
+
+    def remove_observer(self, observer):
+        # type: (api.ParserObserver) -> None
+        """
+        Unregisters an observer
+
+        :param observer: A ParserObserver
+        :raise ValueError: Unknown observer
+        """
+        self.__observers.remove(observer)
 
     def run(self):
         # type: () -> List[ParsedJavaContent]
         """
         Parses the input stream
         """
+        contents = []  # type: List[ParsedJavaContent]
+        for segment in self._read_segments():
+            contents.extend(segment)
+
+        return contents
+
+    def iter_segments(self):
+        # type: () -> Iterator[List[ParsedJavaContent]]
+        """
+        Parses the input stream one segment at a time, i.e. up to the next
+        TC_RESET marker.
+
+        The handles of a segment are released once it has been read, so that
+        the memory used while parsing doesn't grow with the size of the
+        stream, as long as the caller doesn't keep the previous segments.
+
+        :return: An iterator of the lists of the top-level contents of each
+                 non-empty segment
+        """
+        self.__keep_handle_maps = False
+        return self._read_segments()
+
+    def _read_segments(self):
+        # type: () -> Iterator[List[ParsedJavaContent]]
+        """
+        Parses the input stream, yielding the top-level contents of each
+        segment
+        """
+        if self.__stats is not None:
+            stream_start = self.__fd.tell()
+            parse_start = perf_counter()
+
         # Check the magic byte
         magic = self.__reader.read_ushort()
         if magic != StreamConstants.STREAM_MAGIC:
@@ -157,33 +337,147 @@ class JavaStreamParser:
 
             if type_code == TerminalCode.TC_RESET:
                 # Explicit reset
-                self._reset()
+                if self.__stats is not None:
+                    self.__stats.resets += 1
+
+                if contents and not self.__keep_handle_maps:
+                    # End of segment: release its handles before giving it
+                    self.validate_handles()
+                    self._reset()
+                    yield contents
+                    contents = []
+                else:
+                    self._reset()
                 continue
 
-            parsed_content = self._read_content(type_code, True)
-            self._log.debug("Read: %s", parsed_content)
-            if parsed_content is not None and parsed_content.is_exception:
-                # Get the raw data between the start of the object and our
-                # current position
-                end = self.__fd.tell()
+            contents.append(self._read_top_level_content(type_code, start))
+
+        self.validate_handles()
+
+        # TODO: connect member classes ? (see jdeserialize @ 864)
+
+        if self.__handles and self.__keep_handle_maps:
+            self.__handle_maps.append(self.__handles.copy())
+
+        if self.__stats is not None:
+            self.__stats.total_bytes = self.__fd.tell() - stream_start
+            self.__stats.total_time = perf_counter() - parse_start
+
+        if contents or self.__keep_handle_maps:
+            yield contents
+
+    def read_contents(self):
+        # type: () -> List[ParsedJavaContent]
+        """
+        Parses the top-level contents up to the end of the input stream, which
+        must not start with the stream header (see run()) nor end in the
+        middle of a content. TC_RESET markers are handled as in run().
+
+        The state of the parser is kept between two calls, so that a stream
+        can be given in parts made of complete contents (see JavaPushParser)
+        by refilling the input stream before each call. The handles are not
+        kept, as in iter_segments().
+
+        :return: The list of the top-level contents read
+        :raise EOFError: The input ended in the middle of a content
+        :raise ValueError: Invalid or unsupported content
+        """
+        self.__keep_handle_maps = False
+        contents = []  # type: List[ParsedJavaContent]
+        while True:
+            start = self.__fd.tell()
+            try:
+                type_code = self.__reader.read_byte()
+            except EOFError:
+                # End of the input
+                return contents
+
+            if type_code == TerminalCode.TC_RESET:
+                if self.__stats is not None:
+                    self.__stats.resets += 1
+
+                self.validate_handles()
+                self._reset()
+            else:
+                contents.append(
+                    self._read_top_level_content(type_code, start)
+                )
+
+    def read_content_at(self, offset, handle):
+        # type: (int, int) -> ParsedJavaContent
+        """
+        Parses the top-level content at the given offset of the input stream,
+        which must be seekable. The handles read before are kept: the
+        contents it references must therefore have been read first (see
+        javaobj.v2.index).
+
+        :param offset: Offset of the type code of the content
+        :param handle: Handle assigned to the first content it introduces
+        :return: The parsed content
+        :raise EOFError: The input ended in the middle of the content
+        :raise ValueError: Invalid or unsupported content
+        """
+        self.__fd.seek(offset, os.SEEK_SET)
+        self.__current_handle = handle
+        type_code = self.__reader.read_byte()
+        return self._read_top_level_content(type_code, offset)
+
+    def get_handle(self, handle):
+        # type: (int) -> ParsedJavaContent
+        """
+        Returns the content with the given handle in the current segment
+
+        :param handle: A handle
+        :return: The content which has been assigned this handle
+        :raise ValueError: Unknown handle
+        """
+        try:
+            return self.__handles[handle]
+        except KeyError:
+            raise ValueError("Invalid reference handle: {0:x}".format(handle))
+
+    def _read_top_level_content(self, type_code, start):
+        # type: (int, int) -> ParsedJavaContent
+        """
+        Parses a top-level content, whose type code has just been read
+
+        :param type_code: Type code of the content
+        :param start: Offset of the type code in the input stream
+        :return: The parsed content
+        """
+        if self.__limits is not None:
+            self.__limits.check(start, self.__nb_handles)
+
+        parsed_content = self._read_content(type_code, True)
+        self._log.debug("Read: %s", parsed_content)
+        if parsed_content is not None and parsed_content.is_exception:
+            # Get the raw data between the start of the object and our
+            # current position
+            end = self.__fd.tell()
+            try:
                 self.__fd.seek(start, os.SEEK_SET)
+            except (IOError, OSError) as ex:
+                # Forward-only stream: the data isn't available anymore
+                self._log.warning("Raw data of the exception lost: %s", ex)
+                stream_data = None
+            else:
                 stream_data = self.__fd.read(end - start)
 
-                # Prepare an exception object
-                parsed_content = ExceptionState(parsed_content, stream_data)
+            # Prepare an exception object
+            parsed_content = ExceptionState(parsed_content, stream_data)
 
-            contents.append(parsed_content)
+        return parsed_content
+
+    def validate_handles(self):
+        # type: () -> None
+        """
+        Checks the validity of the contents of the current handles
 
+        :raise ValueError: Invalid class description
+        """
         for content in self.__handles.values():
             content.validate()
 
-        # TODO: connect member classes ? (see jdeserialize @ 864)
-
-        if self.__handles:
-            self.__handle_maps.append(self.__handles.copy())
-
-        return contents
-
     def dump(self, content):
         # type: (List[ParsedJavaContent]) -> str
         """
@@ -254,7 +548,11 @@ class JavaStreamParser:
         Resets the internal state of the parser
         """
         if self.__handles:
-            self.__handle_maps.append(self.__handles.copy())
+            if self.__keep_handle_maps:
+                self.__handle_maps.append(self.__handles.copy())
+
+            if self.__graph_index is not None:
+                self.__graph_index.reset()
 
         self.__handles.clear()
 
@@ -268,6 +566,15 @@ class JavaStreamParser:
         """
         handle = self.__current_handle
         self.__current_handle += 1
+
+        limits = self.__limits
+        if limits is not None:
+            self.__nb_handles += 1
+            limits.check_quota("max_handles", self.__nb_handles)
+            if not self.__nb_handles & (HANDLE_CHECK_INTERVAL - 1):
+                limits.check(self.__fd.tell(), self.__nb_handles)
+                self._check_read(0)
+
         return handle
 
     def _set_handle(self, handle, content):
@@ -292,6 +599,22 @@ class JavaStreamParser:
         """
         Parses the next content
         """
+        return run_task(
+            self._read_content_step(type_code, block_data, class_desc)
+        )
+
+    def _read_content_step(
+        self, type_code, block_data, class_desc=None, raise_exception=False
+    ):
+        # type: (int, bool, Optional[JavaClassDesc], bool) -> Any
+        """
+        Parses the next content if it can't contain other contents, else
+        returns the task parsing it (see run_task).
+
+        If raise_exception is True, the exception objects found in the content
+        of the task are raised (see ExceptionRead) instead of being returned:
+        the caller must still check its result with _check_exception().
+        """
         if not block_data and type_code in (
             TerminalCode.TC_BLOCKDATA,
             TerminalCode.TC_BLOCKDATALONG,
@@ -314,12 +637,115 @@ class JavaStreamParser:
             # No valid custom reader: abandon
             raise ValueError("Unknown type code: 0x{0:x}".format(type_code))
         else:
-            try:
-                # Parse the object
-                return handler(type_code)
-            except ExceptionRead as ex:
-                # We found an exception object: return it (raise later)
-                return ex.exception_object
+            if self.__observers:
+                return self._observe_task(
+                    type_code, self._do_content_step, handler
+                )
+
+            content = handler(type_code)
+            if isinstance(content, GeneratorType) and not raise_exception:
+                # Catch the exceptions found in its content
+                return self._catch_exception_task(content)
+
+            return content
+
+    @staticmethod
+    def _do_content_step(type_code, handler):
+        # type: (int, Callable[[int], Any]) -> Any
+        """
+        Calls the handler of a type code
+        """
+        content = handler(type_code)
+        if isinstance(content, GeneratorType):
+            # Parse the object, catching the exceptions found in its content
+            return JavaStreamParser._catch_exception_task(content)
+
+        return content
+
+    @staticmethod
+    def _catch_exception_task(task):
+        # type: (Generator) -> Generator
+        """
+        Executes a parsing task, returning the exception object found while
+        parsing its content
+        """
+        try:
+            content = yield task
+        except ExceptionRead as ex:
+            # We found an exception object: return it (raise later)
+            content = ex.exception_object
+
+        yield content
+
+    @staticmethod
+    def _check_exception(content):
+        # type: (ParsedJavaContent) -> ParsedJavaContent
+        """
+        Raises an ExceptionRead if the given content is an exception object,
+        else returns it
+        """
+        if content is not None and content.is_exception:
+            raise ExceptionRead(content)
+
+        return content
+
+    def _observe_task(self, type_code, method, *args):
+        # type: (int, Callable[..., Any], Any) -> Generator
+        """
+        Calls the given reading method, notifying the observers before and
+        after it. The type code must have been read just before this call.
+
+        :param type_code: Type code of the content to read
+        :param method: Method to call, with the type code and the given
+                       arguments
+        :return: The task returning the result of the method
+        """
+        start = self.__fd.tell() - 1
+        for observer in self.__observers:
+            observer.content_start(type_code, start)
+
+        try:
+            content = method(type_code, *args)
+            if isinstance(content, GeneratorType):
+                content = yield content
+        except Exception as ex:
+            # Keep the notifications balanced
+            end = self.__fd.tell()
+            for observer in self.__observers:
+                observer.content_error(type_code, start, end, ex)
+            raise
+
+        end = self.__fd.tell()
+        if content is None:
+            handle = None
+            class_name = None
+        else:
+            handle = content.handle
+            class_name = self._get_class_name(content)
+
+        for observer in self.__observers:
+            observer.content_end(
+                type_code, handle, class_name, start, end, content
+            )
+
+        yield content
+
+    @staticmethod
+    def _get_class_name(content):
+        # type: (ParsedJavaContent) -> Optional[str]
+        """
+        Returns the name of the class of the given content, if any
+        """
+        if isinstance(content, JavaClassDesc):
+            return content.name
+        elif isinstance(content, JavaString):
+            return "java.lang.String"
+
+        class_desc = getattr(content, "classdesc", None)
+        if class_desc is not None:
+            return class_desc.name
+
+        return None
 
     def _read_new_string(self, type_code):
         # type: (int) -> JavaString
@@ -347,9 +773,22 @@ class JavaStreamParser:
             if length < 65536:
                 self._log.warning("Small string stored as a long one")
 
+        if self.__limits is not None:
+            self.__limits.check_quota("max_string_length", length)
+            self._check_read(length)
+
         # Parse the content
-        data = self.__fd.read(length)
-        java_str = JavaString(handle, data)
+        if self.__spiller is not None and length > self.__spiller.threshold:
+            java_str = SpilledJavaString(
+                handle, self.__spiller.spill(self.__fd, length)
+            )  # type: JavaString
+        else:
+            data = self.__fd.read(length)
+            java_str = JavaString(handle, data)
+
+        if self.__stats is not None:
+            self.__stats.strings += 1
+            self.__stats.string_bytes += length
 
         # Store the reference to the string
         self._set_handle(handle, java_str)
@@ -360,16 +799,59 @@ class JavaStreamParser:
         """
         Reads a class description with its type code
         """
+        return run_task(self._read_classdesc_step())
+
+    def _read_classdesc_step(self):
+        # type: () -> Any
+        """
+        Reads the type code of a class description, then returns it if it is
+        a reference or the task parsing it (see run_task)
+        """
         type_code = self.__reader.read_byte()
-        return self._do_classdesc(type_code)
+        if self.__observers:
+            return self._observe_task(type_code, self._do_classdesc_step)
+
+        return self._do_classdesc_step(type_code)
 
     def _do_classdesc(self, type_code):
         # type: (int) -> JavaClassDesc
         """
         Parses a class description
         """
-        if type_code == TerminalCode.TC_CLASSDESC:
+        return run_task(self._do_classdesc_step(type_code))
+
+    def _do_classdesc_step(self, type_code):
+        # type: (int) -> Any
+        """
+        Returns the referenced class description or the task parsing a new
+        one (see run_task)
+        """
+        if type_code in (
+            TerminalCode.TC_CLASSDESC,
+            TerminalCode.TC_PROXYCLASSDESC,
+        ):
             # Do the real job
+            return self._do_classdesc_task(type_code)
+        elif type_code == TerminalCode.TC_NULL:
+            # Null reference
+            return None
+        elif type_code == TerminalCode.TC_REFERENCE:
+            # Reference to an already loading class description
+            previous = self._do_reference()
+            if not isinstance(previous, JavaClassDesc):
+                raise ValueError(
+                    "Referenced object is not a class description"
+                )
+            return previous
+
+        raise ValueError("Expected a valid class description starter")
+
+    def _do_classdesc_task(self, type_code):
+        # type: (int) -> Generator
+        """
+        Parses a new class description
+        """
+        if type_code == TerminalCode.TC_CLASSDESC:
             name = self.__reader.read_UTF()
             serial_version_uid = self.__reader.read_long()
             handle = self._new_handle()
@@ -405,27 +887,10 @@ class JavaStreamParser:
             class_desc.handle = handle
             class_desc.desc_flags = desc_flags
             class_desc.fields = fields
-            class_desc.annotations = self._read_class_annotations(class_desc)
-            class_desc.super_class = self._read_classdesc()
-
-            if class_desc.super_class:
-                class_desc.super_class.is_super_class = True
-
-            # Store the reference to the parsed bean
-            self._set_handle(handle, class_desc)
-            return class_desc
-        elif type_code == TerminalCode.TC_NULL:
-            # Null reference
-            return None
-        elif type_code == TerminalCode.TC_REFERENCE:
-            # Reference to an already loading class description
-            previous = self._do_reference()
-            if not isinstance(previous, JavaClassDesc):
-                raise ValueError(
-                    "Referenced object is not a class description"
-                )
-            return previous
-        elif type_code == TerminalCode.TC_PROXYCLASSDESC:
+            class_desc.annotations = yield self._read_class_annotations_task(
+                class_desc
+            )
+        else:
             # Proxy class description
             handle = self._new_handle()
             nb_interfaces = self.__reader.read_int()
@@ -436,17 +901,19 @@ class JavaStreamParser:
             class_desc = JavaClassDesc(ClassDescType.PROXYCLASS)
             class_desc.handle = handle
             class_desc.interfaces = interfaces
-            class_desc.annotations = self._read_class_annotations()
-            class_desc.super_class = self._read_classdesc()
+            class_desc.annotations = yield self._read_class_annotations_task()
 
-            if class_desc.super_class:
-                class_desc.super_class.is_super_class = True
+        super_class = self._read_classdesc_step()
+        if isinstance(super_class, GeneratorType):
+            super_class = yield super_class
 
-            # Store the reference to the parsed bean
-            self._set_handle(handle, class_desc)
-            return class_desc
+        class_desc.super_class = super_class
+        if class_desc.super_class:
+            class_desc.super_class.is_super_class = True
 
-        raise ValueError("Expected a valid class description starter")
+        # Store the reference to the parsed bean
+        self._set_handle(handle, class_desc)
+        yield class_desc
 
     def _custom_readObject(self, class_name):
         # type: (str) -> ParsedJavaContent
@@ -472,18 +939,30 @@ class JavaStreamParser:
         """
         Reads the annotations associated to a class
         """
+        return run_task(self._read_class_annotations_task(class_desc))
+
+    def _read_class_annotations_task(self, class_desc=None):
+        # type: (Optional[JavaClassDesc]) -> Generator
+        """
+        Task reading the annotations associated to a class
+        """
         contents = []  # type: List[ParsedJavaContent]
         while True:
             type_code = self.__reader.read_byte()
             if type_code == TerminalCode.TC_ENDBLOCKDATA:
                 # We're done here
-                return contents
+                break
             elif type_code == TerminalCode.TC_RESET:
                 # Reset references
+                if self.__stats is not None:
+                    self.__stats.resets += 1
+
                 self._reset()
                 continue
 
-            java_object = self._read_content(type_code, True, class_desc)
+            java_object = self._read_content_step(type_code, True, class_desc)
+            if isinstance(java_object, GeneratorType):
+                java_object = yield java_object
 
             if java_object is not None and java_object.is_exception:
                 # Found an exception: raise it
@@ -491,7 +970,7 @@ class JavaStreamParser:
 
             contents.append(java_object)
 
-        raise Exception("Class annotation reading stopped before end")
+        yield contents
 
     def _create_instance(self, class_desc):
         # type: (JavaClassDesc) -> JavaInstance
@@ -510,13 +989,20 @@ class JavaStreamParser:
 
         return JavaInstance()
 
-    def _do_object(self, type_code=0):
-        # type: (int) -> JavaInstance
+    def _do_object_task(self, type_code=0):
+        # type: (int) -> Generator
         """
         Parses an object
         """
+        if self.__stats is not None:
+            # Include the type code in the object size
+            start = self.__fd.tell() - 1
+            start_time = perf_counter()
+
         # Parse the object class description
-        class_desc = self._read_classdesc()
+        class_desc = self._read_classdesc_step()
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
 
         # Assign a new handle
         handle = self._new_handle()
@@ -531,11 +1017,22 @@ class JavaStreamParser:
 
         # Store the instance
         self._set_handle(handle, instance)
+        if self.__graph_index is not None:
+            self.__graph_index.add_instance(class_desc.name, instance)
 
         # Read the instance content
-        self._read_class_data(instance)
+        yield self._read_class_data_task(instance)
         self._log.debug("Done reading object handle %x", handle)
-        return instance
+
+        if self.__stats is not None:
+            self.__stats.objects += 1
+            self.__stats.add_instance(
+                class_desc.name,
+                self.__fd.tell() - start,
+                perf_counter() - start_time,
+            )
+
+        yield instance
 
     def _is_default_supported(self, class_name):
         # type: (str) -> bool
@@ -557,6 +1054,13 @@ class JavaStreamParser:
         """
         Reads the content of an instance
         """
+        run_task(self._read_class_data_task(instance))
+
+    def _read_class_data_task(self, instance):
+        # type: (JavaInstance) -> Generator
+        """
+        Task reading the content of an instance
+        """
         # Read the class hierarchy
         classes = []  # type: List[JavaClassDesc]
         instance.classdesc.get_hierarchy(classes)
@@ -575,14 +1079,21 @@ class JavaStreamParser:
                     cd.data_type == ClassDataType.WRCLASS
                     and instance.is_external_instance
                 ):
-                    annotations[cd] = self._read_class_annotations(cd)
+                    annotations[cd] = yield self._read_class_annotations_task(
+                        cd
+                    )
                 else:
                     for field in cd.fields:
-                        values[field] = self._read_field_value(field.type)
+                        value = self._read_field_step(field.type)
+                        if isinstance(value, GeneratorType):
+                            value = self._check_exception((yield value))
+                        values[field] = value
                     all_data[cd] = values
 
                     if cd.data_type == ClassDataType.WRCLASS:
-                        annotations[cd] = self._read_class_annotations(cd)
+                        annotations[
+                            cd
+                        ] = yield self._read_class_annotations_task(cd)
             else:
                 if cd.data_type == ClassDataType.OBJECT_ANNOTATION:
                     # Call the transformer if possible
@@ -592,12 +1103,25 @@ class JavaStreamParser:
                             "hit externalizable with nonzero SC_BLOCK_DATA; "
                             "can't interpret data"
                         )
-                annotations[cd] = self._read_class_annotations(cd)
+                annotations[cd] = yield self._read_class_annotations_task(cd)
 
         # Fill the instance object
         instance.annotations = annotations
         instance.field_data = all_data
 
+        if self.__graph_index is not None:
+            # All the values of the instance, to list it once per referenced
+            # content
+            self.__graph_index.add_references(
+                instance,
+                itertools.chain(
+                    itertools.chain.from_iterable(
+                        values.values() for values in all_data.values()
+                    ),
+                    itertools.chain.from_iterable(annotations.values()),
+                ),
+            )
+
         # Load transformation from the fields and annotations
         instance.load_from_instance()
 
@@ -606,6 +1130,18 @@ class JavaStreamParser:
         """
         Reads the value of an instance field
         """
+        value = self._read_field_step(field_type)
+        if isinstance(value, GeneratorType):
+            value = self._check_exception(run_task(value))
+        return value
+
+    def _read_field_step(self, field_type):
+        # type: (FieldType) -> Any
+        """
+        Reads the value of an instance field, or returns the task parsing it
+        if it is a new object (see run_task). The result of that task must be
+        checked with _check_exception().
+        """
         if field_type == FieldType.BYTE:
             return self.__reader.read_byte()
         if field_type == FieldType.CHAR:
@@ -626,17 +1162,17 @@ class JavaStreamParser:
             sub_type_code = self.__reader.read_byte()
             if field_type == FieldType.ARRAY:
                 if sub_type_code == TerminalCode.TC_REFERENCE:
-                    return self._do_classdesc(sub_type_code)
+                    return self._do_classdesc_step(sub_type_code)
                 if sub_type_code != TerminalCode.TC_ARRAY:
                     raise ValueError(
                         "Array type listed, but type code != TC_ARRAY"
                     )
 
-            content = self._read_content(sub_type_code, False)
-            if content is not None and content.is_exception:
-                raise ExceptionRead(content)
+            content = self._read_content_step(sub_type_code, False, None, True)
+            if isinstance(content, GeneratorType):
+                return content
 
-            return content
+            return self._check_exception(content)
 
         raise ValueError("Can't process type: {0}".format(field_type))
 
@@ -645,18 +1181,24 @@ class JavaStreamParser:
         """
         Returns an object already parsed
         """
+        if self.__stats is not None:
+            self.__stats.references += 1
+
         handle = self.__reader.read_int()
         try:
             return self.__handles[handle]
         except KeyError:
             raise ValueError("Invalid reference handle: {0:x}".format(handle))
 
-    def _do_enum(self, type_code):
-        # type: (int) -> JavaEnum
+    def _do_enum_task(self, type_code):
+        # type: (int) -> Generator
         """
         Parses an enumeration
         """
-        cd = self._read_classdesc()
+        cd = self._read_classdesc_step()
+        if isinstance(cd, GeneratorType):
+            cd = yield cd
+
         if cd is None:
             raise ValueError("Enum description can't be null")
 
@@ -670,27 +1212,41 @@ class JavaStreamParser:
         # Store the object
         enum_obj = JavaEnum(handle, cd, enum_str)
         self._set_handle(handle, enum_obj)
-        return enum_obj
 
-    def _do_class(self, type_code):
-        # type: (int) -> JavaClass
+        if self.__graph_index is not None:
+            self.__graph_index.add_instance(cd.name, enum_obj)
+        yield enum_obj
+
+    def _do_class_task(self, type_code):
+        # type: (int) -> Generator
         """
         Parses a class
         """
-        cd = self._read_classdesc()
+        cd = self._read_classdesc_step()
+        if isinstance(cd, GeneratorType):
+            cd = yield cd
+
         handle = self._new_handle()
         class_obj = JavaClass(handle, cd)
 
         # Store the class object
         self._set_handle(handle, class_obj)
-        return class_obj
+        yield class_obj
 
-    def _do_array(self, type_code):
-        # type: (int) -> JavaArray
+    def _do_array_task(self, type_code):
+        # type: (int) -> Generator
         """
         Parses an array
         """
-        cd = self._read_classdesc()
+        if self.__stats is not None:
+            # Include the type code in the array size
+            start = self.__fd.tell() - 1
+            start_time = perf_counter()
+
+        cd = self._read_classdesc_step()
+        if isinstance(cd, GeneratorType):
+            cd = yield cd
+
         handle = self._new_handle()
         if not cd.name or len(cd.name) < 2:
             raise ValueError("Invalid name in array class description")
@@ -704,20 +1260,56 @@ class JavaStreamParser:
         if size < 0:
             raise ValueError("Invalid array size")
 
+        if self.__limits is not None:
+            # Each element takes at least the width of a primitive value,
+            # or a byte (type code) for objects
+            self.__limits.check_quota("max_array_length", size)
+            self._check_read(size * PRIMITIVE_SIZES.get(content_type_byte, 1))
+
         # Array content
-        for transformer in self.__transformers:
-            content = transformer.load_array(
-                self.__reader, field_type.type_code(), size
-            )
-            if content is not None:
-                break
+        content = None  # type: Any
+        if (
+            self.__spiller is not None
+            and field_type == FieldType.BYTE
+            and size > self.__spiller.threshold
+        ):
+            content = self.__spiller.spill(self.__fd, size)
         else:
-            content = [self._read_field_value(field_type) for _ in range(size)]
+            for transformer in self.__transformers:
+                content = transformer.load_array(
+                    self.__reader, field_type.type_code(), size
+                )
+                if content is not None:
+                    break
 
-        return JavaArray(handle, cd, field_type, content)
+        if content is None:
+            limits = self.__limits
+            content = []
+            for index in range(size):
+                if limits is not None and not index % ARRAY_CHECK_INTERVAL:
+                    limits.check(self.__fd.tell(), self.__nb_handles)
+
+                value = self._read_field_step(field_type)
+                if isinstance(value, GeneratorType):
+                    value = self._check_exception((yield value))
+                content.append(value)
+
+        if self.__stats is not None:
+            self.__stats.arrays += 1
+            self.__stats.add_instance(
+                cd.name, self.__fd.tell() - start, perf_counter() - start_time
+            )
 
-    def _do_exception(self, type_code):
-        # type: (int) -> ParsedJavaContent
+        array = JavaArray(handle, cd, field_type, content)
+        if self.__graph_index is not None:
+            self.__graph_index.add_instance(cd.name, array)
+            if field_type in (FieldType.OBJECT, FieldType.ARRAY):
+                self.__graph_index.add_references(array, content)
+
+        yield array
+
+    def _do_exception_task(self, type_code):
+        # type: (int) -> Generator
         """
         Read the content of a thrown exception
         """
@@ -728,7 +1320,10 @@ class JavaStreamParser:
         if type_code == TerminalCode.TC_RESET:
             raise ValueError("TC_RESET read while reading exception")
 
-        content = self._read_content(type_code, False)
+        content = self._read_content_step(type_code, False)
+        if isinstance(content, GeneratorType):
+            content = yield content
+
         if content is None:
             raise ValueError("Null exception object")
 
@@ -741,7 +1336,7 @@ class JavaStreamParser:
         # Strange object ?
         content.is_exception = True
         self._reset()
-        return content
+        yield content
 
     def _do_block_data(self, type_code):
         # type: (int) -> BlockData
@@ -759,6 +1354,16 @@ class JavaStreamParser:
         if size < 0:
             raise ValueError("Invalid value for block data size")
 
+        self._check_read(size)
+
         # Read the block
-        data = self.__fd.read(size)
+        if self.__spiller is not None and size > self.__spiller.threshold:
+            data = self.__spiller.spill(self.__fd, size)
+        else:
+            data = self.__fd.read(size)
+
+        if self.__stats is not None:
+            self.__stats.block_data += 1
+            self.__stats.block_data_bytes += size
+
         return BlockData(data)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Indexes of the object graph, built while parsing a stream
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import Any, Dict, Iterable, List  # pylint:disable=W0611
+
+from .beans import BlockData, ParsedJavaContent
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+
+class GraphIndex(object):  # pylint:disable=R0205
+    """
+    Class name -> instances and handle -> referrers indexes, filled by the
+    parser as it reads the objects, arrays and enumeration constants (see
+    the graph_index argument of JavaStreamParser).
+
+    The referrers of a content are the objects and arrays having it as the
+    value of a field, as an element, or in the data written by their
+    writeObject() method. As handles are reused after a TC_RESET, the
+    referrers are kept by segment: the contents between two resets which
+    assigned handles.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        # Class name -> instances (objects, arrays and enumeration constants)
+        self.instances = {}  # type: Dict[str, List[ParsedJavaContent]]
+
+        # Handle -> referrers, for each segment
+        self.segments = [
+            {}
+        ]  # type: List[Dict[int, List[ParsedJavaContent]]]
+
+    def __str__(self):
+        return "[graph index: {0} classes, {1} segments]".format(
+            len(self.instances), len(self.segments)
+        )
+
+    __repr__ = __str__
+
+    def get_instances(self, class_name):
+        # type: (str) -> List[ParsedJavaContent]
+        """
+        Returns the instances of a class, in parsing order
+
+        :param class_name: Name of the class, e.g. "[I" for an array of int
+        :return: The list of its instances (can be empty)
+        """
+        return self.instances.get(class_name, [])
+
+    def get_referrers(self, handle, segment=-1):
+        # type: (int, int) -> List[ParsedJavaContent]
+        """
+        Returns the contents referencing the given handle, in the order
+        they ended being read (a referrer is listed once)
+
+        :param handle: Handle of the referenced content
+        :param segment: Index of the segment of the handle (the last one by
+                        default)
+        :return: The list of its referrers (can be empty)
+        """
+        return self.segments[segment].get(handle, [])
+
+    def add_instance(self, class_name, content):
+        # type: (str, ParsedJavaContent) -> None
+        """
+        Indexes a new object, array or enumeration constant
+        """
+        instances = self.instances.get(class_name)
+        if instances is None:
+            self.instances[class_name] = [content]
+        else:
+            instances.append(content)
+
+    def add_references(self, referrer, values):
+        # type: (ParsedJavaContent, Iterable[Any]) -> None
+        """
+        Indexes the references of a content to the given values. The values
+        which aren't contents, like primitive ones, are ignored.
+        """
+        referrers = self.segments[-1]
+        seen = set()
+        for value in values:
+            if not isinstance(value, ParsedJavaContent) or isinstance(
+                value, BlockData
+            ):
+                continue
+
+            handle = value.handle
+            if handle in seen:
+                continue
+
+            seen.add(handle)
+            value_referrers = referrers.get(handle)
+            if value_referrers is None:
+                referrers[handle] = [referrer]
+            else:
+                value_referrers.append(referrer)
+
+    def reset(self):
+        # type: () -> None
+        """
+        Starts a new segment, as after a TC_RESET
+        """
+        self.segments.append({})
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Shallow and retained sizes of the contents of a stream, like a heap
+histogram of a serialized object graph
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import (  # pylint:disable=W0611
+    IO,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+import gc
+
+from .api import ObjectTransformer, ParserObserver  # pylint:disable=W0611
+from .beans import BlockData
+from .main import load
+from ..constants import TerminalCode
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Index of the virtual root node, referencing the top-level contents
+ROOT = 0
+
+# Class names given to the contents which are not instances
+_TYPE_NAMES = {
+    TerminalCode.TC_CLASSDESC: "java.io.ObjectStreamClass",
+    TerminalCode.TC_PROXYCLASSDESC: "java.io.ObjectStreamClass",
+    TerminalCode.TC_CLASS: "java.lang.Class",
+    TerminalCode.TC_STRING: "java.lang.String",
+    TerminalCode.TC_LONGSTRING: "java.lang.String",
+}
+
+# ------------------------------------------------------------------------------
+
+
+class ClassSizes(object):  # pylint:disable=R0205
+    """
+    Sizes of the instances of a class
+    """
+
+    def __init__(self, name):
+        # type: (str) -> None
+        """
+        :param name: Name of the class
+        """
+        self.name = name
+
+        # Number of instances
+        self.instances = 0
+
+        # Bytes consumed by the instances themselves
+        self.shallow = 0
+
+        # Bytes which are only reachable through the instances
+        self.retained = 0
+
+    def __str__(self):
+        return "[class sizes {0}: {1} instances, {2} / {3} bytes]".format(
+            self.name, self.instances, self.shallow, self.retained
+        )
+
+    __repr__ = __str__
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns a JSON-compatible description of these sizes
+        """
+        return {
+            "name": self.name,
+            "instances": self.instances,
+            "shallow": self.shallow,
+            "retained": self.retained,
+        }
+
+
+class HeapGraph(ParserObserver):
+    """
+    Parser observer building the graph of the contents read, with the
+    number of bytes each one consumes in the stream.
+
+    The shallow size of a content is the number of bytes between its type
+    code and its end, minus the bytes of the new contents nested in it.
+    References, nulls and block data are part of the shallow size of the
+    content they are found in. The class descriptions are contents, named
+    java.io.ObjectStreamClass, referenced by their instances.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        # Per node: content, class name, shallow size and referenced nodes.
+        # The node 0 is the virtual root, referencing the top-level contents
+        self.contents = [None]  # type: List[Any]
+        self.class_names = [None]  # type: List[Optional[str]]
+        self.sizes = [0]  # type: List[int]
+        self.edges = [[]]  # type: List[List[int]]
+
+        # Identity of the contents -> node
+        self.__nodes = {}  # type: Dict[int, int]
+
+        # (referenced nodes, bytes of nested contents) of the contents being
+        # read
+        self.__stack = []  # type: List[Tuple[List[int], List[int]]]
+
+    def content_start(self, type_code, offset):
+        # type: (int, int) -> None
+        self.__stack.append(([], [0]))
+
+    def content_end(
+        self, type_code, handle, class_name, start, end, content
+    ):  # pylint:disable=R0913
+        # type: (int, Optional[int], Optional[str], int, int, Any) -> None
+        edges, nested = self.__stack.pop()
+        if self.__stack:
+            parent_edges, parent_nested = self.__stack[-1]
+        else:
+            parent_edges, parent_nested = self.edges[ROOT], [0]
+
+        if content is None or isinstance(content, BlockData):
+            # Part of the enclosing content
+            parent_nested[0] += nested[0]
+            return
+
+        node = self.__nodes.get(id(content))
+        if type_code == TerminalCode.TC_REFERENCE or (
+            node is not None and self.class_names[node] is not None
+        ):
+            # Reference to a content, which can still be being read
+            if node is None:
+                node = self.__new_node(content)
+
+            parent_edges.append(node)
+            parent_nested[0] += nested[0]
+            return
+
+        if node is None:
+            node = self.__new_node(content)
+
+        self.class_names[node] = (
+            _TYPE_NAMES.get(type_code, class_name) or "<unknown>"
+        )
+        self.sizes[node] = end - start - nested[0]
+        self.edges[node] = edges
+        parent_edges.append(node)
+        parent_nested[0] += end - start
+
+    def __new_node(self, content):
+        # type: (Any) -> int
+        """
+        Adds the node of a content to the graph
+        """
+        node = len(self.contents)
+        self.__nodes[id(content)] = node
+        self.contents.append(content)
+        self.class_names.append(None)
+        self.sizes.append(0)
+        self.edges.append([])
+        return node
+
+    def content_error(self, type_code, start, end, error):
+        # type: (int, int, int, Exception) -> None
+        self.__stack.pop()
+
+    def get_node(self, content):
+        # type: (Any) -> int
+        """
+        Returns the node of a parsed content
+
+        :raise KeyError: Unknown content
+        """
+        return self.__nodes[id(content)]
+
+    def analyze(self):
+        # type: () -> HeapAnalysis
+        """
+        Computes the retained sizes of the contents read so far
+        """
+        return HeapAnalysis(self)
+
+
+class HeapAnalysis(object):  # pylint:disable=R0205
+    """
+    Retained sizes of the contents of a HeapGraph.
+
+    The retained size of a content is the number of bytes of the contents
+    which can only be reached through it, including its own: the sum of the
+    shallow sizes of the contents it dominates. The dominator tree is
+    computed with the Lengauer-Tarjan algorithm.
+    """
+
+    def __init__(self, graph):
+        # type: (HeapGraph) -> None
+        """
+        :param graph: The graph of the contents of a stream
+        """
+        self.graph = graph
+
+        # The lists allocated below have no cycle: collecting the garbage
+        # would only walk through the parsed contents again and again
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # Immediate dominator and retained size of each node
+            self.dominators, order = self.__compute_dominators(graph.edges)
+            self.retained = self.__compute_retained(
+                graph.sizes, self.dominators, order
+            )
+
+            # Class name -> sizes
+            self.classes = self.__compute_classes(
+                graph.class_names, graph.sizes, self.dominators, self.retained
+            )  # type: Dict[str, ClassSizes]
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def __str__(self):
+        return "[heap analysis: {0} contents, {1} bytes]".format(
+            len(self.retained) - 1, self.retained[ROOT]
+        )
+
+    __repr__ = __str__
+
+    @staticmethod
+    def __compute_dominators(edges):
+        # type: (List[List[int]]) -> Tuple[List[int], List[int]]
+        """
+        Computes the immediate dominator of each node, the root being its
+        own dominator, with the Lengauer-Tarjan algorithm. The deep graphs
+        of serialized linked structures are handled without recursion.
+
+        :return: The dominators and the nodes in depth-first pre-order
+        """
+        nb_nodes = len(edges)
+
+        # Depth-first walk: the nodes are numbered in pre-order in the
+        # following, the root being 0
+        numbers = [-1] * nb_nodes
+        order = []  # type: List[int]
+        parents = []  # type: List[int]
+        numbers[ROOT] = 0
+        order.append(ROOT)
+        parents.append(0)
+        stack = [(0, iter(edges[ROOT]))]
+        while stack:
+            number, children = stack[-1]
+            for child in children:
+                if numbers[child] == -1:
+                    numbers[child] = len(order)
+                    order.append(child)
+                    parents.append(number)
+                    stack.append((numbers[child], iter(edges[child])))
+                    break
+            else:
+                stack.pop()
+
+        nb_reached = len(order)
+        predecessors = [[] for _ in range(nb_reached)]  # type: List[List[int]]
+        for number, node in enumerate(order):
+            for child in edges[node]:
+                predecessors[numbers[child]].append(number)
+
+        semi = list(range(nb_reached))
+        label = list(range(nb_reached))
+        ancestors = [-1] * nb_reached
+        numbered = [0] * nb_reached
+        buckets = [[] for _ in range(nb_reached)]  # type: List[List[int]]
+
+        def evaluate(number):
+            # type: (int) -> int
+            """
+            Returns the node with the smallest semi-dominator on the path
+            from the given node to the root of its tree in the forest,
+            compressing this path
+            """
+            if ancestors[number] == -1:
+                return number
+
+            path = []
+            while ancestors[ancestors[number]] != -1:
+                path.append(number)
+                number = ancestors[number]
+
+            for number in reversed(path):
+                ancestor = ancestors[number]
+                if semi[label[ancestor]] < semi[label[number]]:
+                    label[number] = label[ancestor]
+                ancestors[number] = ancestors[ancestor]
+
+            return label[number]
+
+        for number in range(nb_reached - 1, 0, -1):
+            for predecessor in predecessors[number]:
+                smallest = evaluate(predecessor)
+                if semi[smallest] < semi[number]:
+                    semi[number] = semi[smallest]
+
+            buckets[semi[number]].append(number)
+            parent = parents[number]
+            ancestors[number] = parent
+            for dominated in buckets[parent]:
+                smallest = evaluate(dominated)
+                numbered[dominated] = (
+                    smallest if semi[smallest] < semi[dominated] else parent
+                )
+            buckets[parent] = []
+
+        for number in range(1, nb_reached):
+            if numbered[number] != semi[number]:
+                numbered[number] = numbered[numbered[number]]
+
+        dominators = [ROOT] * nb_nodes
+        for number, node in enumerate(order):
+            dominators[node] = order[numbered[number]]
+
+        return dominators, order
+
+    @staticmethod
+    def __compute_retained(sizes, dominators, order):
+        # type: (List[int], List[int], List[int]) -> List[int]
+        """
+        Sums the shallow sizes of the nodes dominated by each node
+        """
+        retained = list(sizes)
+
+        # A dominator is an ancestor in the depth-first walk: it comes
+        # before the nodes it dominates in pre-order
+        for node in reversed(order[1:]):
+            retained[dominators[node]] += retained[node]
+
+        return retained
+
+    @staticmethod
+    def __compute_classes(class_names, sizes, dominators, retained):
+        # type: (List[Optional[str]], List[int], List[int], List[int]) -> Dict[str, ClassSizes]
+        """
+        Aggregates the sizes by class. The retained size of a class only
+        counts the instances which are not dominated by another instance of
+        the same class.
+        """
+        classes = {}  # type: Dict[str, ClassSizes]
+        children = [[] for _ in sizes]  # type: List[List[int]]
+        for node in range(1, len(sizes)):
+            children[dominators[node]].append(node)
+
+        # Number of instances of each class among the dominators of the
+        # current node
+        active = {}  # type: Dict[Optional[str], int]
+        stack = [(ROOT, False)]
+        while stack:
+            node, leaving = stack.pop()
+            name = class_names[node]
+            if leaving:
+                active[name] -= 1
+                continue
+
+            if node != ROOT:
+                class_sizes = classes.get(name)  # type: ignore
+                if class_sizes is None:
+                    class_sizes = classes[name] = ClassSizes(name)  # type: ignore
+
+                class_sizes.instances += 1
+                class_sizes.shallow += sizes[node]
+                if not active.get(name):
+                    class_sizes.retained += retained[node]
+
+            active[name] = active.get(name, 0) + 1
+            stack.append((node, True))
+            stack.extend((child, False) for child in children[node])
+
+        return classes
+
+    def get_sizes(self, content):
+        # type: (Any) -> Tuple[int, int]
+        """
+        Returns the shallow and retained sizes of a parsed content
+
+        :raise KeyError: Unknown content
+        """
+        node = self.graph.get_node(content)
+        return self.graph.sizes[node], self.retained[node]
+
+    def get_dominator(self, content):
+        # type: (Any) -> Any
+        """
+        Returns the content through which the given one is retained, or
+        None for a top-level content
+
+        :raise KeyError: Unknown content
+        """
+        return self.graph.contents[
+            self.dominators[self.graph.get_node(content)]
+        ]
+
+    def get_classes(self):
+        # type: () -> List[ClassSizes]
+        """
+        Returns the sizes of the classes, largest retained size first
+        """
+        return sorted(
+            self.classes.values(),
+            key=lambda sizes: (-sizes.retained, -sizes.shallow, sizes.name),
+        )
+
+    def get_largest(self, limit=20):
+        # type: (int) -> List[int]
+        """
+        Returns the nodes of the graph with the largest retained sizes
+        """
+        retained = self.retained
+        nodes = sorted(
+            range(1, len(retained)), key=lambda node: -retained[node]
+        )
+        return nodes[:limit]
+
+    def to_dict(self, limit=20):
+        # type: (int) -> Dict[str, Any]
+        """
+        Returns a JSON-compatible description of the analysis
+
+        :param limit: Maximum number of contents described
+        """
+        graph = self.graph
+        contents = []  # type: List[Dict[str, Any]]
+        for node in self.get_largest(limit):
+            dominator = graph.contents[self.dominators[node]]
+            contents.append(
+                {
+                    "handle": graph.contents[node].handle,
+                    "class": graph.class_names[node],
+                    "shallow": graph.sizes[node],
+                    "retained": self.retained[node],
+                    "dominator": (
+                        dominator.handle if dominator is not None else None
+                    ),
+                }
+            )
+
+        return {
+            "total": self.retained[ROOT],
+            "classes": [sizes.to_dict() for sizes in self.get_classes()],
+            "contents": contents,
+        }
+
+    def report(self, limit=20):
+        # type: (int) -> str
+        """
+        Returns a human-readable report of the analysis
+
+        :param limit: Maximum number of classes and contents described
+        """
+        graph = self.graph
+        lines = [
+            "Total: {0} bytes".format(self.retained[ROOT]),
+            "",
+            "{0:>12} {1:>12} {2:>10}  {3}".format(
+                "Retained", "Shallow", "Instances", "Class"
+            ),
+        ]
+        for sizes in self.get_classes()[:limit]:
+            lines.append(
+                "{0:>12} {1:>12} {2:>10}  {3}".format(
+                    sizes.retained, sizes.shallow, sizes.instances, sizes.name
+                )
+            )
+
+        lines.extend(
+            (
+                "",
+                "{0:>12} {1:>12} {2:>10}  {3}".format(
+                    "Retained", "Shallow", "Handle", "Class"
+                ),
+            )
+        )
+        for node in self.get_largest(limit):
+            lines.append(
+                "{0:>12} {1:>12} {2:>10}  {3}".format(
+                    self.retained[node],
+                    graph.sizes[node],
+                    "0x{0:x}".format(graph.contents[node].handle),
+                    graph.class_names[node],
+                )
+            )
+
+        return "\n".join(lines)
+
+
+def analyze_sizes(file_object, *transformers, **kwargs):
+    # type: (IO[bytes], ObjectTransformer, Any) -> HeapAnalysis
+    """
+    Parses a stream and computes the sizes of its contents. Accepts the same
+    keyword arguments as load(), except collect_stats and lazy.
+
+    :param file_object: A file-like object
+    :param transformers: Custom transformers to use
+    :return: The analysis of the sizes of the contents of the stream
+    """
+    graph = HeapGraph()
+    kwargs["observers"] = list(kwargs.get("observers") or ()) + [graph]
+    kwargs.pop("collect_stats", None)
+    kwargs.pop("lazy", None)
+    load(file_object, *transformers, **kwargs)
+    return graph.analyze()
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Byte-offset index of the top-level contents of a stream, to parse them on
+demand instead of parsing the whole stream
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import (  # pylint:disable=W0611
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import bisect
+import json
+import mmap
+import os
+import struct
+
+try:
+    # Python 2
+    from StringIO import StringIO as BytesIO
+except ImportError:
+    # Python 3+
+    from io import BytesIO
+
+from ..constants import StreamConstants, TerminalCode
+from .api import ObjectTransformer  # pylint:disable=W0611
+from .beans import ParsedJavaContent  # pylint:disable=W0611
+from .core import JavaStreamParser  # pylint:disable=W0611
+from .main import _create_parser
+from .scanner import StreamScanner
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Identifier and version of the index file format
+INDEX_FORMAT = "javaobj-index"
+INDEX_FORMAT_VERSION = 1
+
+# Suffix added to the path of a stream to get the path of its index
+INDEX_SUFFIX = ".jidx"
+
+# Types considered as in-memory streams instead of paths
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+# Structure of a handle
+_INT = struct.Struct(">i")
+
+# Class names of the contents which don't have a class description
+_CLASS_NAMES = {
+    TerminalCode.TC_STRING: "java.lang.String",
+    TerminalCode.TC_LONGSTRING: "java.lang.String",
+    TerminalCode.TC_CLASS: "java.lang.Class",
+}
+
+# ------------------------------------------------------------------------------
+
+
+class IndexEntry(object):  # pylint:disable=R0205
+    """
+    Location of a top-level content of a stream
+    """
+
+    def __init__(
+        self,
+        type_code,
+        start,
+        end,
+        class_name=None,
+        segment=0,
+        first_handle=StreamConstants.BASE_REFERENCE_IDX,
+        next_handle=StreamConstants.BASE_REFERENCE_IDX,
+        references=None,
+    ):
+        # type: (int, int, int, Optional[str], int, int, int, Optional[List[int]]) -> None
+        """
+        :param type_code: Type code of the content
+        :param start: Offset of its first byte
+        :param end: Offset of the byte following it
+        :param class_name: Name of its class, if known
+        :param segment: Index of its segment, i.e. the number of TC_RESET
+                        markers (and exceptions) before it
+        :param first_handle: First handle it introduces
+        :param next_handle: Handle following the last one it introduces
+        :param references: Handles of the contents of its segment it
+                           references, which are introduced before it
+        """
+        self.type_code = int(type_code)
+        self.start = start
+        self.end = end
+        self.class_name = class_name
+        self.segment = segment
+        self.first_handle = int(first_handle)
+        self.next_handle = int(next_handle)
+        self.references = references or []  # type: List[int]
+
+    def __str__(self):
+        return (
+            "[index entry: type 0x{0:x}, offsets {1}-{2}, class {3}]".format(
+                self.type_code, self.start, self.end, self.class_name
+            )
+        )
+
+    __repr__ = __str__
+
+    def to_list(self):
+        # type: () -> List[Any]
+        """
+        Returns the description of this entry stored in the index file
+        """
+        return [
+            self.type_code,
+            self.start,
+            self.end,
+            self.class_name,
+            self.segment,
+            self.first_handle,
+            self.next_handle,
+            self.references,
+        ]
+
+
+class StreamIndex(object):  # pylint:disable=R0205
+    """
+    Index of the top-level contents of a stream: their offsets, class name
+    and the handles they introduce and reference
+    """
+
+    def __init__(self, entries, size):
+        # type: (List[IndexEntry], int) -> None
+        """
+        :param entries: Entries of the top-level contents, in stream order
+        :param size: Size of the indexed stream
+        """
+        self.entries = entries
+        self.size = size
+
+        # Segment -> (first handles, positions) of its entries, and number
+        # of entries in this map
+        self.__segments = {}  # type: Dict[int, Tuple[List[int], List[int]]]
+        self.__nb_mapped = 0
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.entries)
+
+    def find_handle(self, handle, segment=0):
+        # type: (int, int) -> int
+        """
+        Returns the position of the top-level content which introduces the
+        given handle
+
+        :param handle: A handle
+        :param segment: Index of the segment of the handle
+        :return: Position of the entry of the content
+        :raise ValueError: Unknown handle
+        """
+        # Entries can be added after the first lookup (see lazy)
+        segments = self.__segments
+        for position in range(self.__nb_mapped, len(self.entries)):
+            entry = self.entries[position]
+            if entry.next_handle > entry.first_handle:
+                handles, positions = segments.setdefault(
+                    entry.segment, ([], [])
+                )
+                handles.append(entry.first_handle)
+                positions.append(position)
+        self.__nb_mapped = len(self.entries)
+
+        handles, positions = self.__segments.get(segment, ([], []))
+        idx = bisect.bisect_right(handles, handle) - 1
+        if idx >= 0:
+            position = positions[idx]
+            if handle < self.entries[position].next_handle:
+                return position
+
+        raise ValueError(
+            "Invalid reference handle: {0:x} in segment {1}".format(
+                handle, segment
+            )
+        )
+
+    def get_dependencies(self, position):
+        # type: (int) -> List[int]
+        """
+        Returns the positions of the top-level contents which must be parsed
+        before the given one, as it references their handles, directly or
+        not
+
+        :param position: Position of an entry
+        :return: The sorted positions of the entries it depends on
+        :raise ValueError: Invalid reference
+        """
+        needed = set()
+        stack = [position]
+        while stack:
+            entry = self.entries[stack.pop()]
+            for handle in entry.references:
+                dependency = self.find_handle(handle, entry.segment)
+                if dependency not in needed:
+                    needed.add(dependency)
+                    stack.append(dependency)
+
+        return sorted(needed)
+
+    def save(self, path):
+        # type: (str) -> None
+        """
+        Writes the index to a file
+
+        :param path: Path of the index file
+        """
+        with open(path, "w") as fd:
+            json.dump(
+                {
+                    "format": INDEX_FORMAT,
+                    "version": INDEX_FORMAT_VERSION,
+                    "size": self.size,
+                    "entries": [entry.to_list() for entry in self.entries],
+                },
+                fd,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, path):
+        # type: (str) -> StreamIndex
+        """
+        Reads an index file
+
+        :param path: Path of the index file
+        :return: The index
+        :raise ValueError: Invalid index file
+        """
+        with open(path, "r") as fd:
+            content = json.load(fd)
+
+        if (
+            content.get("format") != INDEX_FORMAT
+            or content.get("version") != INDEX_FORMAT_VERSION
+        ):
+            raise ValueError("Unsupported index file: {0}".format(path))
+
+        return cls(
+            [IndexEntry(*item) for item in content["entries"]],
+            content["size"],
+        )
+
+
+# ------------------------------------------------------------------------------
+
+
+def _get_class_name(scanner, data, type_code, start, first_handle):
+    # type: (StreamScanner, Any, int, int, int) -> Optional[str]
+    """
+    Returns the name of the class of a top-level content which has just been
+    scanned
+    """
+    if type_code in _CLASS_NAMES:
+        return _CLASS_NAMES[type_code]
+
+    if type_code == TerminalCode.TC_CLASSDESC:
+        handle = first_handle
+    elif type_code in (
+        TerminalCode.TC_OBJECT,
+        TerminalCode.TC_ARRAY,
+        TerminalCode.TC_ENUM,
+    ):
+        # The content starts with its class description
+        desc_type = bytearray(data[start + 1 : start + 2])[0]
+        if desc_type == TerminalCode.TC_CLASSDESC:
+            handle = first_handle
+        elif desc_type == TerminalCode.TC_REFERENCE:
+            handle = _INT.unpack_from(data, start + 2)[0]
+        else:
+            return None
+    else:
+        return None
+
+    try:
+        return scanner.get_class(handle).name
+    except ValueError:
+        # Handles reset while reading the content
+        return None
+
+
+def iter_index(data):
+    # type: (Any) -> Iterator[IndexEntry]
+    """
+    Indexes the top-level contents of a stream as it walks through them,
+    using a StreamScanner: no object is created.
+
+    :param data: Content of the whole stream, including its header (bytes,
+                 or a memory map of a file)
+    :return: An iterator of the entries of the top-level contents
+    :raise ValueError: Invalid or unsupported content
+    :raise EOFError: Stream has ended unexpectedly
+    """
+    scanner = StreamScanner(data)
+    scanner.read_header()
+    references = scanner.references = []  # type: List[int]
+
+    segment = 0
+    while True:
+        first_handle = scanner.next_handle
+        del references[:]
+        item = scanner.scan_next()
+        if item is None:
+            break
+
+        type_code, start, end = item
+        if type_code == TerminalCode.TC_RESET:
+            segment += 1
+            continue
+
+        if type_code == TerminalCode.TC_EXCEPTION:
+            # Exceptions are surrounded by resets
+            segment += 1
+            first_handle = StreamConstants.BASE_REFERENCE_IDX
+
+        yield IndexEntry(
+            type_code,
+            start,
+            end,
+            _get_class_name(scanner, data, type_code, start, first_handle),
+            segment,
+            first_handle,
+            scanner.next_handle,
+            sorted(set(ref for ref in references if ref < first_handle)),
+        )
+
+        if type_code == TerminalCode.TC_EXCEPTION:
+            segment += 1
+
+
+def build_index(data):
+    # type: (Any) -> StreamIndex
+    """
+    Indexes the top-level contents of a stream (see iter_index())
+
+    :param data: Content of the whole stream, including its header (bytes,
+                 or a memory map of a file)
+    :return: The index of the stream
+    :raise ValueError: Invalid or unsupported content
+    :raise EOFError: Stream has ended unexpectedly
+    """
+    return StreamIndex(list(iter_index(data)), len(data))
+
+
+def index_path(path):
+    # type: (str) -> str
+    """
+    Returns the path of the index file of a stream file
+    """
+    return path + INDEX_SUFFIX
+
+
+# ------------------------------------------------------------------------------
+
+
+class IndexedStream(object):  # pylint:disable=R0205
+    """
+    Random access to the top-level contents of a stream, using its index.
+
+    Getting a content only parses it and the contents it depends on, i.e.
+    those introducing the handles it references (class descriptions, shared
+    strings and objects, ...) in its segment. The contents already parsed in
+    the current segment are kept, and released when a content of another
+    segment is requested.
+    """
+
+    def __init__(self, source, *transformers, **kwargs):
+        # type: (Any, ObjectTransformer, Any) -> None
+        """
+        :param source: Path of the stream file, bytes of the stream or a
+                       seekable file object, which is closed by close()
+        :param transformers: Custom transformers to use
+        :param index: The StreamIndex to use, instead of reading or building
+                      it
+        :param save_index: If True (default), write the index built for a
+                           stream file to its sidecar file (see index_path())
+        :param use_numpy_arrays: If True, use the numpy array transformer
+        :raise ValueError: Invalid or unsupported content
+        :raise EOFError: Stream has ended unexpectedly
+        """
+        index = kwargs.pop("index", None)
+        save_index = kwargs.pop("save_index", True)
+        self.__transformers = transformers
+        self.__kwargs = kwargs
+
+        if isinstance(source, BUFFER_TYPES):
+            self.__fd = BytesIO(bytes(source))
+            if index is None:
+                index = build_index(self.__fd.getvalue())
+        elif hasattr(source, "read"):
+            self.__fd = source
+            if index is None:
+                source.seek(0)
+                index = build_index(source.read())
+        else:
+            self.__fd = open(source, "rb")
+            if index is None:
+                index = self.__load_index(source, save_index)
+
+        self.index = index
+
+        # Parser of the current segment and the contents it has read
+        self.__parser = None  # type: Optional[JavaStreamParser]
+        self.__segment = -1
+        self.__contents = {}  # type: Dict[int, ParsedJavaContent]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.index)
+
+    def __getitem__(self, position):
+        # type: (int) -> ParsedJavaContent
+        """
+        Returns the top-level content at the given position, as in the list
+        returned by JavaStreamParser.run()
+        """
+        return self.get(position)
+
+    def __load_index(self, path, save_index):
+        # type: (str, bool) -> StreamIndex
+        """
+        Reads the index of a stream file, or builds it if it is missing or
+        if the file has changed
+
+        :param path: Path of the stream file
+        :param save_index: If True, write the index file when it is built
+        """
+        sidecar = index_path(path)
+        size = os.path.getsize(path)
+        try:
+            if os.path.getmtime(sidecar) >= os.path.getmtime(path):
+                index = StreamIndex.load(sidecar)
+                if index.size == size:
+                    return index
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            # Missing or invalid index file
+            pass
+
+        if size == 0:
+            data = b""  # type: Any
+        else:
+            data = mmap.mmap(self.__fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            index = build_index(data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+        if save_index:
+            index.save(sidecar)
+
+        return index
+
+    def get(self, position):
+        # type: (int) -> ParsedJavaContent
+        """
+        Parses the top-level content at the given position, and the contents
+        it depends on
+
+        :param position: Position of the content in the stream
+        :return: The parsed content
+        :raise IndexError: Invalid position
+        :raise ValueError: Invalid or unsupported content
+        """
+        nb_entries = len(self.index.entries)
+        if position < 0:
+            # Contents are kept by their position from the start
+            position += nb_entries
+
+        if not 0 <= position < nb_entries:
+            raise IndexError("Content position out of range")
+
+        entry = self.index.entries[position]
+        if entry.segment != self.__segment:
+            # Release the contents of the previous segment
+            self.__parser = _create_parser(
+                self.__fd, self.__transformers, self.__kwargs
+            )
+            self.__segment = entry.segment
+            self.__contents = {}
+
+        contents = self.__contents
+        for needed in self.index.get_dependencies(position) + [position]:
+            if needed not in contents:
+                needed_entry = self.index.entries[needed]
+                contents[needed] = self.__parser.read_content_at(
+                    needed_entry.start, needed_entry.first_handle
+                )
+
+        return contents[position]
+
+    def get_handle(self, handle, segment=0):
+        # type: (int, int) -> ParsedJavaContent
+        """
+        Returns the content with the given handle, which can be nested in a
+        top-level content
+
+        :param handle: A handle
+        :param segment: Index of the segment of the handle
+        :return: The parsed content
+        :raise ValueError: Unknown handle
+        """
+        self.get(self.index.find_handle(handle, segment))
+        return self.__parser.get_handle(handle)
+
+    def close(self):
+        # type: () -> None
+        """
+        Closes the stream
+        """
+        self.__parser = None
+        self.__contents = {}
+        self.__fd.close()
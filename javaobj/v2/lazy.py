@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Lazy loading of streams: the top-level contents are parsed on first access
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import IO, Any, Iterator, List, Optional  # pylint:disable=W0611
+import mmap
+
+try:
+    # Python 2
+    from StringIO import StringIO as BytesIO
+except ImportError:
+    # Python 3+
+    from io import BytesIO
+
+from .api import ObjectTransformer  # pylint:disable=W0611
+from .beans import ParsedJavaContent  # pylint:disable=W0611
+from .index import IndexEntry, IndexedStream, StreamIndex, iter_index
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+
+class LazyContent(object):  # pylint:disable=R0205
+    """
+    Proxy of a top-level content, which is parsed when one of its attributes
+    is first accessed. The contents it depends on, like the class
+    descriptions it references, are parsed at the same time.
+
+    The proxy is not the content itself: use the content property to get it,
+    e.g. to compare it or to use a top-level string.
+    """
+
+    def __init__(self, contents, position):
+        # type: (LazyContents, int) -> None
+        """
+        :param contents: The lazy contents of the stream
+        :param position: Position of the content in the stream
+        """
+        self._contents = contents
+        self._position = position
+        self._content = None  # type: Optional[ParsedJavaContent]
+        self._loaded = False
+
+    def __str__(self):
+        if self._loaded:
+            return str(self._content)
+
+        return "[lazy content #{0}: {1}]".format(
+            self._position, self.entry.class_name
+        )
+
+    __repr__ = __str__
+
+    def __getattr__(self, name):
+        # type: (str) -> Any
+        if name.startswith("_"):
+            # Don't parse the content for special methods lookups (copy,
+            # pickle, ...) nor for the members of this proxy
+            raise AttributeError(name)
+
+        return getattr(self.content, name)
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.content)  # type: ignore
+
+    def __iter__(self):
+        # type: () -> Iterator[Any]
+        return iter(self.content)  # type: ignore
+
+    def __getitem__(self, key):
+        # type: (Any) -> Any
+        return self.content[key]  # type: ignore
+
+    @property
+    def entry(self):
+        # type: () -> IndexEntry
+        """
+        Index entry of the content: its offsets and class name are known
+        without parsing it
+        """
+        return self._contents.index.entries[self._position]
+
+    @property
+    def is_loaded(self):
+        # type: () -> bool
+        """
+        True if the content has been parsed
+        """
+        return self._loaded
+
+    @property
+    def content(self):
+        # type: () -> Optional[ParsedJavaContent]
+        """
+        The parsed content
+        """
+        if not self._loaded:
+            self._content = self._contents.stream.get(self._position)
+            self._loaded = True
+
+        return self._content
+
+
+class LazyContents(object):  # pylint:disable=R0205
+    """
+    Sequence of the top-level contents of a stream, as LazyContent proxies.
+
+    The stream is indexed as the contents are accessed: getting the first
+    content doesn't require to walk through the whole stream, unlike len().
+    """
+
+    def __init__(self, data, fd, transformers, kwargs):
+        # type: (Any, IO[bytes], List[ObjectTransformer], Any) -> None
+        """
+        :param data: Content of the stream, to index it
+        :param fd: Seekable file object of the stream, to parse it
+        :param transformers: Custom transformers to use
+        :param kwargs: load() options
+        """
+        self.__data = data
+        self.__entries = iter_index(data)
+        self.__proxies = []  # type: List[LazyContent]
+        self.index = StreamIndex([], len(data))
+        self.stream = IndexedStream(
+            fd, *transformers, index=self.index, **kwargs
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __str__(self):
+        return "[lazy contents: {0} indexed]".format(len(self.__proxies))
+
+    __repr__ = __str__
+
+    def __index_up_to(self, position):
+        # type: (int) -> None
+        """
+        Indexes the stream up to the given position (-1 for its end)
+        """
+        if self.__entries is None:
+            return
+
+        proxies = self.__proxies
+        while position < 0 or len(proxies) <= position:
+            try:
+                entry = next(self.__entries)
+            except StopIteration:
+                self.__entries = None
+                break
+
+            self.index.entries.append(entry)
+            proxies.append(LazyContent(self, len(proxies)))
+
+    def __len__(self):
+        # type: () -> int
+        self.__index_up_to(-1)
+        return len(self.__proxies)
+
+    def __getitem__(self, position):
+        # type: (int) -> LazyContent
+        if position < 0:
+            self.__index_up_to(-1)
+        else:
+            self.__index_up_to(position)
+
+        return self.__proxies[position]
+
+    def __iter__(self):
+        # type: () -> Iterator[LazyContent]
+        position = 0
+        while True:
+            self.__index_up_to(position)
+            if position >= len(self.__proxies):
+                break
+
+            yield self.__proxies[position]
+            position += 1
+
+    def close(self):
+        # type: () -> None
+        """
+        Closes the stream: the contents which have not been parsed can't be
+        accessed anymore
+        """
+        self.__entries = None
+        self.stream.close()
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+
+
+def load_lazy(file_object, transformers, kwargs):
+    # type: (IO[bytes], List[ObjectTransformer], Any) -> LazyContents
+    """
+    Prepares the lazy loading of a stream. A file is memory-mapped, any
+    other stream is read in memory.
+
+    :param file_object: A file-like object, closed with the result
+    :param transformers: Custom transformers to use
+    :param kwargs: load() options
+    :return: The lazy contents of the stream
+    """
+    try:
+        data = mmap.mmap(
+            file_object.fileno(), 0, access=mmap.ACCESS_READ
+        )  # type: Any
+        fd = file_object
+    except (AttributeError, IOError, OSError, ValueError):
+        # Not a file, or an empty one
+        data = file_object.read()
+        fd = BytesIO(data)
+
+    return LazyContents(data, fd, transformers, kwargs)
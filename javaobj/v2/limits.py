@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Limits of the resources a parser can use: parsing deadlines, cancellation
+and quotas
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import Any, Dict, Optional  # pylint:disable=W0611
+import threading
+
+try:
+    # Python 3.3+
+    from time import monotonic
+except ImportError:
+    # Python 2
+    from time import time as monotonic
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Number of handles assigned between two checks of the limits (power of 2)
+HANDLE_CHECK_INTERVAL = 64
+
+# Number of array elements read between two checks of the limits
+ARRAY_CHECK_INTERVAL = 16384
+
+# Names of the quotas, which are also the names of the load() options
+QUOTAS = (
+    "max_handles",
+    "max_bytes",
+    "max_array_length",
+    "max_string_length",
+    "max_depth",
+)
+
+# ------------------------------------------------------------------------------
+
+
+class ParseInterruptedError(Exception):
+    """
+    The parsing has been stopped before its end. The progress made so far is
+    given by the offset, handles and elapsed members.
+    """
+
+    def __init__(self, message, offset, handles, elapsed):
+        # type: (str, int, int, float) -> None
+        """
+        :param message: Error message
+        :param offset: Offset in the stream when the parsing was stopped
+        :param handles: Number of contents read (objects, strings, arrays,
+                        class descriptions, ...)
+        :param elapsed: Time spent parsing, in seconds
+        """
+        super(ParseInterruptedError, self).__init__(
+            "{0} at offset {1}, after {2} contents and {3:.3f}s".format(
+                message, offset, handles, elapsed
+            )
+        )
+        self.offset = offset
+        self.handles = handles
+        self.elapsed = elapsed
+
+
+class ParseTimeoutError(ParseInterruptedError):
+    """
+    The parsing deadline has been reached
+    """
+
+    pass
+
+
+class ParseCancelledError(ParseInterruptedError):
+    """
+    The parsing has been cancelled through a CancellationToken
+    """
+
+    pass
+
+
+class QuotaExceededError(ValueError):
+    """
+    The stream requires more resources than allowed by a quota
+    """
+
+    def __init__(self, quota, limit, value):
+        # type: (str, int, int) -> None
+        """
+        :param quota: Name of the quota (max_handles, max_bytes, ...)
+        :param limit: Value of the quota
+        :param value: Value which exceeds the quota
+        """
+        super(QuotaExceededError, self).__init__(
+            "Quota {0} exceeded: {1} > {2}".format(quota, value, limit)
+        )
+        self.quota = quota
+        self.limit = limit
+        self.value = value
+
+
+class CancellationToken(object):  # pylint:disable=R0205
+    """
+    Token given to parsers, which stop at their next check once it has been
+    cancelled, e.g. from another thread
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self.__event = threading.Event()
+
+    def __str__(self):
+        return "[cancellation token: {0}]".format(
+            "cancelled" if self.cancelled else "active"
+        )
+
+    __repr__ = __str__
+
+    @property
+    def cancelled(self):
+        # type: () -> bool
+        """
+        True once cancel() has been called
+        """
+        return self.__event.is_set()
+
+    def cancel(self):
+        # type: () -> None
+        """
+        Requests the parsers using this token to stop
+        """
+        self.__event.set()
+
+
+class ParseLimits(object):  # pylint:disable=R0205
+    """
+    Checks a parsing deadline, a cancellation token and quotas.
+
+    The quotas are checked by the parser before allocating the resources
+    they limit: the number of handles (new objects, strings, arrays, class
+    descriptions, ...), the number of bytes read from the stream, the
+    number of elements of an array, the number of bytes of a string and the
+    nesting depth of the objects and arrays. A quota set to None is not
+    checked.
+    """
+
+    def __init__(
+        self,
+        deadline=None,
+        cancel_token=None,
+        max_handles=None,
+        max_bytes=None,
+        max_array_length=None,
+        max_string_length=None,
+        max_depth=None,
+    ):  # pylint:disable=R0913
+        # type: (Optional[float], Optional[CancellationToken], Optional[int], Optional[int], Optional[int], Optional[int], Optional[int]) -> None
+        """
+        :param deadline: Time after which the parsing must stop, as given by
+                         javaobj.v2.limits.monotonic()
+        :param cancel_token: A CancellationToken
+        :param max_handles: Maximum number of handles assigned
+        :param max_bytes: Maximum number of bytes read
+        :param max_array_length: Maximum number of elements of an array
+        :param max_string_length: Maximum number of bytes of a string
+        :param max_depth: Maximum nesting depth of objects and arrays
+        """
+        self.deadline = deadline
+        self.cancel_token = cancel_token
+        self.max_handles = max_handles
+        self.max_bytes = max_bytes
+        self.max_array_length = max_array_length
+        self.max_string_length = max_string_length
+        self.max_depth = max_depth
+        self.start = monotonic()
+
+    def __str__(self):
+        return "[parse limits: deadline {0}, token {1}]".format(
+            self.deadline, self.cancel_token
+        )
+
+    __repr__ = __str__
+
+    @classmethod
+    def from_kwargs(cls, kwargs):
+        # type: (Dict[str, Any]) -> Optional[ParseLimits]
+        """
+        Prepares the limits given as load() options
+
+        :param kwargs: load() options: deadline (monotonic time), timeout
+                       (budget in seconds), cancel_token and the quotas
+        :return: The limits, or None if there is none
+        """
+        deadline = kwargs.get("deadline")
+        timeout = kwargs.get("timeout")
+        cancel_token = kwargs.get("cancel_token")
+        if timeout is not None:
+            timeout_deadline = monotonic() + timeout
+            if deadline is None or timeout_deadline < deadline:
+                deadline = timeout_deadline
+
+        quotas = dict(
+            (name, kwargs[name])
+            for name in QUOTAS
+            if kwargs.get(name) is not None
+        )
+        if deadline is None and cancel_token is None and not quotas:
+            return None
+
+        return cls(deadline, cancel_token, **quotas)
+
+    def check_quota(self, quota, value):
+        # type: (str, int) -> None
+        """
+        Checks a value against a quota
+
+        :param quota: Name of the quota (max_handles, max_bytes, ...)
+        :param value: Value to check
+        :raise QuotaExceededError: The value exceeds the quota
+        """
+        limit = getattr(self, quota)
+        if limit is not None and value > limit:
+            raise QuotaExceededError(quota, limit, value)
+
+    def check(self, offset, handles):
+        # type: (int, int) -> None
+        """
+        Checks if the parsing can go on
+
+        :param offset: Current offset in the stream
+        :param handles: Number of contents read so far
+        :raise ParseCancelledError: The parsing has been cancelled
+        :raise ParseTimeoutError: The deadline has been reached
+        """
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise ParseCancelledError(
+                "Parsing cancelled", offset, handles, monotonic() - self.start
+            )
+
+        if self.deadline is not None:
+            now = monotonic()
+            if now > self.deadline:
+                raise ParseTimeoutError(
+                    "Parsing deadline reached",
+                    offset,
+                    handles,
+                    now - self.start,
+                )
@@ -5,7 +5,15 @@ Mimics the core API with the new deserializer
 
 from __future__ import absolute_import
 
-from typing import Any, IO  # pylint:disable=W0611
+from typing import (  # pylint:disable=W0611
+    Any,
+    Dict,
+    IO,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+)
 
 try:
     # Python 2
@@ -15,7 +23,12 @@ except ImportError:
     from io import BytesIO
 
 from .api import ObjectTransformer  # pylint:disable=W0611
+from .beans import ParsedJavaContent  # pylint:disable=W0611
+from .compression import open_decompressed
 from .core import JavaStreamParser
+from .limits import ParseLimits
+from .spill import Spiller, map_file
+from .stream import open_read_ahead
 from .transformers import DefaultObjectTransformer, NumpyArrayTransformer
 
 # ------------------------------------------------------------------------------
@@ -30,15 +43,10 @@ __docformat__ = "restructuredtext en"
 # ------------------------------------------------------------------------------
 
 
-def load(file_object, *transformers, **kwargs):
-    # type: (IO[bytes], ObjectTransformer, Any) -> Any
+def _prepare_transformers(transformers, kwargs):
+    # type: (Iterable[ObjectTransformer], Dict[str, Any]) -> List[ObjectTransformer]
     """
-    Deserializes Java primitive data and objects serialized using
-    ObjectOutputStream from a file-like object.
-
-    :param file_object: A file-like object
-    :param transformers: Custom transformers to use
-    :return: The deserialized object
+    Returns the list of transformers to use according to the load() options
     """
     # Ensure we have the default object transformer
     all_transformers = list(transformers)
@@ -52,19 +60,217 @@ def load(file_object, *transformers, **kwargs):
         # Use the numpy array transformer if requested
         all_transformers.append(NumpyArrayTransformer())
 
-    # Parse the object(s)
-    parser = JavaStreamParser(file_object, all_transformers)
-    contents = parser.run()
+    return all_transformers
+
+
+def _open_input(file_object, kwargs, threaded=False):
+    # type: (IO[bytes], Dict[str, Any], bool) -> Tuple[IO[bytes], List[IO[bytes]]]
+    """
+    Prepares the stream to parse according to the load() options
+
+    :return: A (stream, wrappers) tuple: the wrappers of the given stream
+             must be closed after parsing, in the given order
+    """
+    stream = file_object
+    wrappers = []  # type: List[IO[bytes]]
+    if kwargs.get("read_ahead", False):
+        stream = open_read_ahead(stream)
+        wrappers.append(stream)
+
+    if kwargs.get("decompress", True):
+        stream, compression = open_decompressed(stream, threaded)
+        if compression is not None:
+            wrappers.insert(0, stream)
+
+    return stream, wrappers
+
+
+def _close_wrappers(wrappers):
+    # type: (List[IO[bytes]]) -> None
+    """
+    Closes the wrappers of a stream returned by _open_input()
+    """
+    for wrapper in wrappers:
+        wrapper.close()
+
+
+def _create_parser(file_object, transformers, kwargs, source=None):
+    # type: (IO[bytes], Iterable[ObjectTransformer], Dict[str, Any], Any) -> JavaStreamParser
+    """
+    Prepares a parser with the given transformers and load() options
+
+    :param source: Content of the whole parsed stream (bytes or memory map),
+                   where the spilled values can be referenced in place
+    """
+    return JavaStreamParser(
+        file_object,
+        _prepare_transformers(transformers, kwargs),
+        kwargs.get("collect_stats", False),
+        kwargs.get("observers"),
+        graph_index=kwargs.get("graph_index"),
+        limits=ParseLimits.from_kwargs(kwargs),
+        spiller=Spiller.from_kwargs(kwargs, source),
+    )
+
+
+def load(file_object, *transformers, **kwargs):
+    # type: (IO[bytes], ObjectTransformer, Any) -> Any
+    """
+    Deserializes Java primitive data and objects serialized using
+    ObjectOutputStream from a file-like object.
+
+    Streams compressed with gzip or zlib (e.g. written through a Java
+    GZIPOutputStream or DeflaterOutputStream) are detected and decompressed
+    while being parsed.
+
+    :param file_object: A file-like object
+    :param transformers: Custom transformers to use
+    :param collect_stats: If True, return a tuple (object, ParseStats)
+    :param observers: Parser observers to notify while reading contents
+    :param graph_index: A javaobj.v2.graph.GraphIndex to fill with the
+                        instances and the referrers of the contents
+    :param timeout: Maximum time to spend parsing, in seconds
+    :param deadline: Time after which the parsing must stop, as given by
+                     javaobj.v2.limits.monotonic()
+    :param cancel_token: A javaobj.v2.limits.CancellationToken, which stops
+                         the parsing once cancelled
+    :param max_handles: Maximum number of contents (objects, strings,
+                        arrays, class descriptions...) read
+    :param max_bytes: Maximum number of bytes read
+    :param max_array_length: Maximum number of elements of an array
+    :param max_string_length: Maximum number of bytes of a string
+    :param max_depth: Maximum nesting depth of objects and arrays
+    :param spill_threshold: Size in bytes above which strings, block data
+                            and byte arrays are spilled out of memory (see
+                            javaobj.v2.spill)
+    :param spill_dir: Directory of the temporary files of spilled values
+    :param decompress: If False, don't look for a compressed stream
+    :param decompression_thread: If True, decompress the stream in a helper
+                                 thread, while parsing
+    :param read_ahead: If True, read the next blocks of the stream in a
+                       helper thread, while parsing
+    :param lazy: If True, return a javaobj.v2.lazy.LazyContents sequence,
+                 whose items are parsed on first access. The file object
+                 must be kept open until it is closed.
+    :return: The deserialized object
+    """
+    return _load(file_object, transformers, kwargs)
+
+
+def _load(file_object, transformers, kwargs, source=None):
+    # type: (IO[bytes], Iterable[ObjectTransformer], Dict[str, Any], Any) -> Any
+    """
+    Deserializes a file-like object, see load()
+
+    :param source: Content of the whole file object, if available
+    """
+    stream, wrappers = _open_input(
+        file_object, kwargs, kwargs.get("decompression_thread", False)
+    )
+    if kwargs.pop("lazy", False):
+        # Imported here, as the lazy module depends on this one
+        from .lazy import load_lazy
+
+        if wrappers:
+            # Decompress the stream in memory
+            try:
+                stream = BytesIO(stream.read())
+            finally:
+                _close_wrappers(wrappers)
+
+        return load_lazy(stream, list(transformers), kwargs)
+
+    mapped = None
+    if wrappers:
+        # Offsets in the decompressed stream don't match the source
+        source = None
+    elif source is None and kwargs.get("spill_threshold") is not None:
+        # Reference the spilled values in a memory map of the file
+        source = mapped = map_file(stream)
+
+    try:
+        # Parse the object(s)
+        parser = _create_parser(stream, transformers, kwargs, source)
+        contents = parser.run()
+    finally:
+        _close_wrappers(wrappers)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # Still used by spilled values
+                pass
 
     if len(contents) == 0:
         # Nothing was parsed, but no error
-        return None
+        result = None
     elif len(contents) == 1:
         # Return the only object as is
-        return contents[0]
+        result = contents[0]
     else:
         # Returns all objects if they are more than one
-        return contents
+        result = contents
+
+    if kwargs.get("collect_stats", False):
+        return result, parser.stats
+
+    return result
+
+
+def load_path(path, *transformers, **kwargs):
+    # type: (str, ObjectTransformer, Any) -> Any
+    """
+    Deserializes the content of a file, which can be compressed with gzip
+    or zlib. Accepts the same keyword arguments as load().
+
+    :param path: Path of the file to load
+    :param transformers: Custom transformers to use
+    :return: The deserialized object
+    """
+    if kwargs.get("lazy", False):
+        # The file is closed with the lazy contents
+        return load(open(path, "rb"), *transformers, **kwargs)
+
+    with open(path, "rb") as fd:
+        return load(fd, *transformers, **kwargs)
+
+
+def iter_segments(file_object, *transformers, **kwargs):
+    # type: (IO[bytes], ObjectTransformer, Any) -> Iterator[List[ParsedJavaContent]]
+    """
+    Deserializes a stream one segment at a time, i.e. up to the next
+    TC_RESET marker. The handles of each segment are released once it has
+    been read, so that large streams can be read in bounded memory.
+
+    :param file_object: A file-like object, which can be compressed with
+                        gzip or zlib
+    :param transformers: Custom transformers to use
+    :param observers: Parser observers to notify while reading contents
+    :param decompress: If False, don't look for a compressed stream
+    :param read_ahead: If True, read the next blocks of the stream in a
+                       helper thread, while parsing
+    :return: An iterator of the lists of the top-level contents of each
+             non-empty segment
+    """
+    stream, wrappers = _open_input(file_object, kwargs)
+    parser = _create_parser(stream, transformers, kwargs)
+    if not wrappers:
+        return parser.iter_segments()
+
+    return _iter_and_close(parser.iter_segments(), wrappers)
+
+
+def _iter_and_close(iterator, wrappers):
+    # type: (Iterator[Any], List[IO[bytes]]) -> Iterator[Any]
+    """
+    Yields the items of the given iterator, then closes the wrappers of the
+    stream it reads
+    """
+    try:
+        for item in iterator:
+            yield item
+    finally:
+        _close_wrappers(wrappers)
 
 
 def loads(data, *transformers, **kwargs):
@@ -77,6 +283,13 @@ def loads(data, *transformers, **kwargs):
     :param transformers: Custom transformers to use
     :param ignore_remaining_data: If True, don't log an error when unused
                                   trailing bytes are remaining
+    :param collect_stats: If True, return a tuple (object, ParseStats)
+    :param cache: A javaobj.v2.cache.ParseCache, returning a copy of the
+                  result of a previous call with the same arguments
     :return: The deserialized object
     """
-    return load(BytesIO(data), *transformers, **kwargs)
+    cache = kwargs.pop("cache", None)
+    if cache is not None:
+        return cache.loads(data, *transformers, **kwargs)
+
+    return _load(BytesIO(data), transformers, kwargs, data)
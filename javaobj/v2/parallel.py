@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Parallel parsing of Java streams, using a pool of processes as parsing is
+CPU-bound: either many streams at once or the independent segments of a
+single large stream
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import (  # pylint:disable=W0611
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import logging
+import mmap
+import multiprocessing
+import pickle
+import traceback
+
+try:
+    # Python 2
+    from StringIO import StringIO as BytesIO
+except ImportError:
+    # Python 3+
+    from io import BytesIO
+
+from .api import ObjectTransformer  # pylint:disable=W0611
+from .beans import ParsedJavaContent  # pylint:disable=W0611
+from .main import _create_parser, _prepare_transformers, load
+from .scanner import STREAM_HEADER, find_segments
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Types considered as in-memory streams instead of paths
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+# Minimal size of the part of a stream parsed by a worker
+MIN_CHUNK_SIZE = 65536
+
+# Transformers and load() options of the current worker process
+_WORKER_STATE = {}  # type: Dict[str, Any]
+
+_logger = logging.getLogger("javaobj.parallel")
+
+# ------------------------------------------------------------------------------
+
+
+class LoadError(object):  # pylint:disable=R0205
+    """
+    Description of an error raised while loading a stream. Exceptions
+    themselves are not always picklable.
+    """
+
+    def __init__(self, exc_type, message, offset=None, trace=None):
+        # type: (str, str, Optional[int], Optional[str]) -> None
+        """
+        :param exc_type: Name of the type of the exception
+        :param message: Exception message
+        :param offset: Position in the stream when the error occurred
+        :param trace: Formatted traceback of the exception
+        """
+        self.exc_type = exc_type
+        self.message = message
+        self.offset = offset
+        self.traceback = trace
+
+    def __str__(self):
+        if self.offset is None:
+            return "{0}: {1}".format(self.exc_type, self.message)
+
+        return "{0} at offset {1}: {2}".format(
+            self.exc_type, self.offset, self.message
+        )
+
+    __repr__ = __str__
+
+    @classmethod
+    def from_exception(cls, ex, offset=None):
+        # type: (BaseException, Optional[int]) -> LoadError
+        """
+        Describes the given exception, while it is being handled
+
+        :param ex: The caught exception
+        :param offset: Position in the stream when the error occurred
+        :return: A LoadError bean
+        """
+        return cls(
+            type(ex).__name__, str(ex), offset, traceback.format_exc()
+        )
+
+
+class LoadResult(object):  # pylint:disable=R0205
+    """
+    Result of the loading of a stream by load_many()
+    """
+
+    def __init__(self, index, source, value=None, error=None):
+        # type: (int, Optional[str], Any, Optional[LoadError]) -> None
+        """
+        :param index: Index of the stream in the input of load_many()
+        :param source: Path of the stream, None if it was given as bytes
+        :param value: The deserialized object
+        :param error: Description of the error which stopped the loading
+        """
+        self.index = index
+        self.source = source
+        self.value = value
+        self.error = error
+
+    def __str__(self):
+        if self.error is not None:
+            return "[load result {0} ({1}): {2}]".format(
+                self.index, self.source, self.error
+            )
+
+        return "[load result {0} ({1}): {2}]".format(
+            self.index, self.source, type(self.value).__name__
+        )
+
+    __repr__ = __str__
+
+    @property
+    def ok(self):
+        # type: () -> bool
+        """
+        True if the stream was successfully loaded
+        """
+        return self.error is None
+
+
+# ------------------------------------------------------------------------------
+
+
+def _init_worker(transformers, options, process=None):
+    # type: (List[ObjectTransformer], Dict[str, Any], Optional[Callable[[Any], Any]]) -> None
+    """
+    Prepares a worker process
+
+    :param transformers: Transformers to use for all streams
+    :param options: Keyword arguments given to load()
+    :param process: Method called with each parsed object
+    """
+    # Create the default transformer once per worker instead of per stream
+    _WORKER_STATE["transformers"] = _prepare_transformers(transformers, {})
+    _WORKER_STATE["options"] = options
+    _WORKER_STATE["process"] = process
+
+
+def _load_source(index, source, transformers, options, process=None):
+    # type: (int, Any, List[ObjectTransformer], Dict[str, Any], Optional[Callable[[Any], Any]]) -> LoadResult
+    """
+    Loads a single stream
+
+    :param index: Index of the stream in the input
+    :param source: Path or content of the stream
+    :param transformers: Transformers to use
+    :param options: Keyword arguments given to load()
+    :param process: Method called with the parsed object, returning the
+                    value of the result
+    :return: A LoadResult bean
+    """
+    if isinstance(source, BUFFER_TYPES):
+        path = None
+        fd = BytesIO(bytes(source))
+    else:
+        path = source
+        try:
+            fd = open(source, "rb")
+        except (IOError, OSError) as ex:
+            return LoadResult(index, path, error=LoadError.from_exception(ex))
+
+    try:
+        value = load(fd, *transformers, **options)
+    except Exception as ex:  # pylint:disable=W0703
+        try:
+            offset = fd.tell()
+        except (IOError, OSError, ValueError):
+            offset = None
+
+        return LoadResult(
+            index, path, error=LoadError.from_exception(ex, offset)
+        )
+    finally:
+        fd.close()
+
+    if process is not None:
+        try:
+            value = process(value)
+        except Exception as ex:  # pylint:disable=W0703
+            return LoadResult(index, path, error=LoadError.from_exception(ex))
+
+    return LoadResult(index, path, value)
+
+
+def _load_task(task):
+    # type: (Tuple[int, Any]) -> Tuple[int, bytes]
+    """
+    Loads a stream in a worker process
+
+    :param task: A (index, source) tuple
+    :return: A (index, pickled LoadResult bean) tuple
+    """
+    index, source = task
+    result = _load_source(
+        index,
+        source,
+        _WORKER_STATE["transformers"],
+        _WORKER_STATE["options"],
+        _WORKER_STATE["process"],
+    )
+
+    # Pickle the result here, to report the errors of this step
+    try:
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except Exception as ex:  # pylint:disable=W0703
+        result = LoadResult(
+            index, result.source, error=LoadError.from_exception(ex)
+        )
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+    return index, data
+
+
+def _unpickle_result(index, data):
+    # type: (int, bytes) -> LoadResult
+    """
+    Loads a result pickled by a worker
+    """
+    try:
+        return pickle.loads(data)
+    except Exception as ex:  # pylint:disable=W0703
+        return LoadResult(index, None, error=LoadError.from_exception(ex))
+
+
+def _tasks(sources):
+    # type: (Iterable[Any]) -> Iterator[Tuple[int, Any]]
+    """
+    Enumerates the sources to load, converting memory views to bytes as they
+    can't be pickled
+    """
+    for index, source in enumerate(sources):
+        if isinstance(source, memoryview):
+            source = source.tobytes()
+
+        yield index, source
+
+
+def load_many(sources, *transformers, **kwargs):
+    # type: (Iterable[Any], ObjectTransformer, Any) -> Iterator[LoadResult]
+    """
+    Deserializes many Java streams using a pool of worker processes.
+
+    Each worker is prepared once with the transformers and options, which
+    must therefore be picklable, as must be the deserialized objects.
+
+    The results are pickled by the workers and unpickled in the current
+    process, one after the other: for streams of many small objects, this
+    takes about a third of the parsing time, which caps the speedup at about
+    3 times the sequential parsing, whatever the number of workers.
+    Giving a process method, which extracts the needed data from the parsed
+    object in the worker, avoids transferring the whole objects.
+
+    :param sources: Paths of the files to load or bytes of the streams
+    :param transformers: Custom transformers to use
+    :param workers: Number of worker processes (number of CPUs by default);
+                    0 to load the streams in the current process
+    :param chunksize: Number of streams sent at once to a worker
+    :param ordered: If True, yield the results in the order of the sources,
+                    else as soon as they are available
+    :param process: A picklable method (e.g. a module-level function) called
+                    by the worker with each deserialized object: its result
+                    is the value of the LoadResult
+    :param kwargs: Other keyword arguments are given to load()
+    :return: An iterator of LoadResult beans, which hold either the
+             deserialized object or the description of the error that
+             stopped the loading of the stream
+    """
+    workers = kwargs.pop("workers", None)
+    chunksize = kwargs.pop("chunksize", 16)
+    ordered = kwargs.pop("ordered", False)
+    process = kwargs.pop("process", None)
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers == 0:
+        # Load in the current process (e.g. for debugging)
+        all_transformers = _prepare_transformers(transformers, {})
+        for index, source in _tasks(sources):
+            yield _load_source(
+                index, source, all_transformers, kwargs, process
+            )
+        return
+
+    pool = multiprocessing.Pool(
+        workers, _init_worker, (list(transformers), kwargs, process)
+    )
+    completed = False
+    try:
+        if ordered:
+            results = pool.imap(_load_task, _tasks(sources), chunksize)
+        else:
+            results = pool.imap_unordered(
+                _load_task, _tasks(sources), chunksize
+            )
+
+        for index, data in results:
+            yield _unpickle_result(index, data)
+
+        completed = True
+    finally:
+        if completed:
+            pool.close()
+        else:
+            # The caller stopped consuming the results or an error occurred
+            pool.terminate()
+        pool.join()
+
+
+# ------------------------------------------------------------------------------
+
+
+def _group_segments(segments, chunk_size):
+    # type: (List[Tuple[int, int]], int) -> List[Tuple[int, int]]
+    """
+    Groups consecutive segments into chunks of at least the given size. The
+    TC_RESET markers between the grouped segments are kept in the chunk.
+
+    :param segments: (start, end) offsets of the segments
+    :param chunk_size: Minimal size of a chunk
+    :return: (start, end) offsets of the chunks
+    """
+    chunks = []  # type: List[Tuple[int, int]]
+    start = None  # type: Optional[int]
+    end = 0
+    for segment_start, end in segments:
+        if start is None:
+            start = segment_start
+
+        if end - start >= chunk_size:
+            chunks.append((start, end))
+            start = None
+
+    if start is not None:
+        chunks.append((start, end))
+
+    return chunks
+
+
+def _load_segment(
+    index, source, start, end, transformers, options, process=None
+):
+    # type: (int, Any, int, int, List[ObjectTransformer], Dict[str, Any], Optional[Callable[[Any], Any]]) -> LoadResult
+    """
+    Parses a part of a stream made of complete segments
+
+    :param index: Index of the chunk
+    :param source: Path of the stream or bytes of the chunk
+    :param start: Offset of the chunk in the stream
+    :param end: Offset of the end of the chunk in the stream
+    :param transformers: Transformers to use
+    :param options: Keyword arguments given to load_segments()
+    :param process: Method called with each parsed content, returning the
+                    value to keep instead
+    :return: A LoadResult bean, with the list of parsed contents as value
+    """
+    if isinstance(source, BUFFER_TYPES):
+        path = None
+        data = source
+    else:
+        path = source
+        try:
+            with open(source, "rb") as fd:
+                fd.seek(start)
+                data = fd.read(end - start)
+        except (IOError, OSError) as ex:
+            return LoadResult(index, path, error=LoadError.from_exception(ex))
+
+    # Parse the chunk as a stream on its own
+    stream = BytesIO(STREAM_HEADER + bytes(data))
+    try:
+        contents = _create_parser(stream, transformers, options).run()
+    except Exception as ex:  # pylint:disable=W0703
+        offset = start + stream.tell() - len(STREAM_HEADER)
+        return LoadResult(
+            index, path, error=LoadError.from_exception(ex, offset)
+        )
+
+    if process is not None:
+        try:
+            contents = [process(content) for content in contents]
+        except Exception as ex:  # pylint:disable=W0703
+            return LoadResult(index, path, error=LoadError.from_exception(ex))
+
+    return LoadResult(index, path, contents)
+
+
+def _load_segment_task(task):
+    # type: (Tuple[int, Any, int, int]) -> Tuple[int, bytes]
+    """
+    Parses a part of a stream in a worker process
+
+    :param task: A (index, source, start, end) tuple
+    :return: A (index, pickled LoadResult bean) tuple
+    """
+    index, source, start, end = task
+    result = _load_segment(
+        index,
+        source,
+        start,
+        end,
+        _WORKER_STATE["transformers"],
+        _WORKER_STATE["options"],
+        _WORKER_STATE["process"],
+    )
+
+    try:
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except Exception as ex:  # pylint:disable=W0703
+        result = LoadResult(
+            index, result.source, error=LoadError.from_exception(ex)
+        )
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+    return index, data
+
+
+def load_segments(source, *transformers, **kwargs):
+    # type: (Any, ObjectTransformer, Any) -> List[ParsedJavaContent]
+    """
+    Parses a single large stream using a pool of worker processes.
+
+    The stream is first scanned to find its segments, i.e. the top-level
+    contents separated by TC_RESET markers: they don't share any handle and
+    can therefore be parsed independently. Consecutive segments are grouped
+    into chunks which are parsed by the workers.
+
+    If the stream can't be scanned, for example when it contains data that
+    only a custom transformer can read, it is parsed in the current process.
+
+    The scan and the unpickling of the contents parsed by the workers are
+    done in the current process: for a stream of many small instances, they
+    respectively take about a quarter and a third of the parsing time, which
+    caps the speedup at about 1.7 times, whatever the number of workers.
+    Giving a process method, which extracts the needed data from the parsed
+    contents in the workers, avoids transferring the whole objects.
+
+    :param source: Path of the file to load or bytes of the stream
+    :param transformers: Custom transformers to use
+    :param workers: Number of worker processes (number of CPUs by default);
+                    0 to parse the chunks in the current process
+    :param chunk_size: Minimal size in bytes of a chunk (by default, the
+                       size of the stream is divided by 4 times the number of
+                       workers, with a minimum of 64 KiB)
+    :param use_numpy_arrays: If True, use the numpy array transformer
+    :param process: A picklable method (e.g. a module-level function) called
+                    by the workers with each top-level content: its results
+                    replace the contents in the returned list
+    :return: The list of the top-level contents of the stream, as returned
+             by JavaStreamParser.run()
+    :raise ValueError: Error parsing the stream
+    """
+    workers = kwargs.pop("workers", None)
+    chunk_size = kwargs.pop("chunk_size", None)
+    process = kwargs.pop("process", None)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    all_transformers = _prepare_transformers(transformers, {})
+    if isinstance(source, BUFFER_TYPES):
+        fd = BytesIO(bytes(source))
+        data = fd.getvalue()  # type: Any
+    else:
+        fd = open(source, "rb")
+        try:
+            data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            data = b""
+
+    try:
+        try:
+            segments = find_segments(data)
+        except (ValueError, EOFError) as ex:
+            _logger.warning("Parsing the stream sequentially: %s", ex)
+            contents = _create_parser(fd, all_transformers, kwargs).run()
+            if process is not None:
+                contents = [process(content) for content in contents]
+            return contents
+
+        if chunk_size is None:
+            chunk_size = max(len(data) // (4 * workers or 1), MIN_CHUNK_SIZE)
+
+        tasks = []  # type: List[Tuple[int, Any, int, int]]
+        for index, (start, end) in enumerate(
+            _group_segments(segments, chunk_size)
+        ):
+            if isinstance(source, BUFFER_TYPES):
+                tasks.append((index, data[start:end], start, end))
+            else:
+                tasks.append((index, source, start, end))
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+        fd.close()
+
+    if workers == 0 or len(tasks) < 2:
+        results = [
+            _load_segment(
+                index, chunk, start, end, all_transformers, kwargs, process
+            )
+            for index, chunk, start, end in tasks
+        ]
+    else:
+        pool = multiprocessing.Pool(
+            min(workers, len(tasks)),
+            _init_worker,
+            (list(transformers), kwargs, process),
+        )
+        completed = False
+        try:
+            results = [
+                _unpickle_result(index, result)
+                for index, result in pool.imap(_load_segment_task, tasks)
+            ]
+            completed = True
+        finally:
+            if completed:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+
+    contents = []  # type: List[ParsedJavaContent]
+    for result in results:
+        if result.error is not None:
+            raise ValueError(
+                "Error parsing the stream: {0}".format(result.error)
+            )
+        contents.extend(result.value)
+
+    return contents
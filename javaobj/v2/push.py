@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Incremental parsing of Java streams received in parts, e.g. from a socket
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import Any, List  # pylint:disable=W0611
+
+try:
+    # Python 2
+    from StringIO import StringIO as BytesIO
+except ImportError:
+    # Python 3+
+    from io import BytesIO
+
+from .api import ObjectTransformer  # pylint:disable=W0611
+from .beans import ParsedJavaContent  # pylint:disable=W0611
+from .core import JavaStreamParser
+from .main import _prepare_transformers
+from .scanner import StreamScanner
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+
+class JavaPushParser(object):  # pylint:disable=R0205
+    """
+    Parses a Java stream given in parts of any size: each call to feed()
+    returns the top-level contents which have been completed by the new data.
+
+    A resumable stream scanner walks through the data as it arrives to find
+    the end of the top-level contents: their data must therefore not require
+    a custom transformer to be read. The complete contents are then parsed at
+    once by a JavaStreamParser, which can't suspend in the middle of a
+    content: the bytes of the incomplete top-level content are kept between
+    two calls, so that a single large content is buffered until its end has
+    been received.
+    The parser can't be used anymore after it raised an error.
+    """
+
+    def __init__(self, *transformers, **kwargs):
+        # type: (ObjectTransformer, Any) -> None
+        """
+        :param transformers: Custom transformers to use
+        :param use_numpy_arrays: If True, use the numpy array transformer
+        """
+        # Bytes of the content being parsed
+        self._content = BytesIO()
+        self._parser = JavaStreamParser(
+            self._content,
+            _prepare_transformers(transformers, kwargs),
+            keep_handle_maps=False,
+        )
+
+        # Bytes received but not parsed yet
+        self._buffer = bytearray()
+
+        # Finds the end of the contents in the buffer
+        self._scanner = StreamScanner(self._buffer, resumable=True)
+        self._header_read = False
+
+    @property
+    def pending(self):
+        # type: () -> int
+        """
+        Number of bytes received but not parsed yet
+        """
+        return len(self._buffer)
+
+    def feed(self, data):
+        # type: (bytes) -> List[ParsedJavaContent]
+        """
+        Adds data to the stream
+
+        :param data: Next bytes of the stream
+        :return: The top-level contents completed by this data
+        :raise ValueError: Invalid or unsupported content
+        """
+        buffer = self._buffer
+        buffer += data
+
+        scanner = self._scanner
+        scanner.set_data(buffer, scanner.offset)
+        if len(buffer) < scanner.needed_size:
+            # Nothing can be completed
+            return []
+
+        # The buffer starts with the first incomplete content
+        start = 0
+        if not self._header_read:
+            try:
+                scanner.read_header()
+            except EOFError:
+                return []
+
+            self._header_read = True
+            start = scanner.offset
+
+        # Find the end of the last complete content
+        end = start
+        while True:
+            item = scanner.scan_next()
+            if item is None:
+                # End of the data or incomplete content
+                break
+
+            end = item[2]
+
+        contents = []  # type: List[ParsedJavaContent]
+        if end > start:
+            contents = self._parse_contents(buffer[start:end])
+
+        # Forget about the parsed data
+        scanner.discard(end)
+        return contents
+
+    def close(self):
+        # type: () -> None
+        """
+        Indicates the end of the stream
+
+        :raise EOFError: The stream has ended in the middle of a content
+        """
+        if self._buffer or not self._header_read:
+            raise EOFError("Stream has ended unexpectedly while parsing.")
+
+        self._parser.validate_handles()
+
+    def _parse_contents(self, data):
+        # type: (bytearray) -> List[ParsedJavaContent]
+        """
+        Parses complete top-level contents
+
+        :param data: Bytes of the contents
+        :return: The parsed contents
+        """
+        fd = self._content
+        fd.seek(0)
+        fd.truncate()
+        fd.write(data)
+        fd.seek(0)
+
+        try:
+            return self._parser.read_contents()
+        except EOFError:
+            # The parser expects more data than the scanner found
+            raise ValueError(
+                "Scanned contents of {0} bytes end in the middle of a "
+                "content".format(len(data))
+            )
@@ -0,0 +1,1045 @@
+#!/usr/bin/env python3
+"""
+Fast scanner of Java streams: walks through the contents of a stream held in
+memory (bytes, memory map, ...) following the serialization grammar, without
+creating the parsed objects
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from types import GeneratorType
+from typing import (  # pylint:disable=W0611
+    Any,
+    Callable,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import struct
+
+from ..constants import (
+    ClassDescFlags,
+    StreamConstants,
+    TerminalCode,
+    TypeCode,
+)
+from ..modifiedutf8 import decode_modified_utf8
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Size in bytes of the values of primitive types
+PRIMITIVE_SIZES = {
+    TypeCode.TYPE_BYTE: 1,
+    TypeCode.TYPE_CHAR: 2,
+    TypeCode.TYPE_DOUBLE: 8,
+    TypeCode.TYPE_FLOAT: 4,
+    TypeCode.TYPE_INTEGER: 4,
+    TypeCode.TYPE_LONG: 8,
+    TypeCode.TYPE_SHORT: 2,
+    TypeCode.TYPE_BOOLEAN: 1,
+}
+
+# Header of a stream: magic and version
+STREAM_HEADER = struct.pack(
+    ">HH", StreamConstants.STREAM_MAGIC, StreamConstants.STREAM_VERSION
+)
+
+# Pre-compiled structures
+_UBYTE = struct.Struct(">B")
+_USHORT = struct.Struct(">H")
+_INT = struct.Struct(">i")
+_LONG = struct.Struct(">q")
+_HEADER = struct.Struct(">HH")
+
+# Marker yielded by a task which needs more data
+_NEED_DATA = object()
+
+# Marker returned at the end of annotations
+_END_BLOCK = object()
+
+# ------------------------------------------------------------------------------
+
+
+class ScannedClass(object):  # pylint:disable=R0205
+    """
+    Description of a class, as found by the scanner
+    """
+
+    def __init__(self, handle, name=None, serial_version_uid=0, flags=0):
+        # type: (int, Optional[str], int, int) -> None
+        """
+        :param handle: Handle of the class description
+        :param name: Name of the class, None for a proxy class
+        :param serial_version_uid: Serial version UID of the class
+        :param flags: Class description flags
+        """
+        self.handle = handle
+        self.name = name
+        self.serial_version_uid = serial_version_uid
+        self.flags = flags
+
+        # Fields: (type code, name, class name or None) tuples
+        self.fields = []  # type: List[Tuple[int, str, Optional[str]]]
+
+        # Interfaces of a proxy class
+        self.interfaces = []  # type: List[str]
+
+        # Description of the parent class
+        self.super_class = None  # type: Optional[ScannedClass]
+
+        # Cached layout of the field values
+        self.__layout = None  # type: Optional[List[Tuple[int, int]]]
+
+    def __str__(self):
+        return "[scanned class 0x{0:x}: name {1}, uid {2}]".format(
+            self.handle, self.name, self.serial_version_uid
+        )
+
+    __repr__ = __str__
+
+    @property
+    def is_proxy(self):
+        # type: () -> bool
+        """
+        True if this describes a proxy class
+        """
+        return self.name is None
+
+    @property
+    def layout(self):
+        # type: () -> List[Tuple[int, int]]
+        """
+        Layout of the values of the fields of this class: a list of (size of
+        the primitive values, number of object values) tuples
+        """
+        if self.__layout is None:
+            layout = []
+            size = 0
+            nb_objects = 0
+            for field_type, _, _ in self.fields:
+                width = PRIMITIVE_SIZES.get(field_type)
+                if width is None:
+                    nb_objects += 1
+                else:
+                    if nb_objects:
+                        layout.append((size, nb_objects))
+                        size = nb_objects = 0
+                    size += width
+
+            if size or nb_objects:
+                layout.append((size, nb_objects))
+
+            self.__layout = layout
+
+        return self.__layout
+
+    def get_hierarchy(self):
+        # type: () -> List[ScannedClass]
+        """
+        Returns the classes of the hierarchy of this one, in the order their
+        data is written in the stream (parent classes first)
+        """
+        classes = []
+        class_desc = self  # type: Optional[ScannedClass]
+        while class_desc is not None:
+            classes.append(class_desc)
+            class_desc = class_desc.super_class
+            if class_desc is not None and class_desc.is_proxy:
+                # Same behaviour as the parser
+                break
+
+        classes.reverse()
+        return classes
+
+
+# ------------------------------------------------------------------------------
+
+
+class StreamScanner(object):  # pylint:disable=R0205
+    """
+    Walks through the contents of a Java stream, only keeping track of the
+    class descriptions and of the handles.
+
+    The scanner works on the stream in memory: a memory map of the file
+    should be used for large streams. A resumable scanner can also work on a
+    stream received in parts: when the data ends in the middle of a content,
+    the scanning of this content is suspended until more data is given.
+    """
+
+    def __init__(self, data, offset=0, resumable=False):
+        # type: (Any, int, bool) -> None
+        """
+        :param data: Content of the stream (bytes or any object supporting
+                     the buffer protocol)
+        :param offset: Offset of the first byte to scan
+        :param resumable: If True, suspend the scanning of a content when
+                          the data ends before its end instead of raising an
+                          EOFError
+        """
+        self._data = data
+        self._size = len(data)
+        self.offset = offset
+        self._resumable = resumable
+
+        # Minimal size of the data to continue scanning, set when the end of
+        # the data has been reached
+        self.needed_size = 0
+
+        # Known handles: offset or bytes of a string, a class description or
+        # None
+        self._handles = []  # type: List[Any]
+
+        # Index of the first handle which can be the offset of a string
+        self._attached = 0
+
+        # Suspended tasks and (type code, start offset) of their top-level
+        # content
+        self._stack = []  # type: List[Generator]
+        self._item = None  # type: Optional[Tuple[int, int]]
+
+        # If not None, the handles referenced by the contents skipped are
+        # appended to this list
+        self.references = None  # type: Optional[List[int]]
+
+        # If not None, the new class descriptions read are appended to this
+        # list
+        self.classes = None  # type: Optional[List[ScannedClass]]
+
+    @property
+    def next_handle(self):
+        # type: () -> int
+        """
+        The handle that will be assigned to the next content
+        """
+        return StreamConstants.BASE_REFERENCE_IDX + len(self._handles)
+
+    @property
+    def suspended(self):
+        # type: () -> bool
+        """
+        True if the scanning of a top-level content waits for more data
+        """
+        return self._item is not None
+
+    def reset(self):
+        # type: () -> None
+        """
+        Forgets the handles, as after a TC_RESET
+        """
+        self._handles = []
+        self._attached = 0
+
+    def set_data(self, data, offset=0):
+        # type: (Any, int) -> None
+        """
+        Sets the data to scan, to continue scanning a stream received in
+        parts. The strings in the previous data must have been detached
+        first if it has been modified.
+
+        :param data: Content of the stream
+        :param offset: Offset of the next byte to scan
+        """
+        self._data = data
+        self._size = len(data)
+        self.offset = offset
+
+    def detach_strings(self):
+        # type: () -> None
+        """
+        Copies the strings which have been scanned, so that the scanned data
+        can be released or modified
+        """
+        handles = self._handles
+        for index in range(self._attached, len(handles)):
+            offset = handles[index]
+            if isinstance(offset, int):
+                handles[index] = self._get_string_data(offset)
+
+        self._attached = len(handles)
+
+    def discard(self, size):
+        # type: (int) -> None
+        """
+        Removes the given number of bytes, which have been scanned, from the
+        beginning of the data, which must be a bytearray
+
+        :param size: Number of bytes to remove
+        """
+        self.detach_strings()
+        del self._data[:size]
+        self._size -= size
+        self.offset -= size
+        self.needed_size = max(self.needed_size - size, 0)
+        if self._item is not None:
+            type_code, start = self._item
+            self._item = type_code, start - size
+
+    def read_header(self):
+        # type: () -> None
+        """
+        Reads and checks the magic and the version of the stream
+
+        :raise ValueError: Invalid header
+        :raise EOFError: Stream too short
+        """
+        if self.offset + _HEADER.size > self._size:
+            self._raise_eof(self.offset + _HEADER.size)
+
+        magic, version = _HEADER.unpack_from(self._data, self.offset)
+        if magic != StreamConstants.STREAM_MAGIC:
+            raise ValueError("Invalid file magic: 0x{0:x}".format(magic))
+
+        if version != StreamConstants.STREAM_VERSION:
+            raise ValueError("Invalid file version: 0x{0:x}".format(version))
+
+        self.offset += _HEADER.size
+
+    def scan(self):
+        # type: () -> Iterator[Tuple[int, int, int]]
+        """
+        Walks through the top-level contents of the stream, from the current
+        offset, including the TC_RESET markers
+
+        :return: An iterator of (type code, start offset, end offset) tuples
+        :raise ValueError: Invalid or unsupported content
+        :raise EOFError: Stream has ended unexpectedly
+        """
+        while True:
+            item = self.scan_next()
+            if item is None:
+                break
+
+            yield item
+
+    def scan_next(self):
+        # type: () -> Optional[Tuple[int, int, int]]
+        """
+        Walks through the next top-level content of the stream, or TC_RESET
+        marker
+
+        :return: A (type code, start offset, end offset) tuple, or None if
+                 the end of the data has been reached (or if the scanning of
+                 the content has been suspended)
+        :raise ValueError: Invalid or unsupported content
+        :raise EOFError: Data has ended before the end of the content
+        """
+        if self._item is not None:
+            # Resume the suspended content
+            if self._size < self.needed_size:
+                return None
+
+            type_code, start = self._item
+            resume = True
+        else:
+            if self.offset >= self._size:
+                self.needed_size = self.offset + 1
+                return None
+
+            start = self.offset
+            type_code = self._read_ubyte()
+            if type_code == TerminalCode.TC_RESET:
+                self.reset()
+                return type_code, start, self.offset
+
+            self._item = type_code, start
+            resume = False
+
+        try:
+            if resume:
+                result = self._execute()
+            else:
+                result = self._run(
+                    self._guard(self._skip_content_step, type_code)
+                )
+        except Exception as ex:
+            self._item = None
+            if isinstance(ex, struct.error):
+                # Reading a value at the current offset failed
+                self._raise_eof(self.offset + 1)
+            raise
+
+        if result is _NEED_DATA:
+            return None
+
+        self._item = None
+        return type_code, start, self.offset
+
+    def skip_content(self, type_code):
+        # type: (int) -> Optional[ScannedClass]
+        """
+        Skips the content which type code has just been read
+
+        :param type_code: Type code of the content
+        :return: The class description if the content was one, else None
+        :raise ValueError: Invalid or unsupported content
+        :raise EOFError: Stream has ended unexpectedly
+        """
+        try:
+            return self._run(self._skip_content_step(type_code))
+        except struct.error:
+            # Reading a value at the current offset failed
+            self._raise_eof(self.offset + 1)
+
+    def read_classdesc(self):
+        # type: () -> Optional[ScannedClass]
+        """
+        Reads a class description with its type code: a new description, a
+        reference to a known one or null. Its parent classes are read too.
+
+        :return: The class description, or None
+        :raise ValueError: Invalid class description
+        :raise EOFError: Stream has ended unexpectedly
+        """
+        try:
+            return self._run(self._read_classdesc_step())
+        except struct.error:
+            # Reading a value at the current offset failed
+            self._raise_eof(self.offset + 1)
+
+    def get_class(self, handle):
+        # type: (int) -> ScannedClass
+        """
+        Returns the description of the class with the given handle
+
+        :raise ValueError: Unknown handle or not a class description
+        """
+        class_desc = self._get_handle(handle)
+        if not isinstance(class_desc, ScannedClass):
+            raise ValueError("Referenced object is not a class description")
+
+        return class_desc
+
+    def get_string(self, handle):
+        # type: (int) -> str
+        """
+        Returns the value of the string with the given handle
+
+        :raise ValueError: Unknown handle or not a string
+        """
+        offset = self._get_handle(handle)
+        if offset is None or isinstance(offset, ScannedClass):
+            raise ValueError("Invalid reference to a Java string")
+
+        if isinstance(offset, int):
+            data = self._get_string_data(offset)
+        else:
+            data = offset
+
+        return decode_modified_utf8(data)[0]
+
+    def _run(self, task):
+        # type: (Any) -> Any
+        """
+        Executes a task, like run_task(). If a task of a resumable scanner
+        needs more data, the execution is suspended and _NEED_DATA is
+        returned: it can then be resumed by _execute().
+
+        :param task: A task, or a value which is returned as is
+        :return: The result of the task
+        """
+        if not isinstance(task, GeneratorType):
+            return task
+
+        self._stack = [task]
+        return self._execute()
+
+    def _execute(self):
+        # type: () -> Any
+        """
+        Executes or resumes the current stack of tasks (see _run())
+        """
+        stack = self._stack
+        result = None
+        error = None  # type: Any
+        while True:
+            try:
+                if error is None:
+                    item = stack[-1].send(result)
+                else:
+                    # Propagate the error of the sub-task to its parent
+                    current_error, error = error, None
+                    item = stack[-1].throw(current_error)
+            except StopIteration:
+                item = None
+            except Exception as ex:  # pylint:disable=W0703
+                stack.pop()
+                if not stack:
+                    raise
+
+                error = ex
+                continue
+
+            if isinstance(item, GeneratorType):
+                stack.append(item)
+                result = None
+            elif item is _NEED_DATA:
+                return item
+            else:
+                stack.pop()
+                if not stack:
+                    return item
+
+                result = item
+
+    def _guard(self, method, *args):
+        # type: (Callable[..., Any], Any) -> Any
+        """
+        Calls a method reading from the stream, which can return a task. If
+        the data of a resumable scanner ends before the end of the values
+        read by the method, the state of the scanner is restored and a task
+        calling the method again, once more data is available, is returned.
+        """
+        offset = self.offset
+        handles = self._handles
+        nb_handles = len(handles)
+        try:
+            return method(*args)
+        except (EOFError, struct.error) as ex:
+            if not self._resumable:
+                raise
+
+            if isinstance(ex, struct.error):
+                self.needed_size = self.offset + 1
+
+            self.offset = offset
+            self._handles = handles
+            del handles[nb_handles:]
+            return self._retry_task(method, args)
+
+    def _retry_task(self, method, args):
+        # type: (Callable[..., Any], Tuple[Any, ...]) -> Generator
+        """
+        Task waiting for data before calling a method again
+        """
+        yield _NEED_DATA
+        result = self._guard(method, *args)
+        if isinstance(result, GeneratorType):
+            result = yield result
+
+        yield result
+
+    def _read_ubyte(self):
+        # type: () -> int
+        """
+        Reads an unsigned byte
+        """
+        value = _UBYTE.unpack_from(self._data, self.offset)[0]
+        self.offset += 1
+        return value
+
+    def _read_int(self):
+        # type: () -> int
+        """
+        Reads a signed 4-bytes integer
+        """
+        value = _INT.unpack_from(self._data, self.offset)[0]
+        self.offset += 4
+        return value
+
+    def _read_utf(self):
+        # type: () -> str
+        """
+        Reads a short modified UTF-8 string (2-bytes length)
+        """
+        length = _USHORT.unpack_from(self._data, self.offset)[0]
+        start = self.offset + 2
+        self._skip(2 + length)
+        data = bytes(self._data[start : start + length])
+        return decode_modified_utf8(data)[0]
+
+    def _skip(self, length):
+        # type: (int) -> None
+        """
+        Skips the given number of bytes
+        """
+        self.offset += length
+        if self.offset > self._size:
+            self._raise_eof(self.offset)
+
+    def _raise_eof(self, needed_size):
+        # type: (int) -> None
+        """
+        Raises the error indicating the data has ended too early
+
+        :param needed_size: Minimal size of the data to continue
+        :raise EOFError: Always
+        """
+        self.needed_size = needed_size
+        raise EOFError("Stream has ended unexpectedly while parsing.")
+
+    def _get_handle(self, handle):
+        # type: (int) -> Any
+        """
+        Returns the information stored about a handle
+        """
+        index = handle - StreamConstants.BASE_REFERENCE_IDX
+        if index < 0 or index >= len(self._handles):
+            raise ValueError("Invalid reference handle: {0:x}".format(handle))
+
+        return self._handles[index]
+
+    def _get_string_data(self, offset):
+        # type: (int) -> bytes
+        """
+        Returns the encoded string which type code is at the given offset
+        """
+        data = self._data
+        if _UBYTE.unpack_from(data, offset)[0] == TerminalCode.TC_STRING:
+            length = _USHORT.unpack_from(data, offset + 1)[0]
+            start = offset + 3
+        else:
+            length = _LONG.unpack_from(data, offset + 1)[0]
+            start = offset + 9
+
+        return bytes(data[start : start + length])
+
+    def _next_content_step(self):
+        # type: () -> Any
+        """
+        Reads the type code of the next content, then skips it or returns
+        the task skipping it
+        """
+        return self._skip_content_step(self._read_ubyte())
+
+    def _skip_content_step(self, type_code):
+        # type: (int) -> Any
+        """
+        Skips the next content if it can't contain other contents, else
+        returns the task skipping it (see run_task)
+        """
+        if type_code == TerminalCode.TC_OBJECT:
+            return self._skip_object_task()
+        elif type_code == TerminalCode.TC_REFERENCE:
+            if self.references is not None:
+                self.references.append(
+                    _INT.unpack_from(self._data, self.offset)[0]
+                )
+            self._skip(4)
+        elif type_code == TerminalCode.TC_NULL:
+            pass
+        elif type_code in (
+            TerminalCode.TC_STRING,
+            TerminalCode.TC_LONGSTRING,
+        ):
+            self._skip_string(type_code)
+        elif type_code == TerminalCode.TC_ARRAY:
+            return self._skip_array_task()
+        elif type_code in (
+            TerminalCode.TC_CLASSDESC,
+            TerminalCode.TC_PROXYCLASSDESC,
+        ):
+            return self._read_classdesc_task(type_code)
+        elif type_code == TerminalCode.TC_CLASS:
+            return self._skip_class_task()
+        elif type_code == TerminalCode.TC_ENUM:
+            return self._skip_enum_task()
+        elif type_code == TerminalCode.TC_BLOCKDATA:
+            self._skip(1 + _UBYTE.unpack_from(self._data, self.offset)[0])
+        elif type_code == TerminalCode.TC_BLOCKDATALONG:
+            size = self._read_int()
+            if size < 0:
+                raise ValueError("Invalid value for block data size")
+            self._skip(size)
+        elif type_code == TerminalCode.TC_EXCEPTION:
+            return self._skip_exception_task()
+        else:
+            raise ValueError("Unknown type code: 0x{0:x}".format(type_code))
+
+        return None
+
+    def _skip_string(self, type_code):
+        # type: (int) -> None
+        """
+        Skips a new string and assigns its handle
+        """
+        self._handles.append(self.offset - 1)
+        if type_code == TerminalCode.TC_STRING:
+            length = _USHORT.unpack_from(self._data, self.offset)[0]
+            self._skip(2 + length)
+        else:
+            length = _LONG.unpack_from(self._data, self.offset)[0]
+            if length < 0 or length > 2147483647:
+                raise ValueError("Invalid string length: {0}".format(length))
+            self._skip(8 + length)
+
+    def _read_string(self):
+        # type: () -> str
+        """
+        Reads a new or referenced string, with its type code
+        """
+        type_code = self._read_ubyte()
+        if type_code == TerminalCode.TC_REFERENCE:
+            handle = self._read_int()
+            if self.references is not None:
+                self.references.append(handle)
+            return self.get_string(handle)
+
+        if type_code not in (
+            TerminalCode.TC_STRING,
+            TerminalCode.TC_LONGSTRING,
+        ):
+            raise ValueError(
+                "Expected a string, got type code 0x{0:x}".format(type_code)
+            )
+
+        offset = self.offset - 1
+        self._skip_string(type_code)
+        return decode_modified_utf8(self._get_string_data(offset))[0]
+
+    def _read_classdesc_step(self):
+        # type: () -> Any
+        """
+        Reads a class description with its type code: returns it if it is a
+        reference or null, else the task reading it (see run_task)
+        """
+        type_code = self._read_ubyte()
+        if type_code == TerminalCode.TC_NULL:
+            return None
+        elif type_code == TerminalCode.TC_REFERENCE:
+            handle = self._read_int()
+            if self.references is not None:
+                self.references.append(handle)
+            return self.get_class(handle)
+        elif type_code in (
+            TerminalCode.TC_CLASSDESC,
+            TerminalCode.TC_PROXYCLASSDESC,
+        ):
+            return self._read_classdesc_task(type_code)
+
+        raise ValueError("Expected a valid class description starter")
+
+    def _read_classdesc_header(self, type_code):
+        # type: (int) -> ScannedClass
+        """
+        Reads the description of a class, up to its annotations
+        """
+        handle = self.next_handle
+        if type_code == TerminalCode.TC_CLASSDESC:
+            name = self._read_utf()
+            serial_version_uid = _LONG.unpack_from(self._data, self.offset)[0]
+            self.offset += 8
+
+            class_desc = ScannedClass(handle, name, serial_version_uid)
+            self._handles.append(class_desc)
+
+            class_desc.flags = self._read_ubyte()
+            nb_fields = _USHORT.unpack_from(self._data, self.offset)[0]
+            self.offset += 2
+            if nb_fields > 32767:
+                raise ValueError(
+                    "Invalid field count: {0}".format(nb_fields - 65536)
+                )
+
+            for _ in range(nb_fields):
+                field_type = self._read_ubyte()
+                field_name = self._read_utf()
+                class_name = None
+                if field_type in (TypeCode.TYPE_OBJECT, TypeCode.TYPE_ARRAY):
+                    class_name = self._read_string()
+                elif field_type not in PRIMITIVE_SIZES:
+                    raise ValueError(
+                        "Invalid field type char: 0x{0:x}".format(field_type)
+                    )
+
+                class_desc.fields.append((field_type, field_name, class_name))
+        else:
+            class_desc = ScannedClass(handle)
+            self._handles.append(class_desc)
+
+            nb_interfaces = self._read_int()
+            class_desc.interfaces = [
+                self._read_utf() for _ in range(nb_interfaces)
+            ]
+
+        if self.classes is not None:
+            self.classes.append(class_desc)
+        return class_desc
+
+    def _read_classdesc_task(self, type_code):
+        # type: (int) -> Generator
+        """
+        Reads a new class description
+        """
+        class_desc = self._guard(self._read_classdesc_header, type_code)
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
+
+        yield self._skip_annotations_task()
+
+        super_class = self._guard(self._read_classdesc_step)
+        if isinstance(super_class, GeneratorType):
+            super_class = yield super_class
+
+        class_desc.super_class = super_class
+        yield class_desc
+
+    def _annotation_step(self):
+        # type: () -> Any
+        """
+        Reads the next annotation: returns _END_BLOCK at the end of the
+        annotations, else skips it or returns the task skipping it
+        """
+        type_code = self._read_ubyte()
+        if type_code == TerminalCode.TC_ENDBLOCKDATA:
+            return _END_BLOCK
+        elif type_code == TerminalCode.TC_RESET:
+            self.reset()
+            return None
+
+        return self._skip_content_step(type_code)
+
+    def _skip_annotations_task(self):
+        # type: () -> Generator
+        """
+        Skips contents up to the end of a block data
+        """
+        while True:
+            step = self._guard(self._annotation_step)
+            if isinstance(step, GeneratorType):
+                step = yield step
+
+            if step is _END_BLOCK:
+                break
+
+    def _skip_object_task(self):
+        # type: () -> Generator
+        """
+        Skips an object
+        """
+        class_desc = self._guard(self._read_classdesc_step)
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
+
+        if class_desc is None:
+            raise ValueError("Null class description of an object")
+
+        self._handles.append(None)
+        for cd in class_desc.get_hierarchy():
+            flags = cd.flags
+            if flags & ClassDescFlags.SC_SERIALIZABLE:
+                for size, nb_objects in cd.layout:
+                    if size:
+                        step = self._guard(self._skip, size)
+                        if isinstance(step, GeneratorType):
+                            yield step
+
+                    for _ in range(nb_objects):
+                        step = self._guard(self._next_content_step)
+                        if isinstance(step, GeneratorType):
+                            yield step
+
+                if flags & ClassDescFlags.SC_WRITE_METHOD:
+                    yield self._skip_annotations_task()
+            elif flags & ClassDescFlags.SC_EXTERNALIZABLE:
+                if flags & ClassDescFlags.SC_WRITE_METHOD:
+                    # Only custom transformers can read this data
+                    raise ValueError(
+                        "Can't skip the external data of {0}".format(cd.name)
+                    )
+
+                yield self._skip_annotations_task()
+            else:
+                raise ValueError("Unhandled Class Data Type")
+
+    def _skip_array_task(self):
+        # type: () -> Generator
+        """
+        Skips an array
+        """
+        class_desc = self._guard(self._read_classdesc_step)
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
+
+        self._handles.append(None)
+        if (
+            class_desc is None
+            or not class_desc.name
+            or len(class_desc.name) < 2
+        ):
+            raise ValueError("Invalid name in array class description")
+
+        size = self._guard(self._read_int)
+        if isinstance(size, GeneratorType):
+            size = yield size
+
+        if size < 0:
+            raise ValueError("Invalid array size")
+
+        width = PRIMITIVE_SIZES.get(ord(class_desc.name[1]))
+        if width is not None:
+            step = self._guard(self._skip, size * width)
+            if isinstance(step, GeneratorType):
+                yield step
+        else:
+            for _ in range(size):
+                step = self._guard(self._next_content_step)
+                if isinstance(step, GeneratorType):
+                    yield step
+
+    def _skip_class_task(self):
+        # type: () -> Generator
+        """
+        Skips a class object
+        """
+        class_desc = self._guard(self._read_classdesc_step)
+        if isinstance(class_desc, GeneratorType):
+            yield class_desc
+
+        self._handles.append(None)
+
+    def _skip_enum_constant(self):
+        # type: () -> None
+        """
+        Assigns the handle of an enumeration and skips its constant name
+        """
+        self._handles.append(None)
+        self._read_string()
+
+    def _skip_enum_task(self):
+        # type: () -> Generator
+        """
+        Skips an enumeration constant
+        """
+        class_desc = self._guard(self._read_classdesc_step)
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
+
+        if class_desc is None:
+            raise ValueError("Enum description can't be null")
+
+        step = self._guard(self._skip_enum_constant)
+        if isinstance(step, GeneratorType):
+            yield step
+
+    def _exception_step(self):
+        # type: () -> Any
+        """
+        Reads the type code of a thrown exception, then skips it or returns
+        the task skipping it
+        """
+        type_code = self._read_ubyte()
+        if type_code == TerminalCode.TC_RESET:
+            raise ValueError("TC_RESET read while reading exception")
+
+        return self._skip_content_step(type_code)
+
+    def _skip_exception_task(self):
+        # type: () -> Generator
+        """
+        Skips a thrown exception, which is surrounded by resets
+        """
+        self.reset()
+        step = self._guard(self._exception_step)
+        if isinstance(step, GeneratorType):
+            yield step
+
+        self.reset()
+
+
+# ------------------------------------------------------------------------------
+
+
+def find_segments(data):
+    # type: (Any) -> List[Tuple[int, int]]
+    """
+    Finds the segments of a stream: the ranges of top-level contents which
+    are separated by TC_RESET markers, and are therefore independent.
+
+    :param data: Content of the whole stream, including its header
+    :return: The list of (start, end) offsets of the non-empty segments
+    :raise ValueError: Invalid or unsupported content
+    :raise EOFError: Stream has ended unexpectedly
+    """
+    scanner = StreamScanner(data)
+    scanner.read_header()
+
+    segments = []  # type: List[Tuple[int, int]]
+    start = end = scanner.offset
+    for type_code, item_start, item_end in scanner.scan():
+        if type_code == TerminalCode.TC_RESET:
+            if end > start:
+                segments.append((start, end))
+            start = end = item_end
+        else:
+            end = item_end
+
+    if end > start:
+        segments.append((start, end))
+
+    return segments
+
+
+# Type codes of the contents starting with their class description
+_CLASSDESC_FIRST = (
+    TerminalCode.TC_OBJECT,
+    TerminalCode.TC_ARRAY,
+    TerminalCode.TC_CLASS,
+    TerminalCode.TC_ENUM,
+)
+
+
+def peek(data):
+    # type: (Any) -> Tuple[int, Optional[ScannedClass]]
+    """
+    Reads the type code and the class description of the first content of a
+    stream, without reading its data, e.g. to route a message according to
+    the class of its payload.
+
+    :param data: Content of the stream, including its header (bytes or any
+                 object supporting the buffer protocol), or only its
+                 beginning
+    :return: A (type code, class description) tuple. The class description
+             is None if the content doesn't have one (string, null, ...).
+             Its super_class attribute gives the parent classes.
+    :raise ValueError: Invalid header or class description
+    :raise EOFError: Stream has ended unexpectedly
+    """
+    scanner = StreamScanner(data)
+    scanner.read_header()
+    if scanner.offset >= len(data):
+        raise EOFError("Stream has ended unexpectedly while parsing.")
+
+    type_code = scanner._read_ubyte()  # pylint:disable=W0212
+    if type_code in _CLASSDESC_FIRST:
+        class_desc = scanner.read_classdesc()
+    elif type_code in (
+        TerminalCode.TC_CLASSDESC,
+        TerminalCode.TC_PROXYCLASSDESC,
+    ):
+        class_desc = scanner.skip_content(type_code)
+    else:
+        class_desc = None
+
+    return type_code, class_desc
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Inventory of the class descriptions found in streams, e.g. for compatibility
+audits of archived files
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import (  # pylint:disable=W0611
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+import mmap
+
+from ..constants import ClassDescFlags
+from .scanner import ScannedClass, StreamScanner
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Types considered as in-memory streams instead of paths
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+# Names of the class description flags
+_FLAG_NAMES = (
+    (ClassDescFlags.SC_WRITE_METHOD, "SC_WRITE_METHOD"),
+    (ClassDescFlags.SC_BLOCK_DATA, "SC_BLOCK_DATA"),
+    (ClassDescFlags.SC_SERIALIZABLE, "SC_SERIALIZABLE"),
+    (ClassDescFlags.SC_EXTERNALIZABLE, "SC_EXTERNALIZABLE"),
+    (ClassDescFlags.SC_ENUM, "SC_ENUM"),
+)
+
+# ------------------------------------------------------------------------------
+
+
+class ClassSchema(object):  # pylint:disable=R0205
+    """
+    A distinct class description, and the number of times it has been found
+    """
+
+    def __init__(self, class_desc):
+        # type: (ScannedClass) -> None
+        """
+        :param class_desc: A class description read by the scanner
+        """
+        self.name = class_desc.name
+        self.serial_version_uid = class_desc.serial_version_uid
+        self.flags = class_desc.flags
+        self.interfaces = tuple(class_desc.interfaces)
+
+        # (type signature, name) of the fields
+        self.fields = tuple(
+            (class_name or chr(field_type), field_name)
+            for field_type, field_name, class_name in class_desc.fields
+        )  # type: Tuple[Tuple[str, str], ...]
+
+        super_class = class_desc.super_class
+        self.super_class = (
+            super_class.name if super_class is not None else None
+        )  # type: Optional[str]
+
+        # Number of descriptions found and number of sources they were in
+        self.count = 0
+        self.sources = 0
+
+    def __str__(self):
+        return "[class schema: name {0}, uid {1}, count {2}]".format(
+            self.name, self.serial_version_uid, self.count
+        )
+
+    __repr__ = __str__
+
+    @property
+    def key(self):
+        # type: () -> Tuple[Any, ...]
+        """
+        Identity of the description: two identical descriptions have the
+        same key
+        """
+        return (
+            self.name,
+            self.serial_version_uid,
+            self.flags,
+            self.fields,
+            self.interfaces,
+            self.super_class,
+        )
+
+    @property
+    def flag_names(self):
+        # type: () -> List[str]
+        """
+        Names of the flags of the description
+        """
+        return [name for flag, name in _FLAG_NAMES if self.flags & flag]
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns a JSON-compatible description of this schema
+        """
+        return {
+            "name": self.name,
+            "serial_version_uid": self.serial_version_uid,
+            "flags": self.flag_names,
+            "fields": [list(field) for field in self.fields],
+            "interfaces": list(self.interfaces),
+            "super_class": self.super_class,
+            "count": self.count,
+            "sources": self.sources,
+        }
+
+
+class SchemaInventory(object):  # pylint:disable=R0205
+    """
+    Aggregates the class descriptions found in streams.
+
+    The streams are walked through by a StreamScanner, which only keeps the
+    class descriptions and skips the data of the instances, arrays and
+    strings using their size.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        # Key -> schema
+        self.schemas = {}  # type: Dict[Tuple[Any, ...], ClassSchema]
+
+        # Number of sources added
+        self.sources = 0
+
+        # (source, error message) of the sources which couldn't be scanned
+        # up to their end
+        self.errors = []  # type: List[Tuple[Any, str]]
+
+    def add_stream(self, data, source=None):
+        # type: (Any, Any) -> None
+        """
+        Adds the class descriptions of a stream. If the stream can't be
+        scanned up to its end, the descriptions found before the error are
+        kept and the error is stored in the errors list.
+
+        :param data: Content of the whole stream, including its header (bytes,
+                     or a memory map of a file)
+        :param source: Name of the stream, used in the errors list
+        """
+        self.sources += 1
+        scanner = StreamScanner(data)
+        classes = scanner.classes = []  # type: List[ScannedClass]
+        found = set()
+        try:
+            scanner.read_header()
+            for _ in scanner.scan():
+                self.__add_classes(classes, found)
+        except (ValueError, EOFError) as ex:
+            self.errors.append((source, str(ex)))
+
+        # Descriptions of the content which couldn't be read
+        self.__add_classes(classes, found)
+
+        for key in found:
+            self.schemas[key].sources += 1
+
+    def __add_classes(self, classes, found):
+        # type: (List[ScannedClass], set) -> None
+        """
+        Counts the class descriptions read by the scanner
+
+        :param classes: Class descriptions read, emptied by this method
+        :param found: Keys of the descriptions found in the current source
+        """
+        for class_desc in classes:
+            schema = ClassSchema(class_desc)
+            key = schema.key
+            schema = self.schemas.setdefault(key, schema)
+            schema.count += 1
+            found.add(key)
+
+        del classes[:]
+
+    def add_file(self, path):
+        # type: (str) -> None
+        """
+        Adds the class descriptions of a stream file, which is memory-mapped
+
+        :param path: Path of the stream file
+        :raise IOError: Error opening the file
+        """
+        with open(path, "rb") as fd:
+            try:
+                data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                data = b""  # type: Any
+
+            try:
+                self.add_stream(data, path)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+
+    def get_schemas(self):
+        # type: () -> List[ClassSchema]
+        """
+        Returns the schemas sorted by class name and serial version UID
+        """
+        return sorted(
+            self.schemas.values(),
+            key=lambda schema: (
+                schema.name or "",
+                schema.serial_version_uid,
+                -schema.count,
+            ),
+        )
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns a JSON-compatible description of the inventory
+        """
+        return {
+            "sources": self.sources,
+            "schemas": [schema.to_dict() for schema in self.get_schemas()],
+            "errors": [
+                {"source": str(source), "error": error}
+                for source, error in self.errors
+            ],
+        }
+
+    def report(self):
+        # type: () -> str
+        """
+        Returns a human-readable report of the inventory
+        """
+        lines = []  # type: List[str]
+        for schema in self.get_schemas():
+            lines.append(
+                "{0} (serialVersionUID {1}): {2} time(s) in {3} source(s)"
+                " [{4}]".format(
+                    schema.name or "<proxy class>",
+                    schema.serial_version_uid,
+                    schema.count,
+                    schema.sources,
+                    ", ".join(schema.flag_names),
+                )
+            )
+            if schema.super_class:
+                lines.append("    extends {0}".format(schema.super_class))
+            for interface in schema.interfaces:
+                lines.append("    implements {0}".format(interface))
+            for signature, name in schema.fields:
+                lines.append("    {0} {1}".format(signature, name))
+
+        for source, error in self.errors:
+            lines.append("Error in {0}: {1}".format(source, error))
+
+        return "\n".join(lines)
+
+
+def scan_schemas(sources):
+    # type: (Iterable[Any]) -> SchemaInventory
+    """
+    Builds the inventory of the class descriptions of the given streams
+
+    :param sources: Paths of stream files or bytes of streams
+    :return: The inventory of their class descriptions
+    :raise IOError: Error opening a file
+    """
+    inventory = SchemaInventory()
+    for index, source in enumerate(sources):
+        if isinstance(source, BUFFER_TYPES):
+            inventory.add_stream(source, index)
+        else:
+            inventory.add_file(source)
+
+    return inventory
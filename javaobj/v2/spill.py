@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Spilling of the large strings, block data and byte arrays of a stream to
+disk-backed buffers, to parse streams in bounded memory whatever the size
+of their values
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import (  # pylint:disable=W0611
+    IO,
+    Any,
+    Dict,
+    Iterator,
+    Optional,
+    Union,
+)
+import io
+import mmap
+import tempfile
+import threading
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Size of the chunks copied to the spill files and read back from them
+SPILL_CHUNK_SIZE = 1 << 20
+
+# ------------------------------------------------------------------------------
+
+
+class SpilledData(object):  # pylint:disable=R0205
+    """
+    Read-only bytes of a value which has been spilled: either stored in a
+    temporary file, or referenced in place in the memory map or the bytes
+    of the parsed stream.
+
+    Indexing returns the value of a byte, slicing returns bytes, and
+    iteration returns the values of the bytes, reading the data by chunks.
+    The whole content is only loaded in memory by tobytes().
+    The data must be closed when it isn't needed anymore, to delete its
+    temporary file, e.g. using it in a with statement.
+    """
+
+    def __init__(self, size, spill_file=None, view=None):
+        # type: (int, Optional[IO[bytes]], Optional[memoryview]) -> None
+        """
+        :param size: Size of the data
+        :param spill_file: Temporary file containing the data, from its
+                           beginning
+        :param view: Memory view of the data, if it is referenced in place
+        """
+        self.size = size
+        self.__file = spill_file
+        self.__view = view
+        self.__lock = threading.Lock()
+
+    def __str__(self):
+        return "[spilled data: {0} bytes {1}]".format(
+            self.size, "in place" if self.in_place else "in a file"
+        )
+
+    __repr__ = __str__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        # type: () -> int
+        return self.size
+
+    def __getitem__(self, index):
+        # type: (Union[int, slice]) -> Any
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step != 1:
+                raise ValueError("Spilled data slices can't have a step")
+
+            return self._read(start, max(stop - start, 0))
+
+        if index < 0:
+            index += self.size
+
+        if not 0 <= index < self.size:
+            raise IndexError("Spilled data index out of range")
+
+        return bytearray(self._read(index, 1))[0]
+
+    def __iter__(self):
+        # type: () -> Iterator[int]
+        for chunk in self.iter_chunks():
+            for value in bytearray(chunk):
+                yield value
+
+    def __eq__(self, other):
+        if isinstance(other, SpilledData):
+            if len(other) != self.size:
+                return False
+            other_chunks = other.iter_chunks()
+        elif isinstance(other, (bytes, bytearray, memoryview)):
+            if len(other) != self.size:
+                return False
+            other_chunks = iter((other,))
+        else:
+            return False
+
+        # Compare the chunks of both sides, whatever their boundaries
+        other_chunk = b""
+        for chunk in self.iter_chunks():
+            while len(other_chunk) < len(chunk):
+                other_chunk += bytes(next(other_chunks))
+
+            if chunk != other_chunk[: len(chunk)]:
+                return False
+            other_chunk = other_chunk[len(chunk) :]
+
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None  # type: ignore
+
+    def __bytes__(self):
+        # type: () -> bytes
+        return self.tobytes()
+
+    @property
+    def in_place(self):
+        # type: () -> bool
+        """
+        True if the data is referenced in the parsed stream, instead of
+        being stored in a temporary file
+        """
+        return self.__view is not None
+
+    def _read(self, offset, size):
+        # type: (int, int) -> bytes
+        """
+        Reads a part of the data
+        """
+        if self.__view is not None:
+            return bytes(self.__view[offset : offset + size])
+
+        if self.__file is None:
+            raise ValueError("Spilled data has been closed")
+
+        with self.__lock:
+            self.__file.seek(offset)
+            return self.__file.read(size)
+
+    def iter_chunks(self, chunk_size=SPILL_CHUNK_SIZE):
+        # type: (int) -> Iterator[bytes]
+        """
+        Yields the data by chunks
+
+        :param chunk_size: Maximum size of the chunks
+        """
+        for offset in range(0, self.size, chunk_size):
+            yield self._read(offset, min(chunk_size, self.size - offset))
+
+    def tobytes(self):
+        # type: () -> bytes
+        """
+        Loads the whole data in memory
+        """
+        return self._read(0, self.size)
+
+    def open(self):
+        # type: () -> IO[bytes]
+        """
+        Returns a new seekable file-like object reading the data
+        """
+        return io.BufferedReader(_SpilledReader(self), SPILL_CHUNK_SIZE)
+
+    def close(self):
+        # type: () -> None
+        """
+        Deletes the temporary file or releases the memory view: the data
+        can't be read anymore
+        """
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+        if self.__view is not None:
+            self.__view.release()
+            self.__view = None
+
+
+class _SpilledReader(io.RawIOBase):
+    """
+    Raw file-like object reading spilled data
+    """
+
+    def __init__(self, data):
+        # type: (SpilledData) -> None
+        super(_SpilledReader, self).__init__()
+        self.__data = data
+        self.__offset = 0
+
+    def readable(self):
+        # type: () -> bool
+        return True
+
+    def seekable(self):
+        # type: () -> bool
+        return True
+
+    def readinto(self, buffer):
+        # type: (Any) -> int
+        chunk = self.__data[self.__offset : self.__offset + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self.__offset += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # type: (int, int) -> int
+        if whence == io.SEEK_CUR:
+            offset += self.__offset
+        elif whence == io.SEEK_END:
+            offset += len(self.__data)
+
+        if offset < 0:
+            raise ValueError("Negative seek position {0}".format(offset))
+
+        self.__offset = offset
+        return offset
+
+    def tell(self):
+        # type: () -> int
+        return self.__offset
+
+
+class Spiller(object):  # pylint:disable=R0205
+    """
+    Spills the values larger than a threshold while they are read by the
+    parser (see the spiller argument of JavaStreamParser).
+
+    If the parsed stream is also given as a source (bytes, or a memory map
+    of the parsed file), the values are referenced in place. Otherwise,
+    they are copied by chunks to a temporary file each, which is deleted
+    when the value is closed or garbage collected.
+    """
+
+    def __init__(
+        self, threshold, directory=None, source=None, chunk_size=None
+    ):
+        # type: (int, Optional[str], Any, Optional[int]) -> None
+        """
+        :param threshold: Size above which values are spilled, in bytes
+        :param directory: Directory of the temporary files
+        :param source: Content of the whole parsed stream (bytes or a memory
+                       map), read at the offsets of the parsed file object
+        :param chunk_size: Size of the chunks copied to temporary files
+        """
+        self.threshold = threshold
+        self.directory = directory
+        self.chunk_size = chunk_size or SPILL_CHUNK_SIZE
+        self.__source = None  # type: Optional[memoryview]
+        if source is not None:
+            try:
+                self.__source = memoryview(source)
+            except TypeError:
+                # Python 2 memory maps don't support memory views
+                pass
+
+    def __str__(self):
+        return "[spiller: threshold {0}, {1}]".format(
+            self.threshold,
+            "in place" if self.__source is not None else "to files",
+        )
+
+    __repr__ = __str__
+
+    @classmethod
+    def from_kwargs(cls, kwargs, source=None):
+        # type: (Dict[str, Any], Any) -> Optional[Spiller]
+        """
+        Prepares the spiller according to the load() options
+
+        :param kwargs: load() options: spill_threshold and spill_dir
+        :param source: Content of the whole parsed stream, if available
+        :return: The spiller, or None if spilling is disabled
+        """
+        threshold = kwargs.get("spill_threshold")
+        if threshold is None:
+            return None
+
+        return cls(threshold, kwargs.get("spill_dir"), source)
+
+    def spill(self, fd, size):
+        # type: (IO[bytes], int) -> SpilledData
+        """
+        Reads a value from the given stream
+
+        :param fd: Parsed file object, positioned at the start of the value
+        :param size: Size of the value
+        :return: The spilled data
+        :raise EOFError: Stream has ended unexpectedly
+        """
+        if self.__source is not None:
+            start = fd.tell()
+            end = start + size
+            if end > len(self.__source):
+                raise EOFError(
+                    "Stream ended while reading {0} bytes".format(size)
+                )
+
+            fd.seek(end)
+            return SpilledData(size, view=self.__source[start:end])
+
+        spill_file = tempfile.TemporaryFile(dir=self.directory)
+        try:
+            remaining = size
+            while remaining > 0:
+                chunk = fd.read(min(remaining, self.chunk_size))
+                if not chunk:
+                    raise EOFError(
+                        "Stream ended while reading {0} bytes".format(size)
+                    )
+
+                spill_file.write(chunk)
+                remaining -= len(chunk)
+        except BaseException:
+            spill_file.close()
+            raise
+
+        return SpilledData(size, spill_file=spill_file)
+
+
+def map_file(file_object):
+    # type: (IO[bytes]) -> Optional[mmap.mmap]
+    """
+    Memory-maps the file read by the given file object
+
+    :return: The read-only memory map, or None if it is not a file
+    """
+    try:
+        return mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, IOError, OSError, ValueError):
+        # Not a file, or an empty one
+        return None
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Statistics collected while parsing a Java stream
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from typing import Any, Dict, List  # pylint:disable=W0611
+
+try:
+    # Python 3.3+
+    from time import perf_counter
+except ImportError:
+    # Python 2
+    from time import time as perf_counter
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+
+class ClassStats(object):  # pylint:disable=R0205
+    """
+    Counters associated to a single class name
+    """
+
+    def __init__(self, name):
+        # type: (str) -> None
+        """
+        :param name: Name of the class
+        """
+        self.name = name
+
+        # Number of instances (or arrays) of this class
+        self.instances = 0  # type: int
+
+        # Bytes consumed by those instances, including nested content
+        self.bytes = 0  # type: int
+
+        # Time spent parsing those instances, including nested content
+        self.time = 0.0  # type: float
+
+    def __str__(self):
+        return "[class stats {0}: {1} instances, {2} bytes, {3:.6f}s]".format(
+            self.name, self.instances, self.bytes, self.time
+        )
+
+    __repr__ = __str__
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns the content of this bean as a dictionary
+        """
+        return {
+            "name": self.name,
+            "instances": self.instances,
+            "bytes": self.bytes,
+            "time": self.time,
+        }
+
+
+class ParseStats(object):  # pylint:disable=R0205
+    """
+    Counters collected by the JavaStreamParser during a parsing
+    """
+
+    def __init__(self):
+        # Number of parsed objects (TC_OBJECT)
+        self.objects = 0  # type: int
+
+        # Number of parsed arrays (TC_ARRAY)
+        self.arrays = 0  # type: int
+
+        # Number of parsed strings and the size of their content
+        self.strings = 0  # type: int
+        self.string_bytes = 0  # type: int
+
+        # Number of references to previously parsed content
+        self.references = 0  # type: int
+
+        # Number of explicit resets (TC_RESET)
+        self.resets = 0  # type: int
+
+        # Number of block data and the size of their content
+        self.block_data = 0  # type: int
+        self.block_data_bytes = 0  # type: int
+
+        # Size of the stream and duration of the whole parsing
+        self.total_bytes = 0  # type: int
+        self.total_time = 0.0  # type: float
+
+        # Class name -> counters
+        self.classes = {}  # type: Dict[str, ClassStats]
+
+    def __str__(self):
+        return (
+            "[parse stats: {s.total_bytes} bytes in {s.total_time:.6f}s, "
+            "{s.objects} objects, {s.arrays} arrays, {s.strings} strings, "
+            "{s.references} references, {s.resets} resets]"
+        ).format(s=self)
+
+    __repr__ = __str__
+
+    def add_instance(self, name, size, duration):
+        # type: (str, int, float) -> None
+        """
+        Stores the counters of a parsed instance
+
+        :param name: Name of the class of the instance
+        :param size: Number of bytes consumed by the instance
+        :param duration: Time spent parsing the instance
+        """
+        try:
+            class_stats = self.classes[name]
+        except KeyError:
+            class_stats = self.classes[name] = ClassStats(name)
+
+        class_stats.instances += 1
+        class_stats.bytes += size
+        class_stats.time += duration
+
+    def top_classes(self, key="bytes", count=10):
+        # type: (str, int) -> List[ClassStats]
+        """
+        Returns the class counters with the highest value for the given key
+
+        :param key: Name of the counter to sort on (instances, bytes, time)
+        :param count: Maximum number of entries to return
+        :return: A list of ClassStats beans, in decreasing order
+        """
+        return sorted(
+            self.classes.values(),
+            key=lambda class_stats: getattr(class_stats, key),
+            reverse=True,
+        )[:count]
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns the content of this bean as a dictionary, e.g. to be logged
+        as JSON
+        """
+        return {
+            "objects": self.objects,
+            "arrays": self.arrays,
+            "strings": self.strings,
+            "string_bytes": self.string_bytes,
+            "references": self.references,
+            "resets": self.resets,
+            "block_data": self.block_data,
+            "block_data_bytes": self.block_data_bytes,
+            "total_bytes": self.total_bytes,
+            "total_time": self.total_time,
+            "classes": dict(
+                (name, class_stats.to_dict())
+                for name, class_stats in self.classes.items()
+            ),
+        }
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Utility module to handle streams like in Java
+Utility module to handle streams like in Java, and to read them ahead in a
+helper thread
 
 :authors: Thomas Calmant
 :license: Apache License 2.0
@@ -26,11 +27,24 @@ Utility module to handle streams like in Java
 
 from __future__ import absolute_import
 
-from typing import Any, IO, Tuple  # pylint:disable=W0611
+from typing import Any, IO, Optional, Tuple  # pylint:disable=W0611
+import io
 import struct
+import threading
+
+try:
+    # Python 2
+    import Queue as queue
+except ImportError:
+    # Python 3+
+    import queue  # type: ignore
 
 from ..modifiedutf8 import decode_modified_utf8
-from ..utils import unicode_char, UNICODE_TYPE  # pylint:disable=W0611
+from ..utils import (  # pylint:disable=W0611
+    is_seekable,
+    unicode_char,
+    UNICODE_TYPE,
+)
 
 # ------------------------------------------------------------------------------
 
@@ -41,6 +55,9 @@ __version__ = ".".join(str(x) for x in __version_info__)
 # Documentation strings format
 __docformat__ = "restructuredtext en"
 
+# Size of the blocks read ahead by the helper thread
+READ_AHEAD_BLOCK_SIZE = 1048576
+
 # ------------------------------------------------------------------------------
 
 
@@ -159,3 +176,230 @@ class DataStreamReader:
         length = self.read_ushort()
         ba = self.__fd.read(length)
         return decode_modified_utf8(ba)[0]
+
+
+# ------------------------------------------------------------------------------
+
+
+class ReadAheadReader(io.RawIOBase):
+    """
+    Raw stream reading the given one ahead, in a helper thread.
+
+    The helper thread reads the next block of the stream while the current
+    one is being parsed: two buffers are allocated once and filled in turn
+    with readinto(), then handed over as memoryviews, so that waiting for a
+    slow storage (NFS, FUSE, ...) overlaps with the parsing.
+    Wrap this reader in an io.BufferedReader to read it by small parts.
+    """
+
+    def __init__(self, fd, block_size=READ_AHEAD_BLOCK_SIZE):
+        # type: (IO[bytes], int) -> None
+        """
+        :param fd: The input stream
+        :param block_size: Size of the blocks read ahead
+        """
+        super(ReadAheadReader, self).__init__()
+        self.__fd = fd
+        self.__block_size = block_size
+        self.__seekable = is_seekable(fd)
+
+        # Buffers to fill and blocks read by the helper thread
+        self.__free = None  # type: Optional[queue.Queue]
+        self.__filled = None  # type: Optional[queue.Queue]
+        self.__thread = None  # type: Optional[threading.Thread]
+
+        # Block being read, its offset in the stream, its buffer and the
+        # position of the next byte to read in it
+        self.__view = memoryview(b"")
+        self.__base = fd.tell() if self.__seekable else 0
+        self.__buffer = None  # type: Optional[bytearray]
+        self.__pos = 0
+        self.__eof = False
+
+        self.__start()
+
+    def __start(self):
+        # type: () -> None
+        """
+        Starts the helper thread, reading from the current position
+        """
+        self.__free = queue.Queue()
+        self.__filled = queue.Queue()
+        self.__stopped = threading.Event()
+        for _ in range(2):
+            self.__free.put(bytearray(self.__block_size))
+
+        self.__thread = threading.Thread(
+            target=self.__read_loop,
+            args=(self.__free, self.__filled, self.__stopped),
+            name="javaobj-read-ahead",
+        )
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __stop(self):
+        # type: () -> None
+        """
+        Stops the helper thread and forgets about the blocks it read
+        """
+        if self.__thread is not None:
+            # Wake the thread up if it waits for a buffer
+            self.__stopped.set()
+            self.__free.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+        self.__buffer = None
+        self.__view = memoryview(b"")
+        self.__pos = 0
+        self.__eof = False
+
+    def __read_loop(self, free, filled, stopped):
+        # type: (queue.Queue, queue.Queue, threading.Event) -> None
+        """
+        Reads the stream in the helper thread, one free buffer at a time
+
+        :param free: Queue of the buffers to fill (None to stop)
+        :param filled: Queue of the (buffer, size) tuples read, or of the
+                       exception raised while reading
+        :param stopped: Event set when the blocks read aren't needed anymore
+        """
+        fd = self.__fd
+        readinto = getattr(fd, "readinto", None)
+        try:
+            while True:
+                buffer = free.get()
+                if buffer is None or stopped.is_set():
+                    break
+
+                if readinto is not None:
+                    size = readinto(buffer) or 0
+                else:
+                    data = fd.read(len(buffer))
+                    size = len(data)
+                    buffer[:size] = data
+
+                filled.put((buffer, size))
+                if not size:
+                    # End of stream
+                    break
+        except Exception as ex:  # pylint:disable=W0703
+            filled.put(ex)
+
+    def readable(self):
+        # type: () -> bool
+        """
+        The stream can be read
+        """
+        return True
+
+    def seekable(self):
+        # type: () -> bool
+        """
+        The stream can be seeked if the underlying one can
+        """
+        return self.__seekable
+
+    def tell(self):
+        # type: () -> int
+        """
+        Returns the offset of the next byte to read
+        """
+        return self.__base + self.__pos
+
+    def readinto(self, buffer):
+        # type: (Any) -> int
+        """
+        Copies the next bytes of the current block into the given buffer
+
+        :param buffer: A writable buffer
+        :return: The number of bytes written, 0 at the end of the stream
+        :raise IOError: Error reading the underlying stream
+        """
+        view = self.__view
+        pos = self.__pos
+        if pos >= len(view):
+            if self.__eof:
+                return 0
+
+            # Give the current buffer back to the helper thread
+            if self.__buffer is not None:
+                self.__free.put(self.__buffer)
+                self.__buffer = None
+
+            item = self.__filled.get()
+            if isinstance(item, Exception):
+                self.__eof = True
+                raise item
+
+            self.__base += len(view)
+            self.__buffer, size = item
+            self.__view = view = memoryview(self.__buffer)[:size]
+            self.__pos = pos = 0
+            if not size:
+                self.__eof = True
+                return 0
+
+        size = min(len(buffer), len(view) - pos)
+        buffer[:size] = view[pos : pos + size]
+        self.__pos = pos + size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # type: (int, int) -> int
+        """
+        Moves the position in the stream. The blocks read ahead are dropped
+        if the new position is outside the current one.
+
+        :param offset: Offset to move to
+        :param whence: io.SEEK_SET or io.SEEK_CUR
+        :return: The new position
+        :raise IOError: Can't seek outside the current block of a stream
+                        which can't be seeked
+        """
+        if whence == io.SEEK_CUR:
+            offset += self.tell()
+        elif whence != io.SEEK_SET:
+            raise IOError("Can't seek from the end of a read-ahead stream")
+
+        if self.__base <= offset <= self.__base + len(self.__view):
+            # Within the current block
+            self.__pos = offset - self.__base
+            return offset
+
+        if not self.__seekable:
+            raise IOError(
+                "Can't go to offset {0}: the stream can't be seeked".format(
+                    offset
+                )
+            )
+
+        self.__stop()
+        self.__fd.seek(offset)
+        self.__base = offset
+        self.__start()
+        return offset
+
+    def close(self):
+        # type: () -> None
+        """
+        Stops the helper thread. The underlying stream is not closed.
+        """
+        if not self.closed:
+            self.__stop()
+
+        super(ReadAheadReader, self).close()
+
+
+def open_read_ahead(fd, block_size=READ_AHEAD_BLOCK_SIZE):
+    # type: (IO[bytes], int) -> IO[bytes]
+    """
+    Returns a buffered stream reading the given one ahead in a helper thread.
+    It must be closed to stop the helper thread, which doesn't close the
+    given stream.
+
+    :param fd: The input stream
+    :param block_size: Size of the blocks read ahead
+    :return: A buffered stream
+    """
+    return io.BufferedReader(ReadAheadReader(fd, block_size), block_size)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Extraction of the strings of a stream, with their owner, without parsing
+the objects, e.g. for full-text indexing
+
+:authors: Thomas Calmant
+:license: Apache License 2.0
+:version: 0.4.1
+:status: Alpha
+
+..
+
+    Copyright 2020 Thomas Calmant
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+"""
+
+from __future__ import absolute_import
+
+from types import GeneratorType
+from typing import (  # pylint:disable=W0611
+    Any,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from ..constants import ClassDescFlags, TerminalCode
+from ..modifiedutf8 import decode_modified_utf8
+from .scanner import (
+    PRIMITIVE_SIZES,
+    ScannedClass,
+    StreamScanner,
+    _USHORT,
+)
+
+# ------------------------------------------------------------------------------
+
+# Module version
+__version_info__ = (0, 4, 1)
+__version__ = ".".join(str(x) for x in __version_info__)
+
+# Documentation strings format
+__docformat__ = "restructuredtext en"
+
+# ------------------------------------------------------------------------------
+
+# Owner of the top-level strings
+_NO_OWNER = (None, None)  # type: Tuple[Optional[str], Optional[str]]
+
+# ------------------------------------------------------------------------------
+
+
+class StringScanner(StreamScanner):
+    """
+    Stream scanner keeping track of the new strings it walks through, with
+    the class and the field they are the value of.
+
+    The owner of the elements of an array is the array class, with no field
+    name, and the owner of the strings written by a writeObject() method is
+    the class of this method, with no field name either. The names of the
+    classes and enumeration constants are not kept.
+    This scanner is not resumable.
+    """
+
+    def __init__(self, data, offset=0):
+        # type: (Any, int) -> None
+        """
+        :param data: Content of the stream (bytes or any object supporting
+                     the buffer protocol)
+        :param offset: Offset of the first byte to scan
+        """
+        super(StringScanner, self).__init__(data, offset)
+
+        # (offset, owner class, field name, text) of the strings found
+        self.strings = (
+            []
+        )  # type: List[Tuple[int, Optional[str], Optional[str], str]]
+
+        # Class and field names of the content being skipped
+        self._owner = _NO_OWNER
+
+        # Class -> names of its object fields
+        self.__object_fields = {}  # type: Dict[int, List[str]]
+
+    def scan_next(self):
+        # type: () -> Optional[Tuple[int, int, int]]
+        """
+        Walks through the next top-level content of the stream, see
+        StreamScanner.scan_next()
+        """
+        self._owner = _NO_OWNER
+        return super(StringScanner, self).scan_next()
+
+    def _skip_content_step(self, type_code):
+        # type: (int) -> Any
+        """
+        Keeps track of the strings, then skips the content
+        """
+        if type_code in (
+            TerminalCode.TC_STRING,
+            TerminalCode.TC_LONGSTRING,
+        ):
+            offset = self.offset - 1
+            self._skip_string(type_code)
+            owner_class, field_name = self._owner
+            self.strings.append(
+                (
+                    offset,
+                    owner_class,
+                    field_name,
+                    decode_modified_utf8(self._get_string_data(offset))[0],
+                )
+            )
+            return None
+
+        return super(StringScanner, self)._skip_content_step(type_code)
+
+    def _read_short_string(self, owner_class, field_name):
+        # type: (Optional[str], Optional[str]) -> None
+        """
+        Keeps track of a new string, which TC_STRING type code has just been
+        read
+        """
+        data = self._data
+        offset = self.offset - 1
+        start = offset + 3
+        end = start + _USHORT.unpack_from(data, self.offset)[0]
+        if end > self._size:
+            self._raise_eof(end)
+
+        self._handles.append(offset)
+        self.offset = end
+        self.strings.append(
+            (
+                offset,
+                owner_class,
+                field_name,
+                decode_modified_utf8(bytes(data[start:end]))[0],
+            )
+        )
+
+    def _get_object_fields(self, class_desc):
+        # type: (ScannedClass) -> List[str]
+        """
+        Returns the names of the object fields of a class, in stream order
+        """
+        key = id(class_desc)
+        names = self.__object_fields.get(key)
+        if names is None:
+            names = [
+                field_name
+                for field_type, field_name, _ in class_desc.fields
+                if field_type not in PRIMITIVE_SIZES
+            ]
+            self.__object_fields[key] = names
+
+        return names
+
+    def reset(self):
+        # type: () -> None
+        """
+        Forgets the handles, as after a TC_RESET
+        """
+        super(StringScanner, self).reset()
+        self.__object_fields.clear()
+
+    def _skip_annotations_task(self):
+        # type: () -> Generator
+        """
+        Skips contents up to the end of a block data, which belong to the
+        current owner
+        """
+        owner = self._owner
+        owner_class, field_name = owner
+        while True:
+            type_code = self._read_ubyte()
+            if type_code == TerminalCode.TC_STRING:
+                # Fast path, e.g. for the elements of collections
+                self._read_short_string(owner_class, field_name)
+                continue
+            elif type_code == TerminalCode.TC_ENDBLOCKDATA:
+                break
+            elif type_code == TerminalCode.TC_RESET:
+                self.reset()
+                continue
+
+            self._owner = owner
+            step = self._skip_content_step(type_code)
+            if isinstance(step, GeneratorType):
+                yield step
+
+    def _skip_object_task(self):
+        # type: () -> Generator
+        """
+        Skips an object, setting the owner of the value of each field
+        """
+        class_desc = self._read_classdesc_step()
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
+
+        if class_desc is None:
+            raise ValueError("Null class description of an object")
+
+        self._handles.append(None)
+        for cd in class_desc.get_hierarchy():
+            flags = cd.flags
+            if flags & ClassDescFlags.SC_SERIALIZABLE:
+                names = iter(self._get_object_fields(cd))
+                for size, nb_objects in cd.layout:
+                    if size:
+                        self._skip(size)
+
+                    for _ in range(nb_objects):
+                        name = next(names)
+                        type_code = self._read_ubyte()
+                        if type_code == TerminalCode.TC_STRING:
+                            # Fast path for the most common case
+                            self._read_short_string(cd.name, name)
+                            continue
+                        elif type_code == TerminalCode.TC_NULL:
+                            continue
+
+                        self._owner = (cd.name, name)
+                        step = self._skip_content_step(type_code)
+                        if isinstance(step, GeneratorType):
+                            yield step
+
+                if flags & ClassDescFlags.SC_WRITE_METHOD:
+                    self._owner = (cd.name, None)
+                    yield self._skip_annotations_task()
+            elif flags & ClassDescFlags.SC_EXTERNALIZABLE:
+                if flags & ClassDescFlags.SC_WRITE_METHOD:
+                    # Only custom transformers can read this data
+                    raise ValueError(
+                        "Can't skip the external data of {0}".format(cd.name)
+                    )
+
+                self._owner = (cd.name, None)
+                yield self._skip_annotations_task()
+            else:
+                raise ValueError("Unhandled Class Data Type")
+
+    def _skip_array_task(self):
+        # type: () -> Generator
+        """
+        Skips an array, whose class owns its elements
+        """
+        class_desc = self._read_classdesc_step()
+        if isinstance(class_desc, GeneratorType):
+            class_desc = yield class_desc
+
+        self._handles.append(None)
+        if (
+            class_desc is None
+            or not class_desc.name
+            or len(class_desc.name) < 2
+        ):
+            raise ValueError("Invalid name in array class description")
+
+        size = self._read_int()
+        if size < 0:
+            raise ValueError("Invalid array size")
+
+        width = PRIMITIVE_SIZES.get(ord(class_desc.name[1]))
+        if width is not None:
+            # Skip primitive values in bulk
+            self._skip(size * width)
+        else:
+            owner = (class_desc.name, None)
+            for _ in range(size):
+                self._owner = owner
+                step = self._next_content_step()
+                if isinstance(step, GeneratorType):
+                    yield step
+
+
+def iter_strings(data):
+    # type: (Any) -> Iterator[Tuple[int, Optional[str], Optional[str], str]]
+    """
+    Walks through a stream and yields its new strings (TC_STRING and
+    TC_LONGSTRING), with the class and field they are the value of (see
+    StringScanner). No object is created.
+
+    :param data: Content of the whole stream, including its header (bytes,
+                 or a memory map of a file)
+    :return: An iterator of (offset, owner class, field name, text) tuples,
+             where offset is the one of the type code of the string. The
+             owner class and field name are None for top-level strings.
+    :raise ValueError: Invalid or unsupported content
+    :raise EOFError: Stream has ended unexpectedly
+    """
+    scanner = StringScanner(data)
+    scanner.read_header()
+    strings = scanner.strings
+    while scanner.scan_next() is not None:
+        for item in strings:
+            yield item
+
+        del strings[:]
@@ -227,6 +227,16 @@ class JavaSet(set, JavaInstance):
         set.__init__(self)
         JavaInstance.__init__(self)
 
+    def __reduce__(self):
+        # The default implementation gives the content of the set to the
+        # constructor
+        return self.__class__, (), (self.__dict__, list(self))
+
+    def __setstate__(self, state):
+        attributes, content = state
+        self.__dict__.update(attributes)
+        self.update(content)
+
     def load_from_instance(self, indent=0):
         # type: (int) -> bool
         """
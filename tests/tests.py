@@ -38,11 +38,14 @@ import subprocess
 import sys
 import unittest
 
+from io import BytesIO
+
 # Prepare Python path to import javaobj
 sys.path.insert(0, os.path.abspath(os.path.dirname(os.getcwd())))
 
 # Local
 import javaobj.v1 as javaobj
+from javaobj import generator
 from javaobj.utils import hexdump
 
 # ------------------------------------------------------------------------------
@@ -416,6 +419,24 @@ class TestJavaobjV1(unittest.TestCase):
         self.assertEqual(pobj.value, 19)
         self.assertFalse(pobj.next)
 
+    def test_forward_only_stream(self):
+        """
+        Tests the reading of objects from a stream which can't be seeked
+        """
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(write_fd, "wb") as out:
+            out.write(self.read_file("sunExample.ser"))
+
+        with os.fdopen(read_fd, "rb") as fd:
+            marshaller = javaobj.JavaObjectUnmarshaller(fd)
+            pobj = marshaller.readObject()
+            self.assertEqual(pobj.value, 17)
+
+            # The next object is still available
+            pobj = marshaller.readObject()
+            self.assertEqual(pobj.value, 19)
+            self.assertFalse(pobj.next)
+
     def test_collections(self):
         """
         Tests the handling of ArrayList, LinkedList and HashMap
@@ -469,6 +490,72 @@ class TestJavaobjV1(unittest.TestCase):
         for key, value in pobj.items():
             self.assertEqual(parent_map[key], value)
 
+    def test_deep_graph(self):
+        """
+        Tests the parsing of a graph deeper than the Python recursion limit
+        """
+        depth = sys.getrecursionlimit() * 5
+        output = BytesIO()
+        generator.write_linked_list(generator.JavaStreamWriter(output), depth)
+
+        node = javaobj.loads(output.getvalue())
+        for idx in range(depth):
+            self.assertEqual(node.id, idx)
+            self.assertIsNone(node.right)
+            node = node.left
+
+        self.assertIsNone(node)
+
+    def test_bounded_dumps(self):
+        """
+        Tests the size of the dumps logged for trailing data and errors
+        """
+
+        class Recorder(logging.Handler):
+            def __init__(self):
+                logging.Handler.__init__(self, logging.DEBUG)
+                self.messages = []
+
+            def emit(self, record):
+                self.messages.append(record.getMessage())
+
+        recorder = Recorder()
+        logger = logging.getLogger("javaobj")
+        level = logger.level
+        logger.addHandler(recorder)
+        logger.setLevel(logging.DEBUG)
+        try:
+            jobj = self.read_file("testDouble.ser")
+            fd = BytesIO(jobj + b"\x00" * 100000)
+            pobj = javaobj.load(fd, dump_window=64)
+            self.assertEqual(pobj, javaobj.loads(jobj))
+            self.assertEqual(fd.tell(), len(jobj))
+
+            message = [m for m in recorder.messages if "bytes left" in m][0]
+            self.assertIn("100000 bytes left", message)
+            dump = recorder.messages[recorder.messages.index(message) + 1]
+            self.assertEqual(len(dump.strip().splitlines()), 4)
+            self.assertTrue(
+                dump.strip().startswith("{0:04X}".format(len(jobj)))
+            )
+
+            # Error in the middle of the stream
+            del recorder.messages[:]
+            self.assertRaises(
+                Exception,
+                javaobj.loads,
+                jobj[:4] + b"\xff" + b"\x00" * 100000,
+                dump_window=32,
+            )
+            message = [m for m in recorder.messages if "bytes left" in m][0]
+            self.assertEqual(len(message.strip().splitlines()), 3)
+            self.assertTrue(
+                message.strip().splitlines()[1].startswith("0000")
+            )
+        finally:
+            logger.removeHandler(recorder)
+            logger.setLevel(level)
+
 
 # ------------------------------------------------------------------------------
 
@@ -32,17 +32,30 @@ http://download.oracle.com/javase/6/docs/platform/serialization/spec/protocol.ht
 from __future__ import print_function
 
 # Standard library
-from javaobj.utils import bytes_char
+from javaobj.constants import ClassDescFlags, StreamConstants, TerminalCode
+from javaobj.utils import ForwardReader, bytes_char
+from javaobj import generator
 import javaobj.v2 as javaobj
+import gc
+import json
 import logging
 import os
 import subprocess
 import sys
+import tempfile
 import unittest
+import weakref
 import struct
 
 from io import BytesIO
 
+try:
+    # Python 2
+    from StringIO import StringIO
+except ImportError:
+    # Python 3+
+    from io import StringIO
+
 # Prepare Python path to import javaobj
 sys.path.insert(0, os.path.abspath(os.path.dirname(os.getcwd())))
 
@@ -227,6 +240,25 @@ class TestJavaobjV2(unittest.TestCase):
             with open(found_file, "rb") as filep:
                 return filep.read()
 
+    def run_main(self, argv):
+        """
+        Runs the command line tools, capturing their standard output
+
+        :param argv: Command line arguments
+        :return: A (exit code, output) tuple
+        """
+        from javaobj.v2.__main__ import main
+
+        output = StringIO()
+        stdout = sys.stdout
+        sys.stdout = output
+        try:
+            result = main(argv)
+        finally:
+            sys.stdout = stdout
+
+        return result, output.getvalue()
+
     def test_char_rw(self):
         """
         Reads testChar.ser and checks the serialization process
@@ -594,6 +626,1270 @@ class TestJavaobjV2(unittest.TestCase):
         self.assertEqual(expected["custom_obj"]["annotations"], super_data)
 
 
+    def test_parse_stats(self):
+        """
+        Tests the collection of parsing statistics
+        """
+        jobj = self.read_file("objCollections.ser")
+        pobj, stats = javaobj.loads(jobj, collect_stats=True)
+        self.assertEqual(pobj.classdesc.name, "CollectionsSerializableBean")
+
+        self.assertEqual(stats.total_bytes, len(jobj))
+        self.assertEqual(stats.resets, 0)
+        self.assertGreater(stats.objects, 1)
+        self.assertGreater(stats.strings, 0)
+        self.assertGreater(stats.string_bytes, 0)
+
+        # The root object covers the whole stream but its header
+        root_stats = stats.classes["CollectionsSerializableBean"]
+        self.assertEqual(root_stats.instances, 1)
+        self.assertEqual(root_stats.bytes, len(jobj) - 4)
+        self.assertIn(root_stats, stats.top_classes("bytes", 1))
+        self.assertEqual(
+            stats.to_dict()["classes"]["java.util.HashMap"]["instances"], 1
+        )
+
+        # Statistics are not collected by default
+        parser = javaobj.core.JavaStreamParser(BytesIO(jobj), [])
+        parser.run()
+        self.assertIsNone(parser.stats)
+
+
+    def test_parser_observer(self):
+        """
+        Tests the notification of parser observers
+        """
+
+        class Recorder(javaobj.api.ParserObserver):
+            def __init__(self):
+                self.depth = 0
+                self.max_depth = 0
+                self.events = []
+                self.errors = []
+
+            def content_start(self, type_code, offset):
+                self.depth += 1
+                self.max_depth = max(self.max_depth, self.depth)
+
+            def content_end(
+                self, type_code, handle, class_name, start, end, content
+            ):
+                self.depth -= 1
+                self.events.append(
+                    (self.depth, type_code, handle, class_name, start, end)
+                )
+
+            def content_error(self, type_code, start, end, error):
+                self.depth -= 1
+                self.errors.append((type_code, start, end, error))
+
+        jobj = self.read_file("objCollections.ser")
+        recorder = Recorder()
+        pobj = javaobj.loads(jobj, observers=[recorder])
+
+        # Events are balanced and nested
+        self.assertEqual(recorder.depth, 0)
+        self.assertGreater(recorder.max_depth, 2)
+
+        # The last event is the root object, covering the whole stream
+        depth, type_code, handle, class_name, start, end = recorder.events[-1]
+        self.assertEqual(depth, 0)
+        self.assertEqual(type_code, TerminalCode.TC_OBJECT)
+        self.assertEqual(handle, pobj.handle)
+        self.assertEqual(class_name, "CollectionsSerializableBean")
+        self.assertEqual((start, end), (4, len(jobj)))
+
+        # Nested items are within the bounds of the root object
+        for _, _, _, _, start, end in recorder.events:
+            self.assertTrue(4 <= start < end <= len(jobj))
+
+        class_names = set(event[3] for event in recorder.events)
+        self.assertIn("java.util.HashMap", class_names)
+        self.assertEqual(recorder.errors, [])
+
+        # Notifications stay balanced when the stream is truncated
+        recorder = Recorder()
+        self.assertRaises(
+            EOFError, javaobj.loads, jobj[:-10], observers=[recorder]
+        )
+        self.assertEqual(recorder.depth, 0)
+        type_code, start, end, error = recorder.errors[-1]
+        self.assertEqual(type_code, TerminalCode.TC_OBJECT)
+        self.assertEqual(start, 4)
+        self.assertIsInstance(error, EOFError)
+
+    def test_graph_index(self):
+        """
+        Tests the instances and referrers indexes built while parsing
+        """
+        from javaobj.v2.graph import GraphIndex
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_graph(writer, 100, 0.3)
+        data = output.getvalue()
+
+        graph = GraphIndex()
+        root = javaobj.loads(data, graph_index=graph)
+        nodes = graph.get_instances("generator.Node")
+        self.assertEqual(len(nodes), 100)
+        self.assertIs(nodes[0], root)
+        self.assertEqual(graph.get_instances("java.lang.Object"), [])
+
+        # Compare with a walk through the graph
+        expected = {}
+        for node in nodes:
+            fields = node.field_data[node.classdesc]
+            children = set(
+                child.handle
+                for name, child in fields.items()
+                if name.name != "id" and child is not None
+            )
+            for handle in children:
+                expected.setdefault(handle, []).append(node.handle)
+
+        for node in nodes:
+            self.assertEqual(
+                sorted(
+                    referrer.handle
+                    for referrer in graph.get_referrers(node.handle)
+                ),
+                sorted(expected.get(node.handle, [])),
+            )
+        self.assertEqual(graph.get_referrers(root.handle), [])
+
+        # Collections elements, written by writeObject()
+        graph = GraphIndex()
+        javaobj.loads(
+            self.read_file("objCollections.ser"), graph_index=graph
+        )
+        array_list = graph.get_instances("java.util.ArrayList")[0]
+        self.assertEqual(len(array_list.annotations), 1)
+        for content in list(array_list.annotations.values())[0][1:]:
+            self.assertIn(array_list, graph.get_referrers(content.handle))
+
+        # Handles are reused in each segment
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 10, reset_every=4)
+        graph = GraphIndex()
+        instances = javaobj.loads(output.getvalue(), graph_index=graph)
+        self.assertEqual(len(graph.segments), 3)
+        self.assertEqual(
+            graph.get_instances("generator.Instance"), instances
+        )
+        self.assertEqual(
+            graph.get_referrers(instances[0].handle + 1, 0), [instances[0]]
+        )
+
+        # A referrer is listed once, whatever the class level of its fields
+        parent = generator.ClassSpec(
+            "test.Parent", [("value", "Ljava/lang/Object;")]
+        )
+        child = generator.ClassSpec(
+            "test.Child",
+            [("other", "Ljava/lang/Object;")],
+            ClassDescFlags.SC_SERIALIZABLE | ClassDescFlags.SC_WRITE_METHOD,
+            super_class=parent,
+        )
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        shared = writer.write_string("shared")
+        writer.write_object(
+            child,
+            {"value": generator.Reference(shared), "other": "shared"},
+            [generator.Reference(shared)],
+        )
+        graph = GraphIndex()
+        contents = javaobj.loads(output.getvalue(), graph_index=graph)
+        self.assertEqual(graph.get_referrers(shared), [contents[-1]])
+
+    def test_heap_analysis(self):
+        """
+        Tests the computation of the shallow and retained sizes of contents
+        """
+        from javaobj.v2.heap import HeapGraph, analyze_sizes
+
+        jobj = self.read_file("objCollections.ser")
+        analysis = analyze_sizes(BytesIO(jobj))
+        self.assertEqual(analysis.retained[0], len(jobj) - 4)
+        self.assertEqual(sum(analysis.graph.sizes), len(jobj) - 4)
+
+        bean = analysis.graph.contents[analysis.get_largest(1)[0]]
+        self.assertEqual(bean.classdesc.name, "CollectionsSerializableBean")
+        self.assertEqual(analysis.get_sizes(bean)[1], len(jobj) - 4)
+        self.assertIsNone(analysis.get_dominator(bean))
+
+        classes = analysis.get_classes()
+        self.assertEqual(classes[0].name, "CollectionsSerializableBean")
+        self.assertEqual(
+            sum(sizes.shallow for sizes in classes), len(jobj) - 4
+        )
+        self.assertIn("java.util.HashMap", analysis.report())
+
+        # A linked list: each node retains the following ones
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_linked_list(writer, 100)
+        generator.write_graph(writer, 50, 0.5)
+        graph = HeapGraph()
+        nodes = javaobj.loads(output.getvalue(), observers=[graph])
+        analysis = graph.analyze()
+
+        node = nodes[0]
+        sizes = []
+        while node is not None:
+            sizes.append(analysis.get_sizes(node))
+            child = node.field_data[node.classdesc]
+            child = [
+                value
+                for field, value in child.items()
+                if field.name == "left"
+            ][0]
+            if child is not None:
+                self.assertIs(analysis.get_dominator(child), node)
+            node = child
+
+        self.assertEqual(len(sizes), 100)
+        self.assertEqual(
+            [retained for _, retained in sizes],
+            sorted((retained for _, retained in sizes), reverse=True),
+        )
+        self.assertEqual(sizes[-1][0] + sizes[-2][0], sizes[-2][1])
+
+        # The graph has back references: its root retains all its nodes. The
+        # class description is shared by both contents.
+        self.assertIsNone(analysis.get_dominator(nodes[0].classdesc))
+        self.assertEqual(
+            analysis.get_sizes(nodes[1])[1]
+            + sizes[0][1]
+            + analysis.get_sizes(nodes[0].classdesc)[1],
+            analysis.retained[0],
+        )
+
+        # Command line
+        path = os.path.join(os.path.dirname(__file__), "objCollections.ser")
+        result, output = self.run_main(["sizes", "--json", path])
+        self.assertEqual(result, 0)
+        report = json.loads(output)
+        self.assertEqual(report["total"], len(jobj) - 4)
+        self.assertEqual(
+            report["classes"][0],
+            {
+                "name": "CollectionsSerializableBean",
+                "instances": 1,
+                "shallow": 6,
+                "retained": len(jobj) - 4,
+            },
+        )
+
+    def test_parse_limits(self):
+        """
+        Tests the parsing deadline and its cancellation
+        """
+        from javaobj.v2.limits import monotonic
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_graph(writer, 1000, 0.2)
+        writer.write_array("[I", list(range(100000)))
+        data = output.getvalue()
+
+        # Limits far enough
+        token = javaobj.CancellationToken()
+        contents = javaobj.loads(
+            data, timeout=60, deadline=monotonic() + 60, cancel_token=token
+        )
+        self.assertEqual(len(contents[1].data), 100000)
+
+        # Deadline reached before the first content
+        with self.assertRaises(javaobj.ParseTimeoutError) as ctx:
+            javaobj.loads(data, deadline=monotonic() - 1)
+        self.assertEqual(ctx.exception.offset, 4)
+        self.assertEqual(ctx.exception.handles, 0)
+        self.assertRaises(
+            javaobj.ParseTimeoutError, javaobj.loads, data, timeout=0
+        )
+
+        class Canceller(javaobj.api.ParserObserver):
+            def __init__(self, type_code):
+                self.type_code = type_code
+
+            def content_start(self, type_code, offset):
+                if type_code == self.type_code:
+                    token.cancel()
+
+        # Cancelled while reading the graph
+        token = javaobj.CancellationToken()
+        with self.assertRaises(javaobj.ParseCancelledError) as ctx:
+            javaobj.loads(
+                data,
+                cancel_token=token,
+                observers=[Canceller(TerminalCode.TC_REFERENCE)],
+            )
+        self.assertTrue(token.cancelled)
+        self.assertTrue(0 < ctx.exception.handles <= 1000)
+        self.assertIsInstance(ctx.exception, javaobj.ParseInterruptedError)
+
+        # Cancelled while reading the array
+        token = javaobj.CancellationToken()
+        with self.assertRaises(javaobj.ParseCancelledError) as ctx:
+            javaobj.loads(
+                data,
+                cancel_token=token,
+                observers=[Canceller(TerminalCode.TC_ARRAY)],
+            )
+        # Checked before reading the elements
+        self.assertEqual(ctx.exception.offset, len(data) - 400000)
+
+    def test_parse_quotas(self):
+        """
+        Tests the quotas checked before allocating resources
+        """
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_linked_list(writer, 50)
+        writer.write_array("[I", list(range(1000)))
+        generator.write_long_strings(writer, 1, 70000)
+        data = output.getvalue()
+
+        # Quotas large enough
+        contents = javaobj.loads(
+            data,
+            max_handles=200,
+            max_bytes=len(data),
+            max_array_length=1000,
+            max_string_length=70000,
+            max_depth=50,
+        )
+        self.assertEqual(len(contents), 3)
+
+        for quota, limit in (
+            ("max_handles", 20),
+            ("max_bytes", len(data) - 1),
+            ("max_array_length", 999),
+            ("max_string_length", 65536),
+            ("max_depth", 10),
+        ):
+            with self.assertRaises(javaobj.QuotaExceededError) as ctx:
+                javaobj.loads(data, **{quota: limit})
+            self.assertEqual(ctx.exception.quota, quota)
+            self.assertEqual(ctx.exception.limit, limit)
+            self.assertIn(quota, str(ctx.exception))
+            self.assertIsInstance(ctx.exception, ValueError)
+
+        # Sizes announced by a truncated stream are checked before reading
+        header = data[:4]
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        writer.write_array("[I", [1])
+        array = output.getvalue()
+        array = array[:-8] + struct.pack(">i", 0x7FFFFFFF)
+        with self.assertRaises(javaobj.QuotaExceededError) as ctx:
+            javaobj.loads(array, max_bytes=1 << 20)
+        self.assertGreater(ctx.exception.value, 4 * 0x7FFFFFFF)
+
+        long_string = header + b"\x7c" + struct.pack(">q", 0x7FFFFFFF)
+        with self.assertRaises(javaobj.QuotaExceededError) as ctx:
+            javaobj.loads(long_string, max_string_length=1 << 20)
+        self.assertEqual(ctx.exception.value, 0x7FFFFFFF)
+
+    def test_spill(self):
+        """
+        Tests the spilling of large values out of memory
+        """
+        import zlib
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_long_strings(writer, 1, 70000)
+        writer.write_array("[B", [index % 100 for index in range(5000)])
+        writer.write_block_data(b"ab" * 1500)
+        writer.write_string("small")
+        data = output.getvalue()
+        text, array, block, small = javaobj.loads(data)
+
+        fd, path = tempfile.mkstemp()
+        try:
+            os.write(fd, data)
+            os.close(fd)
+            for contents, in_place in (
+                (javaobj.loads(data, spill_threshold=1000), True),
+                (javaobj.load_path(path, spill_threshold=1000), True),
+                (
+                    javaobj.loads(
+                        zlib.compress(data),
+                        spill_threshold=1000,
+                        spill_dir=os.path.dirname(path),
+                    ),
+                    False,
+                ),
+            ):
+                spilled_text, spilled_array, spilled_block, same = contents
+                self.assertIsInstance(
+                    spilled_text, javaobj.beans.SpilledJavaString
+                )
+                self.assertEqual(spilled_text, text.value)
+                self.assertEqual(spilled_text.length, text.length)
+                self.assertEqual(spilled_text.handle, text.handle)
+                self.assertIn("70000 bytes spilled", spilled_text.dump())
+
+                self.assertEqual(spilled_array.handle, array.handle)
+                self.assertEqual(list(spilled_array.data), list(array))
+                self.assertEqual(spilled_block.data, block.data)
+                self.assertEqual(spilled_block, block.data)
+                self.assertNotIsInstance(same, javaobj.beans.SpilledJavaString)
+                self.assertEqual(same, small)
+
+                for content in (spilled_text, spilled_array, spilled_block):
+                    spilled = content.data
+                    self.assertIsInstance(spilled, javaobj.SpilledData)
+                    self.assertEqual(spilled.in_place, in_place)
+
+                spilled = spilled_block.data
+                self.assertEqual(len(spilled), 3000)
+                self.assertEqual(spilled[1], ord("b"))
+                self.assertEqual(spilled[-2:], b"ab")
+                with spilled.open() as reader:
+                    reader.seek(2999)
+                    self.assertEqual(reader.read(), b"b")
+
+                spilled.close()
+                with self.assertRaises(ValueError):
+                    spilled.tobytes()
+
+                for content in (spilled_text, spilled_array):
+                    with content.data as spilled:
+                        self.assertTrue(spilled.tobytes())
+                    self.assertRaises(ValueError, spilled.tobytes)
+        finally:
+            os.remove(path)
+
+        # Truncated spilled value
+        with self.assertRaises(EOFError):
+            javaobj.loads(data[:5000], spill_threshold=1000)
+
+        with self.assertRaises(EOFError):
+            javaobj.loads(zlib.compress(data[:5000]), spill_threshold=1000)
+
+    def test_parse_cache(self):
+        """
+        Tests the cache of the results of loads()
+        """
+        blobs = []
+        for count in range(1, 4):
+            output = BytesIO()
+            writer = generator.JavaStreamWriter(output)
+            generator.write_instances(writer, count)
+            blobs.append(output.getvalue())
+
+        cache = javaobj.ParseCache(max_entries=2)
+        first = javaobj.loads(blobs[0], cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        # Hits return copies
+        first.field_data.clear()
+        copy = javaobj.loads(blobs[0], cache=cache)
+        second_copy = javaobj.loads(bytes(bytearray(blobs[0])), cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertIsNot(copy, second_copy)
+        self.assertEqual(copy.dump(), javaobj.loads(blobs[0]).dump())
+
+        # The options are part of the key, except the time limits
+        javaobj.loads(blobs[0], cache=cache, max_depth=10)
+        javaobj.loads(blobs[0], cache=cache, timeout=10)
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+
+        # Least recently used entries are evicted
+        self.assertEqual(len(cache), 2)
+        javaobj.loads(blobs[1], cache=cache)
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+        javaobj.loads(blobs[0], cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (4, 3))
+
+        # Transformers are identified by their class and configuration
+        class ConfiguredTransformer(javaobj.transformers.ObjectTransformer):
+            def __init__(self, config):
+                self.config = config
+
+            def cache_key(self):
+                return self.config
+
+        cache = javaobj.ParseCache()
+        for config in ("a", "b", "a"):
+            javaobj.loads(
+                blobs[0], ConfiguredTransformer(config), cache=cache
+            )
+        javaobj.loads(blobs[0], BaseTransformer(), cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        cache = javaobj.ParseCache(max_bytes=1)
+        javaobj.loads(blobs[2], cache=cache)
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+        # Calls with side effects bypass the cache
+        graph = javaobj.graph.GraphIndex()
+        javaobj.loads(blobs[0], cache=cache, graph_index=graph)
+        self.assertTrue(graph.instances)
+        self.assertEqual(cache.misses, 1)
+
+        # Results which can't be pickled aren't cached
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_linked_list(writer, sys.getrecursionlimit())
+        javaobj.loads(output.getvalue(), cache=cache)
+        self.assertEqual(cache.uncacheable, 1)
+
+        # Persistent cache
+        directory = tempfile.mkdtemp()
+        try:
+            cache = javaobj.ParseCache(directory=directory)
+            javaobj.loads(blobs[2], cache=cache)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            cache = javaobj.ParseCache(directory=directory)
+            result = javaobj.loads(blobs[2], cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (1, 0))
+            self.assertEqual(len(result), 3)
+
+            cache.clear()
+            self.assertEqual((len(cache), os.listdir(directory)), (0, []))
+        finally:
+            os.rmdir(directory)
+
+    def test_generator(self):
+        """
+        Tests the parsing of synthetic streams
+        """
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(
+            writer, 4, ("I", "Z", "C", "D", "[I", "Ljava/lang/String;"),
+            reset_every=2
+        )
+        generator.write_collection(writer, "list", 3)
+        generator.write_collection(writer, "map", 3)
+        generator.write_collection(writer, "set", 3)
+        generator.write_graph(writer, 20, 0.5, seed=1)
+        generator.write_long_strings(writer, 1, 70000)
+
+        pobj, stats = javaobj.loads(output.getvalue(), collect_stats=True)
+        self.assertEqual(len(pobj), 9)
+        self.assertEqual(stats.resets, 1)
+        self.assertGreater(stats.references, 0)
+
+        instance = pobj[3]
+        self.assertEqual(instance.classdesc.name, "generator.Instance")
+        self.assertEqual(
+            [getattr(instance, "field{0}".format(idx)) for idx in range(6)],
+            [3, True, "d", 1.5, [3, 4, 5, 6], "value-3"],
+        )
+
+        self.assertEqual(pobj[4], ["item-0", "item-1", "item-2"])
+        self.assertEqual(pobj[5]["key-2"], "value-2")
+        self.assertEqual(pobj[6], set(["item-0", "item-1", "item-2"]))
+        self.assertEqual(pobj[7].classdesc.name, "generator.Node")
+        self.assertEqual(len(pobj[8].value), 70000)
+
+    def test_deep_graph(self):
+        """
+        Tests the parsing of a graph deeper than the Python recursion limit
+        """
+        depth = sys.getrecursionlimit() * 5
+        output = BytesIO()
+        generator.write_linked_list(generator.JavaStreamWriter(output), depth)
+
+        node = javaobj.loads(output.getvalue())
+        for idx in range(depth):
+            self.assertEqual(node.id, idx)
+            self.assertIsNone(node.right)
+            node = node.left
+
+        self.assertIsNone(node)
+
+    def test_load_many(self):
+        """
+        Tests the loading of many streams by a pool of processes
+        """
+        names = ("testBoolIntLong.ser", "testHashSet.ser", "objArrays.ser")
+        sources = [
+            os.path.join(os.path.dirname(__file__), name) for name in names
+        ]
+        sources.append(self.read_file("testChar.ser"))
+        sources.append(b"\xac\xed\x00\x07")
+        sources.append(os.path.join(os.path.dirname(__file__), "missing"))
+
+        results = list(javaobj.load_many(sources, workers=2, ordered=True))
+        self.assertEqual(
+            [result.index for result in results], [0, 1, 2, 3, 4, 5]
+        )
+        self.assertEqual(results[0].source, sources[0])
+        self.assertIsNone(results[3].source)
+
+        for result, source in zip(results[:4], sources):
+            self.assertTrue(result.ok)
+            if result.source is not None:
+                source = self.read_file(os.path.basename(source))
+            expected = javaobj.loads(source)
+            self.assertEqual(repr(result.value), repr(expected))
+
+        self.assertEqual(results[1].value, set([1, 2, 42]))
+
+        # Errors are described
+        self.assertFalse(results[4].ok)
+        self.assertEqual(results[4].error.exc_type, "ValueError")
+        self.assertEqual(results[4].error.offset, 4)
+        self.assertIn("version", results[4].error.message)
+        self.assertFalse(results[5].ok)
+        self.assertEqual(results[5].source, sources[5])
+
+        # Results in completion order and in the current process
+        for workers in (2, 0):
+            results = javaobj.load_many(sources, workers=workers, chunksize=1)
+            self.assertEqual(
+                sorted(result.index for result in results), list(range(6))
+            )
+
+            # Objects processed by the workers
+            results = list(
+                javaobj.load_many(
+                    sources[1:3], workers=workers, ordered=True, process=len
+                )
+            )
+            self.assertEqual(results[0].value, 3)
+            self.assertFalse(results[1].ok)
+            self.assertEqual(results[1].error.exc_type, "TypeError")
+
+    def test_load_segments(self):
+        """
+        Tests the parsing of the segments of a stream by a pool of processes
+        """
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 60, reset_every=7)
+        writer.write_reset()
+        writer.write_reset()
+        generator.write_collection(writer, "map", 20)
+        writer.write_reset()
+        generator.write_graph(writer, 50, 0.5, seed=1)
+        data = output.getvalue()
+
+        segments = javaobj.scanner.find_segments(data)
+        self.assertEqual(len(segments), 11)
+        self.assertEqual(segments[0][0], 4)
+        self.assertEqual(segments[-1][1], len(data))
+
+        parser = javaobj.core.JavaStreamParser(
+            BytesIO(data), [javaobj.transformers.DefaultObjectTransformer()]
+        )
+        expected = parser.run()
+        self.assertEqual(len(expected), 62)
+
+        fd, path = tempfile.mkstemp(suffix=".ser")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+
+            for source in (data, path):
+                for workers in (2, 0):
+                    contents = javaobj.load_segments(
+                        source, workers=workers, chunk_size=100
+                    )
+                    self.assertEqual(
+                        parser.dump(contents), parser.dump(expected)
+                    )
+
+                    # Contents processed by the workers
+                    contents = javaobj.load_segments(
+                        source, workers=workers, chunk_size=100, process=type
+                    )
+                    self.assertEqual(
+                        contents, [type(content) for content in expected]
+                    )
+        finally:
+            os.remove(path)
+
+        # Errors are reported with their offset in the whole stream
+        data += b"\x79\x72\x00\x01A" + b"\x00" * 8
+        data += b"\x06\x00\x00\x78\x70"
+        with self.assertRaises(ValueError) as ctx:
+            javaobj.load_segments(data, workers=0, chunk_size=100)
+        self.assertIn("offset {0}".format(len(data)), str(ctx.exception))
+        self.assertIn("serializable and externalizable", str(ctx.exception))
+
+    def test_iter_segments(self):
+        """
+        Tests the parsing of a stream one segment at a time
+        """
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 20, reset_every=6)
+        writer.write_reset()
+        generator.write_graph(writer, 10, 0.5)
+        data = output.getvalue()
+
+        segments = javaobj.iter_segments(BytesIO(data))
+        first = next(segments)
+        self.assertEqual(len(first), 6)
+        self.assertEqual(first[5].field0, 5)
+
+        # The handles of the previous segment are released
+        ref = weakref.ref(first[0])
+        del first
+        gc.collect()
+        self.assertIsNotNone(ref())
+        self.assertEqual(next(segments)[0].field0, 6)
+        gc.collect()
+        self.assertIsNone(ref())
+
+        self.assertEqual(
+            [len(segment) for segment in segments], [6, 2, 1]
+        )
+        self.assertEqual(
+            list(javaobj.iter_segments(BytesIO(b"\xac\xed\x00\x05"))), []
+        )
+
+    def test_forward_only_stream(self):
+        """
+        Tests the parsing of streams which can't be seeked, like pipes
+        """
+
+        def pipe(data):
+            # The data must fit in the buffer of the pipe
+            read_fd, write_fd = os.pipe()
+            with os.fdopen(write_fd, "wb") as out:
+                out.write(data)
+            return os.fdopen(read_fd, "rb")
+
+        for name in ("objCollections.ser", "testBoolIntLong.ser"):
+            data = self.read_file(name)
+            with pipe(data) as fd:
+                self.assertEqual(
+                    repr(javaobj.load(fd)), repr(javaobj.loads(data))
+                )
+
+        # The raw data of exceptions is read again from the buffer
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        output.write(bytes_char(TerminalCode.TC_EXCEPTION))
+        generator.write_instances(writer, 1)
+        data = output.getvalue()
+        with pipe(data) as fd:
+            content = javaobj.load(fd)
+        self.assertIsInstance(content, javaobj.beans.ExceptionState)
+        self.assertEqual(content.stream_data, data[4:])
+
+        # ... unless it has been dropped
+        with pipe(data) as fd:
+            parser = javaobj.core.JavaStreamParser(
+                ForwardReader(fd, history_size=8, block_size=8),
+                [javaobj.transformers.DefaultObjectTransformer()],
+            )
+            content = parser.run()[0]
+        self.assertIsNone(content.stream_data)
+
+        # Reader offsets
+        reader = ForwardReader(BytesIO(data), history_size=4, block_size=2)
+        self.assertEqual(reader.read(5), data[:5])
+        self.assertEqual(reader.peek(3), data[5:8])
+        reader.unread(4)
+        self.assertEqual(reader.tell(), 1)
+        self.assertEqual(reader.read(), data[1:])
+        self.assertRaises(IOError, reader.seek, 0)
+        self.assertEqual(reader.tell(), len(data))
+
+    def test_compressed_stream(self):
+        """
+        Tests the parsing of streams compressed with gzip or zlib
+        """
+        import gzip
+        import zlib
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 200, reset_every=50)
+        data = output.getvalue()
+        expected = javaobj.loads(data)
+
+        gzip_output = BytesIO()
+        with gzip.GzipFile(fileobj=gzip_output, mode="wb") as gzip_file:
+            gzip_file.write(data[:1000])
+        with gzip.GzipFile(fileobj=gzip_output, mode="wb") as gzip_file:
+            # Second gzip member
+            gzip_file.write(data[1000:])
+
+        for compressed in (gzip_output.getvalue(), zlib.compress(data)):
+            for threaded in (False, True):
+                contents = javaobj.load(
+                    BytesIO(compressed), decompression_thread=threaded
+                )
+                self.assertEqual(len(contents), len(expected))
+                self.assertEqual(repr(contents[-1]), repr(expected[-1]))
+
+            segments = list(javaobj.iter_segments(BytesIO(compressed)))
+            self.assertEqual(len(segments), 4)
+
+            # Truncated stream
+            self.assertRaises(
+                EOFError, javaobj.load, BytesIO(compressed[:-20])
+            )
+
+        # Compressed file
+        fd, path = tempfile.mkstemp(suffix=".ser.gz")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(zlib.compress(data))
+
+            contents = javaobj.load_path(path)
+            self.assertEqual(len(contents), len(expected))
+        finally:
+            os.remove(path)
+
+        # Detection can be disabled
+        self.assertRaises(
+            ValueError,
+            javaobj.loads,
+            zlib.compress(data),
+            decompress=False,
+        )
+
+    def test_read_ahead(self):
+        """
+        Tests the parsing of a stream read ahead in a helper thread
+        """
+        import zlib
+        from javaobj.v2.stream import ReadAheadReader, open_read_ahead
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 200, reset_every=50)
+        data = output.getvalue()
+        expected = javaobj.loads(data)
+
+        for source in (data, zlib.compress(data)):
+            contents = javaobj.load(BytesIO(source), read_ahead=True)
+            self.assertEqual(len(contents), len(expected))
+            self.assertEqual(repr(contents[-1]), repr(expected[-1]))
+
+            segments = list(
+                javaobj.iter_segments(BytesIO(source), read_ahead=True)
+            )
+            self.assertEqual(len(segments), 4)
+
+        # Small blocks, to read across their boundaries
+        reader = open_read_ahead(BytesIO(data), 7)
+        try:
+            contents = javaobj.load(reader)
+            self.assertEqual(len(contents), len(expected))
+        finally:
+            reader.close()
+
+        # Seek within the current block and out of it
+        reader = ReadAheadReader(BytesIO(data), 16)
+        try:
+            buffer = bytearray(10)
+            self.assertEqual(reader.readinto(buffer), 10)
+            self.assertEqual(bytes(buffer), data[:10])
+            self.assertEqual(reader.seek(2), 2)
+            self.assertEqual(reader.read(4), data[2:6])
+            self.assertEqual(reader.seek(100), 100)
+            self.assertEqual(reader.read(8), data[100:108])
+            self.assertEqual(reader.tell(), 108)
+            self.assertEqual(reader.seek(-104, 1), 4)
+            self.assertEqual(reader.read(4), data[4:8])
+        finally:
+            reader.close()
+
+        # Errors of the underlying stream are raised by the reader
+        class FailingStream(object):  # pylint:disable=R0205
+            def read(self, size):
+                raise IOError("Read error")
+
+            def seekable(self):
+                return False
+
+        reader = ReadAheadReader(FailingStream())
+        try:
+            self.assertRaises(IOError, reader.read, 4)
+            self.assertRaises(IOError, reader.seek, 100)
+        finally:
+            reader.close()
+
+    def test_indexed_stream(self):
+        """
+        Tests the random access to the contents of a stream using its index
+        """
+        from javaobj.v2.index import StreamIndex, index_path
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 200, reset_every=50)
+        data = output.getvalue()
+        expected = javaobj.loads(data)
+
+        fd, path = tempfile.mkstemp(suffix=".ser")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+
+            with javaobj.IndexedStream(path) as stream:
+                self.assertEqual(len(stream), len(expected))
+                entry = stream.index.entries[120]
+                self.assertEqual(entry.class_name, "generator.Instance")
+                self.assertEqual(entry.segment, 2)
+                self.assertEqual(entry.first_handle, entry.next_handle - 2)
+
+                # Contents of another segment, then the first one
+                for position in (120, 99, 0, 1, 199):
+                    self.assertEqual(
+                        repr(stream[position]), repr(expected[position])
+                    )
+
+                self.assertRaises(IndexError, stream.get, 200)
+                self.assertRaises(IndexError, stream.get, -201)
+
+                # Negative positions designate the same contents
+                for position in (-1, 199, 198, -2, -200, 0):
+                    self.assertEqual(
+                        repr(stream[position]), repr(expected[position])
+                    )
+                self.assertIs(stream[-1], stream[199])
+
+                # Nested content, in the last segment
+                value = stream.get_handle(
+                    StreamConstants.BASE_REFERENCE_IDX + 5, 3
+                )
+                self.assertEqual(value, "value-151")
+                self.assertRaises(ValueError, stream.get_handle, 0x7F0000, 3)
+
+            # The index has been saved and is reused
+            index = StreamIndex.load(index_path(path))
+            self.assertEqual(index.size, len(data))
+            self.assertEqual(
+                [entry.to_list() for entry in index.entries],
+                [entry.to_list() for entry in stream.index.entries],
+            )
+
+            with javaobj.IndexedStream(path) as stream:
+                self.assertEqual(repr(stream[42]), repr(expected[42]))
+        finally:
+            os.remove(path)
+            if os.path.exists(index_path(path)):
+                os.remove(index_path(path))
+
+        # Instances share the class description of the first one of their
+        # segment
+        index = javaobj.index.build_index(data)
+        self.assertEqual(index.get_dependencies(50), [])
+        self.assertEqual(index.get_dependencies(60), [50])
+
+    def test_lazy_load(self):
+        """
+        Tests the lazy loading of the contents of a stream
+        """
+        import zlib
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 200, reset_every=50)
+        data = output.getvalue()
+        expected = javaobj.loads(data)
+
+        with javaobj.loads(data, lazy=True) as contents:
+            # Only the first contents are indexed
+            first = contents[0]
+            self.assertEqual(str(contents), "[lazy contents: 1 indexed]")
+            self.assertEqual(first.entry.class_name, "generator.Instance")
+            self.assertFalse(first.is_loaded)
+
+            # First access to an attribute
+            self.assertEqual(first.classdesc.name, "generator.Instance")
+            self.assertTrue(first.is_loaded)
+            self.assertEqual(repr(first), repr(expected[0]))
+
+            self.assertEqual(len(contents), len(expected))
+            self.assertEqual(
+                repr(contents[-1].content), repr(expected[-1])
+            )
+            self.assertEqual(
+                [repr(content.content) for content in contents],
+                [repr(content) for content in expected],
+            )
+
+        # Compressed file
+        fd, path = tempfile.mkstemp(suffix=".ser.gz")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(zlib.compress(data))
+
+            contents = javaobj.load_path(path, lazy=True)
+            try:
+                self.assertEqual(
+                    repr(contents[120].content), repr(expected[120])
+                )
+            finally:
+                contents.close()
+        finally:
+            os.remove(path)
+
+    def test_peek(self):
+        """
+        Tests the reading of the class of the first content of a stream
+        """
+        type_code, class_desc = javaobj.peek(self.read_file("objSuper.ser"))
+        self.assertEqual(type_code, TerminalCode.TC_OBJECT)
+        self.assertEqual(class_desc.name, "TestConcrete")
+        self.assertEqual(class_desc.serial_version_uid, 1)
+        self.assertEqual(class_desc.super_class.name, "SuperAaaa")
+
+        type_code, class_desc = javaobj.peek(self.read_file("testClass.ser"))
+        self.assertEqual(type_code, TerminalCode.TC_CLASS)
+        self.assertEqual(class_desc.name, "java.lang.String")
+
+        type_code, class_desc = javaobj.peek(self.read_file("testJapan.ser"))
+        self.assertEqual(type_code, TerminalCode.TC_STRING)
+        self.assertIsNone(class_desc)
+
+        # Only the beginning of the stream is needed
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 1000)
+        data = output.getvalue()
+        type_code, class_desc = javaobj.peek(data[:100])
+        self.assertEqual(class_desc.name, "generator.Instance")
+        self.assertEqual(
+            [field[1] for field in class_desc.fields],
+            ["field0", "field1", "field2"],
+        )
+
+        self.assertRaises(EOFError, javaobj.peek, data[:20])
+        self.assertRaises(EOFError, javaobj.peek, data[:4])
+        self.assertRaises(ValueError, javaobj.peek, b"\x00" * 10)
+
+    def test_schema_inventory(self):
+        """
+        Tests the inventory of the class descriptions of streams
+        """
+        from javaobj.v2.schema import scan_schemas
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 200, reset_every=50)
+        data = output.getvalue()
+
+        fd, path = tempfile.mkstemp(suffix=".ser")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(self.read_file("objSuper.ser"))
+
+            inventory = scan_schemas([data, path, data[:-10]])
+            self.assertEqual(inventory.sources, 3)
+            self.assertEqual(
+                [schema.name for schema in inventory.get_schemas()],
+                ["SuperAaaa", "TestConcrete", "generator.Instance"],
+            )
+
+            schema = inventory.get_schemas()[-1]
+            self.assertEqual(schema.count, 8)
+            self.assertEqual(schema.sources, 2)
+            self.assertEqual(schema.flag_names, ["SC_SERIALIZABLE"])
+            self.assertEqual(
+                schema.fields,
+                (
+                    ("I", "field0"),
+                    ("J", "field1"),
+                    ("Ljava/lang/String;", "field2"),
+                ),
+            )
+            self.assertEqual(
+                inventory.get_schemas()[1].super_class, "SuperAaaa"
+            )
+
+            # The truncated stream
+            self.assertEqual(len(inventory.errors), 1)
+            self.assertEqual(inventory.errors[0][0], 2)
+
+            # Command line
+            result, output = self.run_main(["schemas", "--json", path])
+            self.assertEqual(result, 0)
+            report = json.loads(output)
+            self.assertEqual(report["sources"], 1)
+            self.assertEqual(report["errors"], [])
+            self.assertEqual(
+                [schema["name"] for schema in report["schemas"]],
+                ["SuperAaaa", "TestConcrete"],
+            )
+        finally:
+            os.remove(path)
+
+    def test_strings_scan(self):
+        """
+        Tests the extraction of the strings of a stream with their owner
+        """
+        from javaobj.v2.strings import iter_strings
+
+        strings = list(iter_strings(self.read_file("objArrays.ser")))
+        self.assertIn(
+            (321, "SuperAaaa", "superString", "Super!!"), strings
+        )
+        self.assertEqual(
+            [
+                text
+                for _, owner, field, text in strings
+                if owner == "[Ljava.lang.String;"
+            ],
+            ["1", "2", "3"],
+        )
+        for _, owner, field, _ in strings:
+            if owner == "[Ljava.lang.String;":
+                self.assertIsNone(field)
+
+        # Top-level string
+        self.assertEqual(
+            list(iter_strings(self.read_file("testJapan.ser"))),
+            [(4, None, None, u"\u65e5\u672c\u56fd")],
+        )
+
+        # Fields and collections elements
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 10, reset_every=4)
+        generator.write_collection(writer, "list", 5)
+        data = output.getvalue()
+
+        strings = list(iter_strings(data))
+        self.assertEqual(
+            strings[0], (99, "generator.Instance", "field2", "value-0")
+        )
+        self.assertEqual(
+            [text for _, _, field, text in strings if field == "field2"],
+            ["value-{0}".format(i) for i in range(10)],
+        )
+        self.assertEqual(
+            set(owner for _, owner, field, _ in strings if field is None),
+            set(["java.util.ArrayList"]),
+        )
+
+        # Offsets of the type codes
+        for offset, _, _, text in strings:
+            self.assertEqual(
+                data[offset : offset + 1], bytes_char(TerminalCode.TC_STRING)
+            )
+            self.assertEqual(
+                data[offset + 3 : offset + 3 + len(text)].decode("utf-8"),
+                text,
+            )
+
+        with self.assertRaises(EOFError):
+            list(iter_strings(data[:-10]))
+
+        # Command line
+        path = os.path.join(os.path.dirname(__file__), "testJapan.ser")
+        result, output = self.run_main(["strings", path])
+        self.assertEqual(result, 0)
+        text = json.dumps(u"\u65e5\u672c\u56fd")
+        self.assertEqual(
+            output.splitlines(), ["\t".join((path, "4", "", "", text))]
+        )
+
+    def test_push_parser(self):
+        """
+        Tests the parsing of a stream given in parts
+        """
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 10, reset_every=4)
+        generator.write_collection(writer, "map", 5)
+        generator.write_graph(writer, 10, 0.5)
+        generator.write_long_strings(writer, 1, 70000)
+        data = output.getvalue()
+
+        parser = javaobj.core.JavaStreamParser(
+            BytesIO(data), [javaobj.transformers.DefaultObjectTransformer()]
+        )
+        expected = parser.dump(parser.run())
+
+        for size in (1, 7, 1000, len(data)):
+            push_parser = javaobj.JavaPushParser()
+            contents = []
+            for idx in range(0, len(data), size):
+                contents.extend(push_parser.feed(data[idx : idx + size]))
+
+            self.assertEqual(push_parser.pending, 0)
+            push_parser.close()
+            self.assertEqual(parser.dump(contents), expected)
+
+        # Contents are returned as soon as they are complete
+        push_parser = javaobj.JavaPushParser()
+        self.assertEqual(
+            parser.dump(push_parser.feed(data[:-1])),
+            parser.dump(contents[:-1]),
+        )
+        self.assertGreater(push_parser.pending, 0)
+        self.assertRaises(EOFError, push_parser.close)
+        self.assertEqual(len(push_parser.feed(data[-1:])), 1)
+
+    @unittest.skipIf(sys.version_info < (3, 6), "Requires Python 3.6+")
+    def test_aiter_load(self):
+        """
+        Tests the parsing of a stream read from an asyncio stream reader
+        """
+        import asyncio
+
+        output = BytesIO()
+        writer = generator.JavaStreamWriter(output)
+        generator.write_instances(writer, 10, reset_every=4)
+        generator.write_collection(writer, "list", 50)
+        data = output.getvalue()
+        expected = javaobj.loads(data)
+
+        # End of the first content
+        scanner = javaobj.scanner.StreamScanner(data)
+        scanner.read_header()
+        end = scanner.scan_next()[2]
+
+        loop = asyncio.new_event_loop()
+
+        def next_content(contents):
+            # Never wait for data which won't come
+            return loop.run_until_complete(
+                asyncio.wait_for(contents.__anext__(), 5)
+            )
+
+        try:
+            reader = asyncio.StreamReader(loop=loop)
+            contents = javaobj.aiter_load(reader, read_size=16).__aiter__()
+
+            # Contents are available before the end of the stream
+            reader.feed_data(data[:end])
+            content = next_content(contents)
+            self.assertEqual(content.field0, 0)
+
+            reader.feed_data(data[end:])
+            reader.feed_eof()
+            results = [content]
+            while True:
+                try:
+                    results.append(next_content(contents))
+                except StopAsyncIteration:  # noqa: F821
+                    break
+
+            self.assertEqual(len(results), len(expected))
+            self.assertEqual(results[-1], expected[-1])
+
+            # Truncated stream
+            reader = asyncio.StreamReader(loop=loop)
+            reader.feed_data(data[:-1])
+            reader.feed_eof()
+            contents = javaobj.aiter_load(reader).__aiter__()
+            for _ in range(len(expected) - 1):
+                next_content(contents)
+            with self.assertRaises(EOFError):
+                next_content(contents)
+        finally:
+            loop.close()
+
+
 # ------------------------------------------------------------------------------
 
 